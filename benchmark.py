@@ -0,0 +1,534 @@
+# ------------------------------------------
+# Name: Reda Mohsen Reda
+# Location: Egypt, Cairo
+# Project Title: AI Search Algorithms
+# Description:
+# Benchmarks for the search algorithms implemented in graph.py.
+# Run with:
+#   python benchmark.py                                  (every graph family from 1e3 to 1e6 nodes)
+#   python benchmark.py --sizes 1000 10000 --output results.json
+#   python benchmark.py --compare baseline.json          (flag regressions against saved results)
+#   python benchmark.py --legacy-ucs                     (heap ucs against the previous list based ucs)
+#   python benchmark.py --one-shot                       (one search on a plain graph, compiled or not)
+# ------------------------------------------
+import argparse
+import heapq
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import platform
+import queue
+import random
+import sys
+import time
+import tracemalloc
+import networkx as nx
+import graph as g
+
+
+def random_graph(number_of_nodes: int, seed: int = 57):
+    """
+    generate a connected random graph with integer weights between 1 and 9.
+
+    a random spanning tree keeps the graph connected, then one extra random edge per node is added.
+
+    args:
+    number_of_nodes (int): the number of nodes in the graph.
+    seed (int): the seed of the random generator, the same seed always gives the same graph.
+
+    returns:
+    nx.Graph: a NetworkX Graph object whose nodes are labeled '0', '1', ...
+    """
+    rng = random.Random(seed)
+    graph = nx.Graph()
+    for node in range(1, number_of_nodes):
+        graph.add_edge(str(node), str(rng.randrange(node)), weight=rng.randint(1, 9))
+    for _ in range(number_of_nodes):
+        u, v = rng.randrange(number_of_nodes), rng.randrange(number_of_nodes)
+        if u != v:
+            graph.add_edge(str(u), str(v), weight=rng.randint(1, 9))
+    return graph
+
+
+def _legacy_ucs(graph: nx.Graph, start_node: str, goal_nodes: list):
+    # the list based Uniform Cost Search graph.ucs used before it moved to a binary heap, kept as a baseline
+    fringe = [(0, start_node, [start_node])]
+    while fringe:
+        min_index = min(range(len(fringe)), key=lambda i: fringe[i][0])
+        cost, node, path = fringe.pop(min_index)
+        if node in goal_nodes:
+            return cost, path
+        for neighbor in graph.neighbors(node):
+            new_cost = cost + int(graph[node][neighbor]['weight'])
+            if all(new_cost >= c for c, _, _ in fringe):
+                new_path = path + [neighbor]
+                fringe.append((new_cost, neighbor, new_path))
+    return None, None
+
+
+def _networkx_ucs(graph: nx.Graph, start_node: str, goal_nodes: list):
+    # a heap Uniform Cost Search straight over the NetworkX adjacency, the baseline of a search that does not
+    # compile the graph first
+    goal_nodes = set(goal_nodes)
+    parents = {start_node: None}
+    best = {start_node: 0}
+    fringe = [(0, 0, start_node)]
+    order = itertools.count(1)
+    closed = set()
+    while fringe:
+        cost, _, node = heapq.heappop(fringe)
+        if node in closed:
+            continue
+        closed.add(node)
+        if node in goal_nodes:
+            path = []
+            while node is not None:
+                path.append(node)
+                node = parents[node]
+            return cost, path[::-1]
+        for neighbor, data in graph.adj[node].items():
+            new_cost = cost + data.get("weight", 1)
+            if new_cost < best.get(neighbor, math.inf):
+                best[neighbor] = new_cost
+                parents[neighbor] = node
+                heapq.heappush(fringe, (new_cost, next(order), neighbor))
+    return None, None
+
+
+def _timed_search(search, graph, start_node: str, goal_nodes: list, results):
+    # run one search and report its wall-clock time through the results queue
+    start_time = time.perf_counter()
+    search(graph, start_node, goal_nodes)
+    results.put(time.perf_counter() - start_time)
+
+
+def time_search(search, graph, start_node: str, goal_nodes: list, timeout: float):
+    """
+    time one search in a separate process.
+
+    args:
+    search (function): the search function, called as search(graph, start_node, goal_nodes).
+    graph (nx.Graph or CompiledGraph): the graph to search.
+    start_node (str): the starting node.
+    goal_nodes (list): a list of goal nodes.
+    timeout (float): the number of seconds after which the search is stopped.
+
+    returns:
+    float or None: the search time in seconds, or None if the search did not finish within the timeout.
+    """
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_timed_search, args=(search, graph, start_node, goal_nodes, results))
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return None
+    return results.get()
+
+
+def benchmark_ucs(sizes=(50, 100, 1000, 10000, 50000), timeout: float = 10.0, seed: int = 57):
+    """
+    compare the heap based graph.ucs against the previous list based implementation.
+
+    both searches run from node '0' to the last node of a random graph of every size,
+    the previous implementation is stopped once it runs longer than the timeout.
+
+    returns:
+    list of tuples: (number of nodes, ucs seconds, previous ucs seconds or None) for every size.
+    """
+    rows = []
+    for size in sizes:
+        graph = random_graph(size, seed)
+        goal_nodes = [str(size - 1)]
+        new_time = time_search(g.ucs, graph, "0", goal_nodes, timeout)
+        legacy_time = time_search(_legacy_ucs, graph, "0", goal_nodes, timeout)
+        rows.append((size, new_time, legacy_time))
+    return rows
+
+
+def benchmark_one_shot(sizes=(1000, 10000, 100000, 1000000), seed: int = 57):
+    """
+    time a single UCS on a plain NetworkX graph, which the searches compile on every call.
+
+    the search runs from node '0' to one of its neighbors and to the last node of a random graph of every size.
+    it is timed on the plain graph (compile and search), on the graph compiled beforehand, and as a heap UCS
+    straight over the NetworkX adjacency that never compiles.
+
+    returns:
+    list of tuples: (number of nodes, goal, compile seconds, one-shot seconds, compiled seconds,
+    networkx seconds) for every size and goal.
+    """
+    rows = []
+    for size in sizes:
+        graph = random_graph(size, seed)
+        for goal in (next(iter(graph.adj["0"])), str(size - 1)):
+            compile_seconds = _measure(lambda: g.compile_graph(graph), False)[1]
+            one_shot_seconds = _measure(lambda: g.ucs(graph, "0", [goal]), False)[1]
+            compiled = g.compile_graph(graph)
+            compiled_seconds = _measure(lambda: g.ucs(compiled, "0", [goal]), False)[1]
+            networkx_seconds = _measure(lambda: _networkx_ucs(graph, "0", [goal]), False)[1]
+            rows.append((size, goal, compile_seconds, one_shot_seconds, compiled_seconds, networkx_seconds))
+    return rows
+
+
+def grid_edges(number_of_nodes: int, seed: int = 57):
+    """
+    generate a square 2D grid where every node is linked to its right and lower neighbor.
+
+    args:
+    number_of_nodes (int): the approximate number of nodes, rounded down to a square.
+    seed (int): the seed of the random edge weights between 1 and 9.
+
+    returns:
+    list of tuples: (node, node, weight) edges, node '0' and the last node are opposite corners.
+    """
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(number_of_nodes))
+    edges = []
+    for row in range(side):
+        for column in range(side):
+            node = row * side + column
+            if column + 1 < side:
+                edges.append((str(node), str(node + 1), rng.randint(1, 9)))
+            if row + 1 < side:
+                edges.append((str(node), str(node + side), rng.randint(1, 9)))
+    return edges
+
+
+def geometric_edges(number_of_nodes: int, seed: int = 57, degree: int = 10):
+    """
+    generate a random geometric graph: random points in the unit square linked when they are close to each other.
+
+    the radius is chosen to give about `degree` neighbors per node, and the points are found through a grid of
+    cells as large as the radius, so the graph is built in linear time.
+
+    args:
+    number_of_nodes (int): the number of nodes.
+    seed (int): the seed of the random points.
+    degree (int): the expected number of neighbors of a node.
+
+    returns:
+    list of tuples: (node, node, weight) edges with weights from 1 to 10 that grow with the distance,
+    the nodes are labeled from left to right so node '0' and the last node are far apart.
+    """
+    rng = random.Random(seed)
+    points = sorted((rng.random(), rng.random()) for _ in range(number_of_nodes))
+    radius = math.sqrt(degree / (math.pi * number_of_nodes))
+    cells = {}
+    for node, (x, y) in enumerate(points):
+        cells.setdefault((int(x / radius), int(y / radius)), []).append(node)
+    edges = []
+    for node, (x, y) in enumerate(points):
+        cell_x, cell_y = int(x / radius), int(y / radius)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for other in cells.get((cell_x + dx, cell_y + dy), ()):
+                    if other > node:
+                        distance = math.dist(points[node], points[other])
+                        if distance <= radius:
+                            edges.append((str(node), str(other), 1 + int(distance / radius * 9)))
+    return edges
+
+
+def scale_free_edges(number_of_nodes: int, seed: int = 57, links: int = 2):
+    """
+    generate a scale-free graph by preferential attachment (Barabasi-Albert).
+
+    args:
+    number_of_nodes (int): the number of nodes.
+    seed (int): the seed of the random attachments and edge weights.
+    links (int): the number of edges from every new node to the existing nodes.
+
+    returns:
+    list of tuples: (node, node, weight) edges with weights between 1 and 9, node '0' is one of the hubs
+    and the last node one of the latest and least linked nodes.
+    """
+    rng = random.Random(seed)
+    edges = []
+    # every node appears once for each of its edges, so a uniform choice prefers the nodes with more edges
+    repeated = list(range(links))
+    for node in range(links, number_of_nodes):
+        targets = set()
+        while len(targets) < links:
+            targets.add(rng.choice(repeated))
+        for target in targets:
+            edges.append((str(node), str(target), rng.randint(1, 9)))
+        repeated.extend(targets)
+        repeated.extend([node] * links)
+    return edges
+
+
+def chain_edges(number_of_nodes: int, seed: int = 57):
+    """
+    generate a chain where every node is linked to the next one.
+
+    args:
+    number_of_nodes (int): the number of nodes.
+    seed (int): the seed of the random edge weights between 1 and 9.
+
+    returns:
+    list of tuples: (node, node, weight) edges from node '0' to the last node.
+    """
+    rng = random.Random(seed)
+    return [(str(node), str(node + 1), rng.randint(1, 9)) for node in range(number_of_nodes - 1)]
+
+
+# the graph generators by the family names used in the results
+GRAPH_FAMILIES = {
+    "grid": grid_edges,
+    "geometric": geometric_edges,
+    "scale_free": scale_free_edges,
+    "chain": chain_edges,
+}
+BENCHMARK_SIZES = (1000, 10000, 100000, 1000000)
+
+
+def _measure(function, memory: bool):
+    # run function once and return its result, seconds and peak traced bytes (None without memory tracing)
+    if not memory:
+        start_time = time.perf_counter()
+        result = function()
+        return result, time.perf_counter() - start_time, None
+    tracemalloc.start()
+    try:
+        start_time = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start_time
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def _search_runs(search, graph, start_node: str, goal_nodes: list, memory: bool, results):
+    # time one search, then run it again with SearchStats and, with memory, once more under tracemalloc,
+    # every run starts cold and reports through the results queue as soon as it is done
+    graph._cache.clear()
+    results.put(_measure(lambda: search(graph, start_node, goal_nodes), False)[1])
+    graph._cache.clear()
+    stats = g.SearchStats()
+    cost, path = search(graph, start_node, goal_nodes, stats=stats)
+    results.put((cost, None if path is None else len(path), stats.expanded))
+    if memory:
+        graph._cache.clear()
+        results.put(_measure(lambda: search(graph, start_node, goal_nodes), True)[2])
+
+
+def _build(edges: list):
+    builder = g.GraphBuilder()
+    builder.add_edges_from(edges)
+    return builder.build()
+
+
+def benchmark_family(family: str, number_of_nodes: int, seed: int = 57, timeout: float = 60.0, memory: bool = True):
+    """
+    time parsing, building and every search algorithm on one generated graph.
+
+    the seconds are measured without memory tracing, the memory peaks in a second run with tracemalloc,
+    which slows the code it traces. searches are timed as plain calls, a budget or statistics would check every
+    step and slow them down, and are reported as truncated when they take longer than the timeout. the cost,
+    path length and expanded nodes come from one more run with SearchStats. all the runs of a search happen in
+    one separate process, and every run after the timed one gets the timeout again: a run that does not finish
+    in time stops the process and its numbers are left as None.
+
+    args:
+    family (str): the graph family, one of the keys of GRAPH_FAMILIES.
+    number_of_nodes (int): the number of nodes of the graph.
+    seed (int): the seed of the graph generator.
+    timeout (float): the seconds after which a search is stopped.
+    memory (bool): whether to also record the peak memory of every stage.
+
+    returns:
+    list of dicts: one result per stage ("parse", "build" and the algorithm names) with its seconds,
+    peak bytes and, for the searches, the cost, path length, expanded nodes and whether it was truncated.
+    """
+    edges = GRAPH_FAMILIES[family](number_of_nodes, seed)
+    text = "\n".join(f"{u},{v}={weight}" for u, v, weight in edges)
+    base = {"family": family, "nodes": number_of_nodes, "edges": len(edges)}
+    results = []
+
+    stages = [("parse", lambda: list(g.iter_edges(io.StringIO(text)))), ("build", lambda: _build(edges))]
+    for stage, function in stages:
+        output, seconds, _ = _measure(function, False)
+        peak = _measure(function, True)[2] if memory else None
+        results.append({**base, "stage": stage, "seconds": seconds, "peak_bytes": peak})
+    # the output of the last stage is the built graph
+    compiled = output
+    del text
+
+    start_node, goal_nodes = compiled.label(0), [compiled.label(len(compiled) - 1)]
+    for algorithm, search in g.SEARCH_ALGORITHMS.items():
+        result = {**base, "stage": algorithm, "seconds": None, "peak_bytes": None, "cost": None,
+                  "path_length": None, "expanded": None, "truncated": True}
+        runs = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_search_runs,
+                                          args=(search, compiled, start_node, goal_nodes, memory, runs))
+        process.start()
+        try:
+            result["seconds"] = runs.get(timeout=timeout)
+            result["truncated"] = False
+            result["cost"], result["path_length"], result["expanded"] = runs.get(timeout=timeout)
+            if memory:
+                result["peak_bytes"] = runs.get(timeout=timeout)
+        except queue.Empty:
+            # the run did not finish within the timeout, the runs after it are not started
+            process.terminate()
+        process.join()
+        results.append(result)
+    return results
+
+
+def run_benchmarks(families=tuple(GRAPH_FAMILIES), sizes=BENCHMARK_SIZES, seed: int = 57, timeout: float = 60.0,
+                   memory: bool = True, report=None):
+    """
+    run benchmark_family for every family and size.
+
+    args:
+    families (iterable): the graph families to benchmark.
+    sizes (iterable): the numbers of nodes to benchmark.
+    seed (int): the seed of the graph generators.
+    timeout (float): the seconds after which a search is stopped.
+    memory (bool): whether to also record the peak memory of every stage.
+    report (function, optional): called with every result as soon as it is measured.
+
+    returns:
+    dict: the environment of the run under "meta" and the list of results under "results", ready for json.
+    """
+    results = []
+    for family in families:
+        if family not in GRAPH_FAMILIES:
+            raise ValueError(f"Unknown graph family {family}")
+        for size in sizes:
+            for result in benchmark_family(family, size, seed, timeout, memory):
+                results.append(result)
+                if report is not None:
+                    report(result)
+    meta = {"python": platform.python_version(), "platform": platform.platform(), "seed": seed,
+            "timeout": timeout, "date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    return {"meta": meta, "results": results}
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.25, min_seconds: float = 0.005):
+    """
+    find the stages that got slower or used more memory than in a saved baseline.
+
+    args:
+    baseline (dict): results loaded from an earlier run_benchmarks output.
+    current (dict): the results to check.
+    threshold (float): the allowed relative growth, 0.25 flags anything more than 25% worse.
+    min_seconds (float): time differences below this many seconds are treated as noise.
+
+    returns:
+    list of dicts: one entry per regression with the family, nodes, stage, metric, baseline and current values.
+    """
+    def key(result):
+        return result["family"], result["nodes"], result["stage"]
+
+    previous = {key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        for metric, noise in (("seconds", min_seconds), ("peak_bytes", 0)):
+            old_value, new_value = old.get(metric), result.get(metric)
+            if old_value is None or new_value is None:
+                continue
+            if new_value > old_value * (1 + threshold) and new_value - old_value > noise:
+                regressions.append({"family": result["family"], "nodes": result["nodes"], "stage": result["stage"],
+                                    "metric": metric, "baseline": old_value, "current": new_value})
+        if old.get("truncated") is False and result.get("truncated"):
+            regressions.append({"family": result["family"], "nodes": result["nodes"], "stage": result["stage"],
+                                "metric": "truncated", "baseline": False, "current": True})
+    return regressions
+
+
+def _format_time(seconds):
+    return "timeout" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+
+def _format_bytes(size):
+    return "-" if size is None else f"{size / 2 ** 20:.1f} MiB"
+
+
+def _print_result(result):
+    line = (f"{result['family']:>10}  {result['nodes']:>8}  {result['stage']:>6}  {_format_time(result['seconds']):>12}"
+            f"  {_format_bytes(result['peak_bytes']):>10}")
+    # the time of a search that did not finish already reads timeout, and its statistics run may not have finished
+    if result.get("expanded") is not None:
+        line += f"  cost {result['cost']}, {result['expanded']} expanded"
+    print(line, flush=True)
+
+
+def print_legacy_ucs(timeout: float = 10.0):
+    """print the comparison of benchmark_ucs."""
+    print(f"Uniform Cost Search, heap vs previous list fringe (timeout {timeout:.0f} s)")
+    print(f"{'nodes':>8}  {'ucs':>12}  {'previous':>12}  {'speedup':>10}")
+    for size, new_time, legacy_time in benchmark_ucs(timeout=timeout):
+        if new_time and legacy_time:
+            speedup = f"{legacy_time / new_time:.0f}x"
+        elif new_time:
+            speedup = f">{timeout / new_time:.0f}x"
+        else:
+            speedup = "-"
+        print(f"{size:>8}  {_format_time(new_time):>12}  {_format_time(legacy_time):>12}  {speedup:>10}")
+
+
+def print_one_shot():
+    """print the comparison of benchmark_one_shot."""
+    print("One UCS on a plain nx.Graph: compiled on every call, compiled beforehand, or over the NetworkX adjacency")
+    print(f"{'nodes':>8}  {'goal':>8}  {'compile':>12}  {'one-shot':>12}  {'compiled':>12}  {'networkx':>12}")
+    for size, goal, *seconds in benchmark_one_shot():
+        print(f"{size:>8}  {goal:>8}  " + "  ".join(f"{_format_time(value):>12}" for value in seconds))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search algorithms of graph.py on generated graphs.")
+    parser.add_argument("--families", nargs="+", choices=list(GRAPH_FAMILIES), default=list(GRAPH_FAMILIES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(BENCHMARK_SIZES))
+    parser.add_argument("--seed", type=int, default=57)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds after which a search is stopped")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs of the memory peaks")
+    parser.add_argument("--output", help="write the results as json to this file")
+    parser.add_argument("--input", help="compare the results of this json file instead of running the benchmarks")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag regressions against this json results file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="the allowed relative slowdown, 0.25 = 25%%")
+    parser.add_argument("--legacy-ucs", action="store_true", help="compare ucs with the previous list based ucs")
+    parser.add_argument("--one-shot", action="store_true",
+                        help="time one search on a plain graph, with and without compiling it first")
+    args = parser.parse_args(argv)
+
+    if args.legacy_ucs:
+        print_legacy_ucs()
+        return 0
+    if args.one_shot:
+        print_one_shot()
+        return 0
+    if args.input:
+        with open(args.input, encoding="utf-8") as file:
+            current = json.load(file)
+    else:
+        print(f"{'family':>10}  {'nodes':>8}  {'stage':>6}  {'time':>12}  {'memory':>10}")
+        current = run_benchmarks(args.families, args.sizes, args.seed, args.timeout, not args.no_memory,
+                                 report=_print_result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(current, file, indent=1)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare_results(baseline, current, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['family']} {regression['nodes']} {regression['stage']} "
+                  f"{regression['metric']}: {regression['baseline']} -> {regression['current']}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
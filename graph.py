@@ -12,14 +12,182 @@
 #   - A* Best-First Search
 import networkx as nx
 import matplotlib.pyplot as plt
+import argparse
+import contextlib
+import cProfile
+import functools
+import hashlib
 import heapq
+import itertools
+import json
+import math
+import mmap
+import os
 import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import weakref
+import zlib
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only vectorized_bfs and hop_distances need it
+    np = None
+
+# an edge formatted as (node, node=weight)
+EDGE_PATTERN = re.compile(r"^(\w+)\s*,\s*(\w+)\s*=\s*(\d+)$")
+# the number of node expansions between two calls of a search's progress function
+PROGRESS_INTERVAL = 1000
+# the environment variable that turns on the profiling of the parse, build, search and draw stages,
+# set to the directory the profiles are written to
+PROFILE_ENV = "AI_SEARCH_PROFILE"
+
+
+class SearchCancelled(Exception):
+    """raised by a progress function to stop the search that called it."""
+
+
+# one step of a search generator: the label of the node just expanded, the number of entries in the fringe,
+# the best known cost to the expanded node and the number of nodes expanded so far
+SearchStep = namedtuple("SearchStep", ["node", "frontier", "cost", "expanded"])
+
+
+class StageProfiler:
+    """
+    profile the stages of a run (parse, build, search, draw) separately.
+
+    every stage writes its cProfile statistics to <number>-<stage>.prof, readable with pstats or snakeviz,
+    and the top memory allocations traced by tracemalloc to <number>-<stage>.allocations.txt in the directory.
+
+    args:
+    directory (str or os.PathLike): the directory the profiles are written to, it is created if needed.
+    top (int): the number of allocation sites written for every stage.
+    """
+
+    def __init__(self, directory, top: int = 25):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.top = top
+        # (stage, seconds, peak traced bytes) of every finished stage
+        self.stages = []
+        self._lock = threading.Lock()
+        self._numbers = itertools.count(1)
+        self._tracing = 0
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """profile the code run inside the with block as one stage called name."""
+        with self._lock:
+            number = next(self._numbers)
+            if not self._tracing and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._tracing += 1
+            tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is active on this thread, the stage is still timed and traced
+            profiler = None
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start_time
+            if profiler is not None:
+                profiler.disable()
+            with self._lock:
+                peak = tracemalloc.get_traced_memory()[1]
+                snapshot = tracemalloc.take_snapshot()
+                self._tracing -= 1
+                if not self._tracing:
+                    tracemalloc.stop()
+                self.stages.append((name, seconds, peak))
+            prefix = os.path.join(self.directory, f"{number:02d}-{name}")
+            if profiler is not None:
+                profiler.dump_stats(prefix + ".prof")
+            with open(prefix + ".allocations.txt", "w", encoding="utf-8") as file:
+                file.write(f"{name}: {seconds:.4f} s, peak traced memory {peak} bytes\n")
+                for statistic in snapshot.statistics("lineno")[:self.top]:
+                    file.write(f"{statistic}\n")
+
+    def summary(self):
+        """return the stage-by-stage timing summary as text."""
+        lines = [f"{'stage':<10} {'seconds':>10} {'peak memory':>14}"]
+        for name, seconds, peak in self.stages:
+            lines.append(f"{name:<10} {seconds:>10.4f} {peak / 2 ** 20:>11.2f} MiB")
+        lines.append(f"{'total':<10} {sum(seconds for _, seconds, _ in self.stages):>10.4f}")
+        return "\n".join(lines)
+
+
+# the active StageProfiler, None while profiling is off
+_profiler = None
+
+
+def enable_profiling(directory=None):
+    """
+    turn on the profiling of the parse, build, search and draw stages.
+
+    args:
+    directory (str, optional): the directory the profiles are written to,
+    by default the directory named by the AI_SEARCH_PROFILE environment variable.
+
+    returns:
+    StageProfiler or None: the active profiler, None if no directory is given and the variable is not set.
+    """
+    global _profiler
+    directory = directory or os.environ.get(PROFILE_ENV)
+    if directory:
+        _profiler = StageProfiler(directory)
+    return _profiler
+
 
+def profile_stage(name: str):
+    """
+    return a context manager that profiles the code in its with block as the stage called name.
 
-def main():
+    while profiling is off it is a shared contextlib.nullcontext, so the stages cost nothing.
+    """
+    if _profiler is None:
+        return _NO_PROFILE
+    return _profiler.stage(name)
+
+
+_NO_PROFILE = contextlib.nullcontext()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find a path between a start node and goal nodes of a graph.")
+    parser.add_argument("--profile", metavar="DIR",
+                        help=f"write cProfile and tracemalloc profiles of every stage to DIR (or set {PROFILE_ENV})")
+    parser.add_argument("--no-show", action="store_true", help="only save the drawn graph, without opening a window")
+    parser.add_argument("--neighborhood", metavar="K", type=int,
+                        help="draw only the path and the nodes within K hops of it instead of the whole graph")
+    parser.add_argument("--graph", metavar="FILE",
+                        help="answer the queries of --queries against the graph in FILE (an edge list or a file "
+                             "written by save_graph) instead of prompting, one JSON line per query, without drawing")
+    parser.add_argument("--queries", metavar="FILE", default="-",
+                        help="the JSON lines queries of --graph, see iter_queries (default: read stdin)")
+    parser.add_argument("--output", metavar="FILE", default="-",
+                        help="write the JSON lines results of --graph to FILE (default: stdout)")
+    parser.add_argument("--directed", action="store_true", help="read the edge list of --graph as directed edges")
+    args = parser.parse_args(argv)
+    profiler = enable_profiling(args.profile)
+    if args.graph is not None:
+        return _batch_main(args, profiler)
     try:
-        graph_edges = get_input_edges(input("Enter Edges as (node,node=weight+node,node=weight): "))
-        graph = get_graph(graph_edges)
+        with profile_stage("parse"):
+            graph_edges = get_input_edges(input("Enter Edges as (node,node=weight+node,node=weight): "))
+        with profile_stage("build"):
+            graph = get_graph(graph_edges)
         start_node = input("Enter Start Node: ")
         if not start_node:
             # Display this message to user if did not input start node
@@ -35,37 +203,50 @@ def main():
             raise ValueError("Empty goal nodes")
         selected_search_algorithm = input(
             "Select Search Algorithm From This List (BFS, DFS, UCS, Greedy, A*): ").strip()
-        if selected_search_algorithm == "BFS":
-            cost_to_goal, path_to_goal = bfs(graph, start_node, goal_nodes)
-            print(f"Path using {selected_search_algorithm} is {path_to_goal}")
-            print(f"Cost using {selected_search_algorithm} is {cost_to_goal}")
-            draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_search_algorithm)
-        elif selected_search_algorithm == "DFS":
-            cost_to_goal, path_to_goal = dfs(graph, start_node, goal_nodes)
-            print(f"Path using {selected_search_algorithm} is {path_to_goal}")
-            print(f"Cost using {selected_search_algorithm} is {cost_to_goal}")
-            draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_search_algorithm)
-        elif selected_search_algorithm == "UCS":
-            cost_to_goal, path_to_goal = ucs(graph, start_node, goal_nodes)
-            print(f"Path using {selected_search_algorithm} is {path_to_goal}")
-            print(f"Cost using {selected_search_algorithm} is {cost_to_goal}")
-            draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_search_algorithm)
-        elif selected_search_algorithm == "Greedy":
-            cost_to_goal, path_to_goal = greedy_search(graph, start_node, goal_nodes)
-            print(f"Path using {selected_search_algorithm} is {path_to_goal}")
-            print(f"Cost using {selected_search_algorithm} is {cost_to_goal}")
-            draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_search_algorithm)
-        elif selected_search_algorithm == "A*":
-            cost_to_goal, path_to_goal = a_star(graph, start_node, goal_nodes)
-            print(f"Path using {selected_search_algorithm} is {path_to_goal}")
-            print(f"Cost using {selected_search_algorithm} is {cost_to_goal}")
-            draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_search_algorithm)
-        else:
+        # collect the statistics of the search to print them with the path and cost
+        stats = SearchStats()
+        if selected_search_algorithm not in SEARCH_ALGORITHMS:
             raise ValueError("Invalid Search Algorithm")
+        # run the selected search, every algorithm takes the same arguments
+        search = SEARCH_ALGORITHMS[selected_search_algorithm]
+        with profile_stage("search"):
+            cost_to_goal, path_to_goal = search(graph, start_node, goal_nodes, stats=stats)
+        print(f"Path using {selected_search_algorithm} is {path_to_goal}")
+        print(f"Cost using {selected_search_algorithm} is {cost_to_goal}")
+        print(f"Statistics of {selected_search_algorithm}: {stats}")
+        with profile_stage("draw"):
+            draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_search_algorithm,
+                       show=not args.no_show, neighborhood=args.neighborhood)
     except ValueError as value_err:
         print(value_err)
     except TypeError as type_err:
         print(type_err)
+    if profiler is not None:
+        print(profiler.summary())
+        print(f"Profiles written to {profiler.directory}")
+
+
+def _batch_main(args, profiler):
+    # answer every query of a file or stdin against one loaded graph, returns the exit code
+    with contextlib.ExitStack() as stack:
+        try:
+            with profile_stage("build"):
+                graph = read_graph(args.graph, directed=args.directed)
+            if isinstance(graph, MappedGraph):
+                stack.enter_context(graph)
+            queries = sys.stdin if args.queries == "-" else stack.enter_context(open(args.queries, encoding="utf-8"))
+            output = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w", encoding="utf-8"))
+            with profile_stage("search"):
+                for result in batch_search(graph, iter_queries(queries)):
+                    output.write(json.dumps(result) + "\n")
+        except (OSError, ValueError) as err:
+            print(err, file=sys.stderr)
+            return 1
+    if profiler is not None:
+        # the results may be on stdout, keep the summary apart
+        print(profiler.summary(), file=sys.stderr)
+        print(f"Profiles written to {profiler.directory}", file=sys.stderr)
+    return 0
 
 
 def get_input_edges(input_edges):
@@ -96,7 +277,7 @@ def get_input_edges(input_edges):
     graph_edges = []
     for edge in input_graph_edges:
         # check if the edge is in a correct format and append it the the list created
-        if match := re.search(r"^(\w+)\s*,\s*(\w+)\s*=\s*(\d+)$", edge.strip(), re.IGNORECASE):
+        if match := EDGE_PATTERN.match(edge.strip()):
             graph_edges.append((match.group(1), match.group(2), {"weight": int(match.group(3))}))
         # if user enter invalid input, raise value error
         else:
@@ -107,21 +288,235 @@ def get_input_edges(input_edges):
         return graph_edges
 
 
+def _find_root(parent, node):
+    # the root of a node in a union-find parent table (a dict or an array), halving the path on the way up
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+
+class _EdgeData(dict):
+    # the data dictionary of an edge of a ComponentGraph, every change of it counts as a change of the graph
+    __slots__ = ("_graph",)
+
+    def __init__(self, graph=None):
+        self._graph = graph
+
+    def _changed(self):
+        # unpickling and copying fill the dictionary before they set the graph
+        graph = getattr(self, "_graph", None)
+        if graph is not None:
+            graph._changed()
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._changed()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self._changed()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self._changed()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._changed()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+
+class ComponentGraph(nx.Graph):
+    """
+    an nx.Graph that keeps a union-find of its connected components up to date as edges are added.
+
+    tracking starts with track_components(), get_graph() turns it on. compile_graph() copies the components to the
+    compiled graph, so a search whose goal nodes are all in another component returns (None, None) without
+    expanding a node. removing a node or an edge stops the tracking, the components are then computed again by
+    the compiled graph when they are needed.
+
+    the graph also keeps its compiled form: compile_graph() compiles it once, and every method that adds or removes
+    nodes or edges drops the compiled form and increments `version`. so does a weight changed in place, like
+    G['A']['B']['weight'] = 10 or nx.set_edge_attributes(), the edge data dictionaries report their changes.
+
+    example:
+    >>> G = ComponentGraph()
+    >>> G.track_components()
+    >>> G.add_weighted_edges_from([('A', 'B', 1), ('C', 'D', 1)])
+    >>> G.connected('A', 'B'), G.connected('A', 'D')
+    (True, False)
+    >>> G.add_edge('B', 'C', weight=1)
+    >>> G.connected('A', 'D')
+    True
+    """
+    # the union-find parent of every node with an edge, None while the components are not tracked
+    # (graph views and copies start untracked)
+    _parent = None
+    # the number of changes to the nodes and edges, and the CompiledGraph of the current version
+    version = 0
+    _compiled = None
+
+    def __init__(self, incoming_graph_data=None, **attr):
+        # every edge gets a data dictionary that reports its changes to this graph
+        self.edge_attr_dict_factory = functools.partial(_EdgeData, self)
+        super().__init__(incoming_graph_data, **attr)
+
+    def _changed(self):
+        self.version += 1
+        self._compiled = None
+
+    def track_components(self):
+        # start tracking the components from the current edges
+        self._parent = {}
+        for u, v in self.edges():
+            self._union(u, v)
+
+    def tracks_components(self):
+        return self._parent is not None
+
+    def _union(self, u, v):
+        parent = self._parent
+        parent.setdefault(u, u)
+        parent.setdefault(v, v)
+        u_root, v_root = _find_root(parent, u), _find_root(parent, v)
+        if u_root != v_root:
+            parent[v_root] = u_root
+
+    def find(self, node):
+        """
+        return the representative node of a node's connected component.
+
+        args:
+        node: a node of the graph.
+
+        returns:
+        the same node for every node of the component.
+        """
+        if self._parent is None:
+            raise ValueError("Components are not tracked")
+        if not self.has_node(node):
+            raise ValueError(f"Node {node} is not in graph")
+        # a node without edges is alone in its component
+        return _find_root(self._parent, node) if node in self._parent else node
+
+    def connected(self, u, v):
+        # check if there is a path between two nodes
+        return self.find(u) == self.find(v)
+
+    def add_node(self, node_for_adding, **attr):
+        super().add_node(node_for_adding, **attr)
+        self._changed()
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        super().add_nodes_from(nodes_for_adding, **attr)
+        self._changed()
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        self._changed()
+        if self._parent is not None:
+            self._union(u_of_edge, v_of_edge)
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        # add_weighted_edges_from and update() add their edges here too. this is nx.Graph.add_edges_from, except
+        # that the data of the new edges is filled without reporting every edge, the graph changes once
+        adj, nodes, parent = self._adj, self._node, self._parent
+        for edge in ebunch_to_add:
+            if len(edge) == 3:
+                u, v, data = edge
+            elif len(edge) == 2:
+                u, v = edge
+                data = {}
+            else:
+                raise nx.NetworkXError(f"Edge tuple {edge} must be a 2-tuple or 3-tuple.")
+            for node in (u, v):
+                if node not in nodes:
+                    if node is None:
+                        raise ValueError("None cannot be a node")
+                    adj[node] = self.adjlist_inner_dict_factory()
+                    nodes[node] = self.node_attr_dict_factory()
+            datadict = adj[u].get(v)
+            if datadict is None:
+                datadict = _EdgeData(self)
+            dict.update(datadict, attr)
+            dict.update(datadict, data)
+            adj[u][v] = datadict
+            adj[v][u] = datadict
+            if parent is not None:
+                self._union(u, v)
+        # let networkx drop whatever it caches about the edges of the graph
+        super().add_edges_from(())
+        self._changed()
+
+    # a union-find cannot split a component, stop tracking when nodes or edges are removed
+
+    def _removed(self):
+        self._changed()
+        self._parent = None
+
+    def remove_edge(self, u, v):
+        super().remove_edge(u, v)
+        self._removed()
+
+    def remove_edges_from(self, ebunch):
+        super().remove_edges_from(ebunch)
+        self._removed()
+
+    def remove_node(self, n):
+        super().remove_node(n)
+        self._removed()
+
+    def remove_nodes_from(self, nodes):
+        super().remove_nodes_from(nodes)
+        self._removed()
+
+    def clear(self):
+        super().clear()
+        self._removed()
+
+    def clear_edges(self):
+        super().clear_edges()
+        self._removed()
+
+
 def get_graph(graph_edges: list):
     """
-    create a directed graph from a list of graph edges.
+    create a graph from a list of graph edges.
+
+    the graph tracks its connected components as edges are added (see ComponentGraph), so searches can reject
+    a goal node in another component at once.
 
     args:
     graph_edges (list of tuples): a list of graph edges represented as tuples,
     where each tuple consists of two nodes.
     
     returns:
-    nx.DiGraph: a NetworkX Directed Graph object created from the provided graph edges.
+    ComponentGraph: a NetworkX Graph object created from the provided graph edges.
     """
     # check if graph edges is not none
     if graph_edges:
-        # create an empty directed graph
-        graph = nx.Graph()
+        # create an empty graph that tracks its connected components
+        graph = ComponentGraph()
+        graph.track_components()
         # add edges to the graph based on the provided list of graph_edges
         graph.add_edges_from(graph_edges)
         # return the resulting graph
@@ -130,26 +525,686 @@ def get_graph(graph_edges: list):
         raise ValueError("No graph edges provided")
 
 
-def bfs(graph: nx.Graph, start_node: str, goal_nodes: list):
+class CompiledGraph:
     """
-    perform Breadth-First Search (BFS) on a graph to find a path from the start node to one of the goal nodes.
+    a compact, read-only form of a graph stored in compressed sparse row (CSR) layout.
+
+    node labels are interned to integer ids, and the neighbors of node id `u` are
+    `targets[offsets[u]:offsets[u + 1]]` with the matching edge weights in `weights`.
+    edge weights are converted to numbers once, when the graph is compiled,
+    so the searches never touch networkx dictionaries while they run. integer weights are kept in an
+    integer array, a graph with fractional weights keeps all its weights in a float array.
+
+    use compile_graph() to build one from a NetworkX graph.
+    """
+    __slots__ = ("labels", "index", "offsets", "targets", "weights", "directed", "_cache", "__weakref__")
+
+    def __init__(self, labels: list, offsets: array, targets: array, weights: array, directed: bool = False):
+        # node labels by id and the reverse mapping from label to id
+        self.labels = labels
+        self.index = {label: node_id for node_id, label in enumerate(labels)}
+        # CSR adjacency arrays
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.directed = directed
+        # per-graph precomputed structures (reverse adjacency, heuristic tables, ...)
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def number_of_nodes(self):
+        return len(self.labels)
+
+    def number_of_edges(self):
+        # an undirected edge is stored once in each direction, self-loops only once
+        if self.directed:
+            return len(self.targets)
+        self_loops = sum(1 for u in range(len(self.labels)) for v in self.neighbor_ids(u) if u == v)
+        return (len(self.targets) + self_loops) // 2
+
+    def has_node(self, label) -> bool:
+        return label in self.index
+
+    def node_id(self, label):
+        # return the integer id of a node label, or None if it is not in the graph
+        return self.index.get(label)
+
+    def label(self, node_id: int):
+        return self.labels[node_id]
+
+    def neighbor_ids(self, node_id: int):
+        return self.targets[self.offsets[node_id]:self.offsets[node_id + 1]]
+
+    def neighbors(self, label):
+        # iterate over the neighbor labels of a node, in the same order as the source graph
+        node_id = self.index[label]
+        return (self.labels[v] for v in self.neighbor_ids(node_id))
+
+    def weight(self, u_label, v_label):
+        # return the weight of the edge (u, v)
+        u = self.index[u_label]
+        v = self.index[v_label]
+        for e in range(self.offsets[u], self.offsets[u + 1]):
+            if self.targets[e] == v:
+                return self.weights[e]
+        raise KeyError((u_label, v_label))
+
+    def reverse(self):
+        # return the graph with every edge reversed, an undirected graph is its own reverse
+        if not self.directed:
+            return self
+        if "reverse" not in self._cache:
+            number_of_nodes = len(self.labels)
+            # count the incoming edges of every node, then place each edge in its target's slot
+            offsets = array("q", [0]) * (number_of_nodes + 1)
+            for v in self.targets:
+                offsets[v + 1] += 1
+            for node_id in range(number_of_nodes):
+                offsets[node_id + 1] += offsets[node_id]
+            position = array("q", offsets[:-1])
+            targets = array("q", [0]) * len(self.targets)
+            weights = array(_weight_typecode(self.weights), [0]) * len(self.targets)
+            for u in range(number_of_nodes):
+                for edge in range(self.offsets[u], self.offsets[u + 1]):
+                    v = self.targets[edge]
+                    targets[position[v]] = u
+                    weights[position[v]] = self.weights[edge]
+                    position[v] += 1
+            self._cache["reverse"] = CompiledGraph(self.labels, offsets, targets, weights, directed=True)
+        return self._cache["reverse"]
+
+    def to_networkx(self):
+        # build a NetworkX graph with the same nodes, edges and weights, used for drawing.
+        # the neighbor order of an undirected graph can differ from the compiled one
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+        graph.add_nodes_from(self.labels)
+        for u in range(len(self.labels)):
+            for edge in range(self.offsets[u], self.offsets[u + 1]):
+                graph.add_edge(self.labels[u], self.labels[self.targets[edge]], weight=self.weights[edge])
+        return graph
+
+    def fingerprint(self):
+        # a stable hash of the nodes, edges and weights, the same graph built the same way always has the same one.
+        # the neighbor order is part of it because it decides which path BFS, DFS and greedy search take on ties
+        if "fingerprint" not in self._cache:
+            digest = hashlib.sha256()
+            digest.update(b"directed" if self.directed else b"undirected")
+            digest.update(repr(list(self.labels)).encode())
+            for values in (self.offsets, self.targets, self.weights):
+                digest.update(bytes(values))
+            self._cache["fingerprint"] = digest.hexdigest()
+        return self._cache["fingerprint"]
+
+    def components(self):
+        # label every node with the id of its connected component (weakly connected for directed graphs),
+        # two nodes with different labels can never reach each other
+        if "components" not in self._cache:
+            number_of_nodes = len(self.labels)
+            components = array("q", [-1]) * number_of_nodes
+            adjacencies = (self, self.reverse()) if self.directed else (self,)
+            for root in range(number_of_nodes):
+                if components[root] != -1:
+                    continue
+                components[root] = root
+                stack = [root]
+                while stack:
+                    node = stack.pop()
+                    for adjacency in adjacencies:
+                        for neighbor in adjacency.neighbor_ids(node):
+                            if components[neighbor] == -1:
+                                components[neighbor] = root
+                                stack.append(neighbor)
+            self._cache["components"] = components
+        return self._cache["components"]
+
+    def may_reach(self, start_id: int, goal_ids) -> bool:
+        # False when the component labels are already known and no goal node is in the start node's component,
+        # True otherwise (the labels are not computed here, that would cost as much as a search)
+        components = self._cache.get("components")
+        if components is None:
+            return True
+        component = components[start_id]
+        return any(components[goal_id] == component for goal_id in goal_ids)
+
+
+def _edge_weight(weight):
+    # the number of an edge weight: integers (and strings like '3') become ints, fractional numbers stay floats
+    if isinstance(weight, str):
+        try:
+            return int(weight)
+        except ValueError:
+            weight = float(weight)
+    if isinstance(weight, float) and not weight.is_integer():
+        return weight
+    return int(weight)
+
+
+def _weight_typecode(weights):
+    # the array typecode of a weight array or memoryview, "q" for integer weights and "d" for float weights
+    return weights.typecode if isinstance(weights, array) else weights.format
+
+
+def compile_graph(graph):
+    """
+    compile a NetworkX graph into a CompiledGraph used by the search algorithms.
+
+    compiling takes time linear in the size of the graph. the searches compile a plain NetworkX graph on every
+    call, so compile it once here before searching it many times, or build it with get_graph().
 
     args:
-    graph (nx.DiGraph): a NetworkX Graph object.
-    start_node (str): the starting node for BFS.
-    goal_nodes (list): a list of nodes to reach using BFS.
+    graph (nx.Graph or CompiledGraph): the graph to compile, a CompiledGraph is returned unchanged and a
+    ComponentGraph is compiled once per version (see ComponentGraph).
 
     returns:
-    tuple or None: a tuple containing the cost and path if a path is found; otherwise, returns None.
+    CompiledGraph: the graph in CSR layout, with the neighbors of every node kept in the same order as in `graph`.
 
     example:
     >>> G = nx.Graph()
-    >>> G.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
-    >>> s_node = 'A'
-    >>> g_nodes = ['D', 'C']
-    >>> bfs(G, s_node, g_nodes)
-    (1, ['A', 'B', 'D'])
+    >>> G.add_edges_from([('A', 'B', {'weight': '1'}), ('A', 'C', {'weight': 2})])
+    >>> compiled = compile_graph(G)
+    >>> list(compiled.neighbors('A'))
+    ['B', 'C']
+    >>> compiled.weight('A', 'B')
+    1
     """
+    # nothing to do if the graph is already compiled
+    if isinstance(graph, CompiledGraph):
+        return graph
+    # check if graph is empty
+    if graph is None:
+        raise ValueError("Empty graph")
+    # reuse the compiled form of a ComponentGraph that did not change since it was compiled,
+    # a frozen graph may be a view whose underlying graph changes, it is compiled every time
+    cached = isinstance(graph, ComponentGraph) and not nx.is_frozen(graph)
+    if cached and graph._compiled is not None:
+        return graph._compiled
+    labels = list(graph.nodes)
+    index = {label: node_id for node_id, label in enumerate(labels)}
+    offsets = array("q", [0])
+    targets = array("q")
+    weights = array("q")
+    # graph.adjacency() iterates nodes in the same order as graph.nodes
+    for _, neighbors in graph.adjacency():
+        for neighbor, data in neighbors.items():
+            targets.append(index[neighbor])
+            # convert the weight once here instead of on every edge relaxation
+            weight = data.get("weight", 1)
+            if type(weight) is not int:
+                weight = _edge_weight(weight)
+                if type(weight) is float and weights.typecode == "q":
+                    # the first fractional weight, keep every weight as a float
+                    weights = array("d", weights)
+            weights.append(weight)
+        offsets.append(len(targets))
+    compiled = CompiledGraph(labels, offsets, targets, weights, directed=graph.is_directed())
+    if isinstance(graph, ComponentGraph) and graph.tracks_components():
+        # label every node with the id of its component's representative node
+        compiled._cache["components"] = array("q", (index[graph.find(label)] for label in labels))
+    if cached:
+        graph._compiled = compiled
+    return compiled
+
+
+class GraphBuilder:
+    """
+    build a CompiledGraph from edges added one at a time, without keeping a NetworkX graph or a list of edges.
+
+    the edges are held in three integer arrays until build() sorts them into CSR layout. the result is the same as
+    compiling an nx.Graph built from the same edges: nodes keep the order they first appear in, neighbors keep
+    the order their first edge was added in, and an edge added again only replaces its weight. a union-find of
+    the connected components is updated with every edge, and the built graph starts with its component labels.
+
+    example:
+    >>> builder = GraphBuilder()
+    >>> builder.add_edge('A', 'B', 3)
+    >>> builder.add_edge('C', 'A', 2)
+    >>> compiled = builder.build()
+    >>> list(compiled.neighbors('A'))
+    ['B', 'C']
+    """
+
+    def __init__(self, directed: bool = False):
+        self.directed = directed
+        self._labels = []
+        self._index = {}
+        self._sources = array("q")
+        self._targets = array("q")
+        self._weights = array("q")
+        # the union-find parent of every node id, the root of a component is its smallest node id
+        self._parent = array("q")
+
+    def __len__(self):
+        return len(self._sources)
+
+    def _intern(self, label):
+        node_id = self._index.get(label)
+        if node_id is None:
+            node_id = self._index[label] = len(self._labels)
+            self._labels.append(label)
+            self._parent.append(node_id)
+        return node_id
+
+    def _union(self, u: int, v: int):
+        parent = self._parent
+        u_root, v_root = _find_root(parent, u), _find_root(parent, v)
+        if u_root < v_root:
+            parent[v_root] = u_root
+        elif v_root < u_root:
+            parent[u_root] = v_root
+
+    def connected(self, u, v) -> bool:
+        # check if the edges added so far link two nodes
+        for node in (u, v):
+            if node not in self._index:
+                raise ValueError(f"Node {node} is not in graph")
+        parent = self._parent
+        return _find_root(parent, self._index[u]) == _find_root(parent, self._index[v])
+
+    def _weight(self, weight):
+        # convert a weight, the first fractional weight turns the weight array into a float array
+        weight = _edge_weight(weight)
+        if type(weight) is float and self._weights.typecode == "q":
+            self._weights = array("d", self._weights)
+        return weight
+
+    def add_edge(self, u, v, weight: int = 1):
+        u_id, v_id = self._intern(u), self._intern(v)
+        weight = self._weight(weight)
+        self._sources.append(u_id)
+        self._targets.append(v_id)
+        self._weights.append(weight)
+        self._union(u_id, v_id)
+
+    def add_edges_from(self, edges):
+        # add (u, v, weight) tuples from any iterable, for example iter_edges()
+        intern, index, parent = self._intern, self._index, self._parent
+        add_source, add_target, add_weight = self._sources.append, self._targets.append, self._weights.append
+        for u, v, weight in edges:
+            u_id = index[u] if u in index else intern(u)
+            v_id = index[v] if v in index else intern(v)
+            if type(weight) is not int:
+                weight = self._weight(weight)
+                add_weight = self._weights.append
+            add_source(u_id)
+            add_target(v_id)
+            add_weight(weight)
+            # the same union as _union, inlined because it runs for every edge of a large file
+            while parent[u_id] != u_id:
+                parent[u_id] = u_id = parent[parent[u_id]]
+            while parent[v_id] != v_id:
+                parent[v_id] = v_id = parent[parent[v_id]]
+            if u_id < v_id:
+                parent[v_id] = u_id
+            elif v_id < u_id:
+                parent[u_id] = v_id
+
+    def build(self):
+        """
+        sort the added edges into a CompiledGraph.
+
+        returns:
+        CompiledGraph: the compiled graph, the builder is emptied.
+        """
+        number_of_nodes = len(self._labels)
+        sources, targets, weights = self._sources, self._targets, self._weights
+        # count the edges leaving every node, an undirected edge leaves both of its nodes (a self-loop only once)
+        undirected = not self.directed
+        offsets = array("q", [0]) * (number_of_nodes + 1)
+        for u, v in zip(sources, targets):
+            offsets[u + 1] += 1
+            if undirected and u != v:
+                offsets[v + 1] += 1
+        for node_id in range(number_of_nodes):
+            offsets[node_id + 1] += offsets[node_id]
+        # place every edge in its node's slot, keeping the order the edges were added in
+        position = array("q", offsets[:-1])
+        csr_targets = array("q", [0]) * offsets[-1]
+        csr_weights = array(weights.typecode, [0]) * offsets[-1]
+        for u, v, weight in zip(sources, targets, weights):
+            edge = position[u]
+            csr_targets[edge] = v
+            csr_weights[edge] = weight
+            position[u] = edge + 1
+            if undirected and u != v:
+                edge = position[v]
+                csr_targets[edge] = u
+                csr_weights[edge] = weight
+                position[v] = edge + 1
+        self._sources = self._targets = self._weights = array("q")
+        # merge repeated edges: the first one keeps its place, the last one gives the weight
+        write = 0
+        start = 0
+        for node_id in range(number_of_nodes):
+            end = offsets[node_id + 1]
+            if len(set(csr_targets[start:end])) == end - start:
+                # no repeated edge, only move the neighbors into place
+                csr_targets[write:write + end - start] = csr_targets[start:end]
+                csr_weights[write:write + end - start] = csr_weights[start:end]
+                write += end - start
+            else:
+                seen = {}
+                for edge in range(start, end):
+                    neighbor = csr_targets[edge]
+                    if neighbor in seen:
+                        csr_weights[seen[neighbor]] = csr_weights[edge]
+                    else:
+                        seen[neighbor] = write
+                        csr_targets[write] = neighbor
+                        csr_weights[write] = csr_weights[edge]
+                        write += 1
+            start = end
+            offsets[node_id + 1] = write
+        del csr_targets[write:]
+        del csr_weights[write:]
+        labels, self._labels, self._index = self._labels, [], {}
+        compiled = CompiledGraph(labels, offsets, csr_targets, csr_weights, directed=self.directed)
+        # label every node with its component's root, the same labels CompiledGraph.components() computes
+        parent, self._parent = self._parent, array("q")
+        compiled._cache["components"] = array("q", (_find_root(parent, node_id) for node_id in range(number_of_nodes)))
+        return compiled
+
+
+def iter_edges(source):
+    """
+    read graph edges from a file, one record at a time.
+
+    every line holds one edge formatted as (node, node=weight), or several of them joined with '+' like the input of
+    get_input_edges. blank lines and lines starting with '#' are skipped.
+
+    args:
+    source (str, os.PathLike or file object): the path of the file, or an open text file such as sys.stdin.
+
+    returns:
+    generator: (node, node, weight) tuples with integer weights, in file order.
+
+    raises:
+    ValueError: if a record is not a valid edge, with its line number.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8") as file:
+            yield from iter_edges(file)
+        return
+    match_edge = EDGE_PATTERN.match
+    for line_number, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        for record in line.split("+"):
+            if match := match_edge(record.strip()):
+                u, v, weight = match.groups()
+                yield u, v, int(weight)
+            else:
+                raise ValueError(f"Invalid edge on line {line_number}: {record.strip()!r}")
+
+
+def load_graph(source, directed: bool = False):
+    """
+    load a graph from an edge list file straight into a CompiledGraph.
+
+    the edges are parsed line by line and added to a GraphBuilder as they are read, so memory stays close to the size
+    of the final graph instead of holding the text, a list of edges and a NetworkX graph at the same time.
+
+    args:
+    source (str, os.PathLike or file object): the edge list, in the format read by iter_edges().
+    directed (bool): whether the edges are directed.
+
+    returns:
+    CompiledGraph: the loaded graph.
+    """
+    builder = GraphBuilder(directed=directed)
+    builder.add_edges_from(iter_edges(source))
+    if not len(builder):
+        raise ValueError("No graph edges provided")
+    return builder.build()
+
+
+# the header of a binary graph file: magic, version, flags, number of nodes, number of CSR entries,
+# size of the label bytes and CRC-32 checksum of everything after the header
+GRAPH_FILE_MAGIC = b"AISGRAPH"
+GRAPH_FILE_VERSION = 1
+_GRAPH_FILE_HEADER = struct.Struct("<8sIIQQQI28x")
+_DIRECTED_FLAG = 1
+_BIG_ENDIAN_FLAG = 2
+_FLOAT_WEIGHTS_FLAG = 4
+
+
+def save_graph(graph, path):
+    """
+    write a graph to a binary file that open_graph() can memory-map.
+
+    the file holds a header with the format version and a checksum, the CSR offset, target and weight arrays, and
+    the node labels with an index sorted by label for lookups.
+
+    args:
+    graph (nx.Graph or CompiledGraph): the graph to save, its node labels must be strings.
+    path (str or os.PathLike): the path of the file to write.
+    """
+    compiled = compile_graph(graph)
+    labels = list(compiled.labels)
+    if not all(isinstance(label, str) for label in labels):
+        raise ValueError("Only graphs with string node labels can be saved")
+    encoded_labels = [label.encode("utf-8") for label in labels]
+    label_offsets = array("q", [0])
+    for encoded_label in encoded_labels:
+        label_offsets.append(label_offsets[-1] + len(encoded_label))
+    label_order = array("q", sorted(range(len(labels)), key=encoded_labels.__getitem__))
+    weight_typecode = _weight_typecode(compiled.weights)
+    sections = [array("q", compiled.offsets), array("q", compiled.targets), array(weight_typecode, compiled.weights),
+                label_offsets, label_order]
+    label_bytes = b"".join(encoded_labels)
+    checksum = 0
+    for section in sections:
+        checksum = zlib.crc32(section, checksum)
+    checksum = zlib.crc32(label_bytes, checksum)
+    flags = ((_DIRECTED_FLAG if compiled.directed else 0) | (_BIG_ENDIAN_FLAG if sys.byteorder == "big" else 0)
+             | (_FLOAT_WEIGHTS_FLAG if weight_typecode == "d" else 0))
+    with open(path, "wb") as file:
+        file.write(_GRAPH_FILE_HEADER.pack(GRAPH_FILE_MAGIC, GRAPH_FILE_VERSION, flags, len(labels),
+                                           len(compiled.targets), len(label_bytes), checksum))
+        for section in sections:
+            section.tofile(file)
+        file.write(label_bytes)
+
+
+class _MappedLabels:
+    # the node labels of a MappedGraph, decoded from the mapped file only when they are used
+
+    def __init__(self, label_offsets: memoryview, label_order: memoryview, label_bytes: memoryview):
+        self._offsets = label_offsets
+        self._order = label_order
+        self._bytes = label_bytes
+
+    def __len__(self):
+        return len(self._order)
+
+    def _encoded(self, node_id: int):
+        return bytes(self._bytes[self._offsets[node_id]:self._offsets[node_id + 1]])
+
+    def __getitem__(self, node_id: int):
+        if not 0 <= node_id < len(self._order):
+            raise IndexError(node_id)
+        return str(self._encoded(node_id), "utf-8")
+
+    def __iter__(self):
+        return (self[node_id] for node_id in range(len(self)))
+
+    def find(self, label):
+        # binary search the label in the sorted order, returns its node id or None
+        if not isinstance(label, str):
+            return None
+        encoded_label = label.encode("utf-8")
+        low, high = 0, len(self._order)
+        while low < high:
+            middle = (low + high) // 2
+            if self._encoded(self._order[middle]) < encoded_label:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._order) and self._encoded(self._order[low]) == encoded_label:
+            return self._order[low]
+        return None
+
+
+class _MappedIndex:
+    # the label to node id mapping of a MappedGraph, answered by binary search instead of a dictionary
+
+    def __init__(self, labels: _MappedLabels):
+        self._labels = labels
+
+    def get(self, label, default=None):
+        node_id = self._labels.find(label)
+        return default if node_id is None else node_id
+
+    def __contains__(self, label):
+        return self._labels.find(label) is not None
+
+    def __getitem__(self, label):
+        node_id = self._labels.find(label)
+        if node_id is None:
+            raise KeyError(label)
+        return node_id
+
+
+class MappedGraph(CompiledGraph):
+    """
+    a CompiledGraph whose arrays are memory-mapped from a file written by save_graph().
+
+    opening one reads only the header: the searches index the mapped arrays directly and the operating system
+    loads the pages they touch, so processes that open the same file share the pages in the OS cache.
+    use open_graph() to open one, and close() (or a with statement) to release the file.
+    """
+    __slots__ = ("path", "_file", "_mmap", "_views")
+
+    def __init__(self, path, verify: bool = False, labels: list = None):
+        self.path = os.fspath(path)
+        self._file = open(path, "rb")
+        try:
+            header = self._file.read(_GRAPH_FILE_HEADER.size)
+            if len(header) < _GRAPH_FILE_HEADER.size:
+                raise ValueError(f"{path} is not a graph file")
+            magic, version, flags, number_of_nodes, number_of_entries, labels_size, checksum = \
+                _GRAPH_FILE_HEADER.unpack(header)
+            if magic != GRAPH_FILE_MAGIC:
+                raise ValueError(f"{path} is not a graph file")
+            if version != GRAPH_FILE_VERSION:
+                raise ValueError(f"Unsupported graph file version {version}")
+            if bool(flags & _BIG_ENDIAN_FLAG) != (sys.byteorder == "big"):
+                raise ValueError(f"{path} was written on a machine with a different byte order")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            # a truncated or extended file would shift the arrays, check its size against the header
+            expected_size = (_GRAPH_FILE_HEADER.size + 8 * (3 * number_of_nodes + 2 + 2 * number_of_entries)
+                             + labels_size)
+            if len(self._mmap) != expected_size:
+                size = len(self._mmap)
+                self._mmap.close()
+                raise ValueError(f"{path} is truncated or corrupted, it holds {size} bytes instead of {expected_size}")
+        except Exception:
+            self._file.close()
+            raise
+        payload = memoryview(self._mmap)[_GRAPH_FILE_HEADER.size:]
+        if verify and zlib.crc32(payload) != checksum:
+            payload.release()
+            self.close()
+            raise ValueError(f"{path} is corrupted, its checksum does not match")
+        # slice the payload into the arrays written by save_graph
+        views = [payload]
+        position = 0
+        weight_typecode = "d" if flags & _FLOAT_WEIGHTS_FLAG else "q"
+        for length, typecode in ((number_of_nodes + 1, "q"), (number_of_entries, "q"),
+                                 (number_of_entries, weight_typecode), (number_of_nodes + 1, "q"),
+                                 (number_of_nodes, "q")):
+            views.append(payload[position:position + 8 * length].cast(typecode))
+            position += 8 * length
+        views.append(payload[position:position + labels_size])
+        self._views = views
+        _, self.offsets, self.targets, self.weights, label_offsets, label_order, label_bytes = views
+        if labels is None:
+            self.labels = _MappedLabels(label_offsets, label_order, label_bytes)
+            self.index = _MappedIndex(self.labels)
+        else:
+            # the labels the file was saved from, which it only holds as strings
+            if len(labels) != number_of_nodes:
+                self.close()
+                raise ValueError(f"{path} holds {number_of_nodes} nodes, not {len(labels)}")
+            self.labels = list(labels)
+            self.index = {label: node_id for node_id, label in enumerate(self.labels)}
+        self.directed = bool(flags & _DIRECTED_FLAG)
+        self._cache = {}
+
+    def close(self):
+        # release the memory-mapped file, the graph cannot be searched afterwards
+        for view in reversed(getattr(self, "_views", [])):
+            view.release()
+        self._views = []
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_graph(path, verify: bool = False, labels: list = None):
+    """
+    open a graph file written by save_graph() without parsing it.
+
+    args:
+    path (str or os.PathLike): the path of the graph file.
+    verify (bool): whether to check the checksum, which reads the whole file once.
+    labels (list, optional): the node labels by node id to search the graph under instead of the labels in the file,
+    see share_graph.
+
+    returns:
+    MappedGraph: a compiled graph backed by the memory-mapped file, accepted by all the searches.
+    """
+    return MappedGraph(path, verify=verify, labels=labels)
+
+
+def share_graph(graph, directory):
+    """
+    write a graph to a file that worker processes can memory-map with open_graph().
+
+    a MappedGraph is shared as the file it was opened from. save_graph only writes string labels, so the labels of
+    any other graph are written as str(label) and returned, and the workers open the file with
+    open_graph(path, labels=labels) to search it under the labels of the graph.
+
+    args:
+    graph (nx.Graph, CompiledGraph or MappedGraph): the graph to share.
+    directory (str or os.PathLike): the directory the file is written to, such as a temporary directory.
+
+    returns:
+    tuple: the path of the graph file, and the node labels to open it with or None if the file holds them.
+    """
+    if isinstance(graph, MappedGraph):
+        return graph.path, None if isinstance(graph.labels, _MappedLabels) else graph.labels
+    compiled = compile_graph(graph)
+    labels = None
+    if not all(isinstance(label, str) for label in compiled.labels):
+        labels = compiled.labels
+        compiled = CompiledGraph([str(label) for label in labels], compiled.offsets, compiled.targets,
+                                 compiled.weights, compiled.directed)
+    path = os.path.join(directory, "graph.bin")
+    save_graph(compiled, path)
+    return path, labels
+
+
+def _edgeless_graph(nodes: list):
+    # a CompiledGraph of the given nodes without any edge, every node labeled as its own component
+    labels = list(dict.fromkeys(nodes))
+    compiled = CompiledGraph(labels, array("q", [0]) * (len(labels) + 1), array("q"), array("q"))
+    compiled._cache["components"] = array("q", range(len(labels)))
+    return compiled
+
+
+def _prepare_search(graph, start_node, goal_nodes, stats=None):
+    # validate the search arguments and translate them to the compiled graph ids
+    start_time = None if stats is None else time.perf_counter()
     # check if graph is empty
     if graph is None:
         raise ValueError("Empty graph")
@@ -160,35 +1215,608 @@ def bfs(graph: nx.Graph, start_node: str, goal_nodes: list):
     for node in goal_nodes:
         if not graph.has_node(node):
             raise ValueError(f"Goal node {node} is not in graph")
-    # initialize a queue to store the current node, cost, and path
-    fringe = [(start_node, 0, [start_node])]
-    # create a set to keep track of visited nodes
-    visited = set()
+    if (goal_nodes and isinstance(graph, ComponentGraph) and graph.tracks_components()
+            and not any(graph.connected(start_node, node) for node in goal_nodes)):
+        # no goal node is in the start node's component: search a graph of only these nodes, without edges,
+        # which every search rejects at once, instead of compiling the whole graph
+        compiled = _edgeless_graph([start_node, *goal_nodes])
+    else:
+        compiled = compile_graph(graph)
+    start_id = compiled.node_id(start_node)
+    goal_ids = {compiled.node_id(node) for node in goal_nodes}
+    if stats is not None:
+        stats.setup_seconds = time.perf_counter() - start_time
+    return compiled, start_id, goal_ids
+
+
+def _dijkstra_distances(compiled: CompiledGraph, sources: list):
+    # distances from the nearest of the source nodes to every node, float('inf') for unreachable nodes
+    offsets, targets, weights = compiled.offsets, compiled.targets, compiled.weights
+    distance = [float('inf')] * len(compiled)
+    fringe = []
+    for source in sources:
+        distance[source] = 0
+        fringe.append((0, source))
+    heapq.heapify(fringe)
+    while fringe:
+        cost, node = heapq.heappop(fringe)
+        if cost > distance[node]:
+            continue
+        for edge in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[edge]
+            new_cost = cost + weights[edge]
+            if new_cost < distance[neighbor]:
+                distance[neighbor] = new_cost
+                heapq.heappush(fringe, (new_cost, neighbor))
+    return distance
+
+
+def _reconstruct_path(compiled: CompiledGraph, came_from: dict, node: int):
+    # follow the predecessor map back from node to the start node and return the path as node labels
+    path = [node]
+    while (node := came_from.get(node)) is not None:
+        path.append(node)
+    path.reverse()
+    return [compiled.label(node_id) for node_id in path]
+
+
+def _timed_path(compiled: CompiledGraph, came_from: dict, node: int, stats):
+    # reconstruct the path to node, recording the time it takes in stats
+    if stats is None:
+        return _reconstruct_path(compiled, came_from, node)
+    start_time = time.perf_counter()
+    path = _reconstruct_path(compiled, came_from, node)
+    stats.reconstruction_seconds = time.perf_counter() - start_time
+    return path
+
+
+class SearchStats:
+    """
+    statistics collected by a search that was given a SearchStats object.
+
+    the searches only look at their stats argument when it is not None, so collecting statistics
+    costs nothing unless it is asked for.
+
+    attributes:
+    expanded (int): the number of nodes the search expanded.
+    generated (int): the number of entries pushed onto the fringe.
+    duplicates (int): the fringe entries that were skipped when popped because their node was already expanded.
+    peak_fringe (int): the largest number of entries the fringe held.
+    peak_visited (int): the largest number of nodes the search kept as visited.
+    heuristic_evaluations (int): the number of heuristic estimates computed by a_star.
+    setup_seconds (float): the time spent validating the arguments and compiling the graph.
+    search_seconds (float): the time spent searching, without the path reconstruction.
+    reconstruction_seconds (float): the time spent reconstructing the path.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_weighted_edges_from([('A', 'B', 1), ('A', 'C', 2), ('B', 'D', 3), ('C', 'D', 1)])
+    >>> stats = SearchStats()
+    >>> ucs(G, 'A', ['D'], stats=stats)
+    (3, ['A', 'C', 'D'])
+    >>> stats.expanded, stats.generated, stats.duplicates
+    (4, 5, 0)
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.peak_fringe = 0
+        self.peak_visited = 0
+        self.heuristic_evaluations = 0
+        self.setup_seconds = 0.0
+        self.search_seconds = 0.0
+        self.reconstruction_seconds = 0.0
+
+    def _record(self, expanded: int, generated: int, fringe: int, visited: int):
+        # update the counters at a node expansion
+        self.expanded = expanded
+        self.generated = generated
+        if fringe > self.peak_fringe:
+            self.peak_fringe = fringe
+        if visited > self.peak_visited:
+            self.peak_visited = visited
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __str__(self):
+        text = (f"{self.expanded} expanded, {self.generated} generated, {self.duplicates} duplicate pushes, "
+                f"peak fringe {self.peak_fringe}, peak visited {self.peak_visited}")
+        if self.heuristic_evaluations:
+            text += f", {self.heuristic_evaluations} heuristic evaluations"
+        return (text + f", setup {self.setup_seconds * 1000:.2f} ms, search {self.search_seconds * 1000:.2f} ms, "
+                f"path {self.reconstruction_seconds * 1000:.2f} ms")
+
+
+def _progress_every(progress, budget=None):
+    # the number of expansions between two steps of a search generator driven for a progress function,
+    # a budget checks its limits on every expansion
+    if budget is not None:
+        return 1
+    return 0 if progress is None else PROGRESS_INTERVAL
+
+
+def _run_search(steps, progress, budget, stats=None):
+    # drive the generator of a search function, under its budget if it has one
+    start_time = None if stats is None else time.perf_counter()
+    if budget is None:
+        result = run_steps(steps, progress)
+    else:
+        result = budget.run(steps, progress)
+    if stats is not None:
+        stats.search_seconds = time.perf_counter() - start_time - stats.reconstruction_seconds
+    return result
+
+
+def run_steps(steps, progress=None):
+    """
+    run a search generator to the end and return its result.
+
+    args:
+    steps (generator): a generator returned by search_steps.
+    progress (function, optional): called with the number of expanded nodes of every step the generator yields,
+    it can stop the search by raising SearchCancelled.
+
+    returns:
+    tuple: the cost and path found by the search, (None, None) if no path is found.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_weighted_edges_from([('A', 'B', 1), ('A', 'C', 2), ('B', 'D', 3), ('C', 'D', 1)])
+    >>> run_steps(search_steps("UCS", G, 'A', ['D']))
+    (3, ['A', 'C', 'D'])
+    """
+    while True:
+        try:
+            step = next(steps)
+        except StopIteration as stop:
+            return stop.value
+        if progress is not None:
+            progress(step.expanded)
+
+
+# a rough number of bytes a search holds for every fringe entry or expanded node
+SEARCH_NODE_BYTES = 200
+
+
+class SearchResult(tuple):
+    """
+    the (cost, path) result of a search that ran under a SearchBudget.
+
+    it unpacks and compares like the plain (cost, path) tuple, and also tells whether the search was stopped
+    by one of the budget limits. a truncated search has neither cost nor path.
+
+    attributes:
+    truncated (bool): True if a limit stopped the search before it finished.
+    reason (str or None): the limit that stopped the search, one of "expanded", "frontier", "memory" or "deadline".
+    stats (dict): the number of expanded nodes, the fringe size, the estimated memory in bytes
+    and the seconds the search ran when it stopped.
+    """
+
+    def __new__(cls, cost, path, truncated: bool = False, reason: str = None, stats: dict = None):
+        result = super().__new__(cls, (cost, path))
+        result.truncated = truncated
+        result.reason = reason
+        result.stats = stats or {}
+        return result
+
+    @property
+    def cost(self):
+        return self[0]
+
+    @property
+    def path(self):
+        return self[1]
+
+
+class SearchBudget:
+    """
+    limits that stop a search cleanly instead of letting it run unbounded.
+
+    every limit is optional, a search run under a budget returns a SearchResult that is marked as truncated
+    when a limit was hit. the memory limit is checked against an estimate of SEARCH_NODE_BYTES per fringe entry
+    and expanded node, which is cheap enough to check on every expansion.
+
+    args:
+    max_expanded (int, optional): the largest number of nodes the search may expand.
+    max_frontier (int, optional): the largest number of entries the fringe may hold.
+    max_memory (int, optional): the largest estimated number of bytes the search may hold.
+    max_seconds (float, optional): the wall-clock seconds after which the search is stopped.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_weighted_edges_from([('A', 'B', 1), ('A', 'C', 2), ('B', 'D', 3), ('C', 'D', 1)])
+    >>> result = ucs(G, 'A', ['D'], budget=SearchBudget(max_expanded=2))
+    >>> result, result.truncated, result.reason
+    ((None, None), True, 'expanded')
+    """
+
+    def __init__(self, max_expanded: int = None, max_frontier: int = None, max_memory: int = None,
+                 max_seconds: float = None):
+        for name, limit in (("max_expanded", max_expanded), ("max_frontier", max_frontier),
+                            ("max_memory", max_memory), ("max_seconds", max_seconds)):
+            if limit is not None and limit < 0:
+                raise ValueError(f"{name} must not be negative")
+        self.max_expanded = max_expanded
+        self.max_frontier = max_frontier
+        self.max_memory = max_memory
+        self.max_seconds = max_seconds
+
+    def run(self, steps, progress=None):
+        """
+        run a search generator until it finishes or a limit is hit.
+
+        the limits are checked on every step the generator yields, so it should be started with every=1.
+
+        args:
+        steps (generator): a generator returned by search_steps.
+        progress (function, optional): called with the number of expanded nodes every PROGRESS_INTERVAL
+        expansions, it can stop the search by raising SearchCancelled.
+
+        returns:
+        SearchResult: the cost and path found by the search, (None, None) if no path is found or a limit was hit.
+        """
+        start_time = time.perf_counter()
+        deadline = None if self.max_seconds is None else start_time + self.max_seconds
+        step = None
+        while True:
+            try:
+                step = next(steps)
+            except StopIteration as stop:
+                return SearchResult(*stop.value, stats=self._stats(step, start_time))
+            if progress is not None and not step.expanded % PROGRESS_INTERVAL:
+                progress(step.expanded)
+            # check the limits, the node of this step is not expanded yet
+            if self.max_expanded is not None and step.expanded > self.max_expanded:
+                reason = "expanded"
+            elif self.max_frontier is not None and step.frontier > self.max_frontier:
+                reason = "frontier"
+            elif self.max_memory is not None and (step.frontier + step.expanded) * SEARCH_NODE_BYTES > self.max_memory:
+                reason = "memory"
+            elif deadline is not None and time.perf_counter() > deadline:
+                reason = "deadline"
+            else:
+                continue
+            steps.close()
+            return SearchResult(None, None, truncated=True, reason=reason, stats=self._stats(step, start_time))
+
+    @staticmethod
+    def _stats(step, start_time: float):
+        # the partial statistics of a search at its last step
+        expanded, frontier = (0, 0) if step is None else (step.expanded, step.frontier)
+        return {"expanded": expanded, "frontier": frontier, "memory": (expanded + frontier) * SEARCH_NODE_BYTES,
+                "seconds": time.perf_counter() - start_time}
+
+
+def bfs(graph: nx.Graph | CompiledGraph, start_node: str, goal_nodes: list, progress=None,
+        budget=None, stats=None):
+    """
+    perform Breadth-First Search (BFS) on a graph to find a path from the start node to one of the goal nodes.
+
+    args:
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
+    start_node (str): the starting node for BFS.
+    goal_nodes (list): a list of nodes to reach using BFS.
+    progress (function, optional): called with the number of expanded nodes every PROGRESS_INTERVAL expansions,
+    it can stop the search by raising SearchCancelled.
+    budget (SearchBudget, optional): limits on the expanded nodes, fringe size, memory and time of the search,
+    with a budget the search returns a SearchResult.
+    stats (SearchStats, optional): filled with the statistics of the search.
+
+    returns:
+    tuple or None: a tuple containing the cost and path if a path is found; otherwise, returns None.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
+    >>> s_node = 'A'
+    >>> g_nodes = ['D', 'C']
+    >>> bfs(G, s_node, g_nodes)
+    (1, ['A', 'B', 'D'])
+    """
+    compiled, start_id, goal_ids = _prepare_search(graph, start_node, goal_nodes, stats)
+    steps = _bfs_steps(compiled, start_id, goal_ids, _progress_every(progress, budget), stats)
+    return _run_search(steps, progress, budget, stats)
+
+
+def _bfs_steps(compiled: CompiledGraph, start_id: int, goal_ids: set, every: int, stats=None):
+    # the Breadth-First Search generator behind bfs and search_steps
+    if not compiled.may_reach(start_id, goal_ids):
+        # no goal node is in the start node's component
+        return None, None
+    offsets, targets, weights = compiled.offsets, compiled.targets, compiled.weights
+    # initialize a queue to store the current node and its cost
+    fringe = deque([(start_id, 0)])
+    # map every discovered node to its predecessor, the first discovery is the one BFS dequeues first
+    came_from = {start_id: None}
+    expanded = 0
     while fringe:
-        node, cost, path = fringe.pop(0)
+        node, cost = fringe.popleft()
+        expanded += 1
+        if stats is not None:
+            stats._record(expanded, len(came_from), len(fringe) + 1, len(came_from))
+        if every and not expanded % every:
+            yield SearchStep(compiled.label(node), len(fringe), cost, expanded)
         # if the current node is one of the goal nodes, return the cost and path to this goal node
-        if node in goal_nodes:
+        if node in goal_ids:
             # return cost and path to this goal node
-            return cost, path
-        visited.add(node)
+            return cost, _timed_path(compiled, came_from, node, stats)
         # explore neighboring nodes
-        for neighbor in graph.neighbors(node):
-            if neighbor not in visited:
-                new_cost = cost + int(graph[node][neighbor]['weight'])
-                new_path = path + [neighbor]
-                fringe.append((neighbor, new_cost, new_path))
+        for edge in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[edge]
+            if neighbor not in came_from:
+                came_from[neighbor] = node
+                fringe.append((neighbor, cost + weights[edge]))
     # if no path is found, return None
     return None, None
 
 
-def dfs(graph: nx.Graph, start_node: str, goal_nodes: list):
+def _level_bfs_steps(compiled: CompiledGraph, start_id: int, goal_ids: set = None, every: int = 0, stats=None):
+    # advance a whole BFS level at a time with numpy over the CSR arrays, in the exact order bfs dequeues nodes,
+    # yielding a SearchStep before the level in which the expanded nodes pass a multiple of `every`.
+    # returns the hop distances (-1 for unreached nodes), the parents and parent edges (-1 for none)
+    # and the first goal node bfs would dequeue, or None
+    if np is None:
+        raise ImportError("vectorized_bfs needs numpy, install it with: pip install numpy")
+    offsets = np.frombuffer(compiled.offsets, dtype=np.int64)
+    targets = np.frombuffer(compiled.targets, dtype=np.int64)
+    number_of_nodes = len(compiled)
+    visited = np.zeros(number_of_nodes, dtype=bool)
+    distances = np.full(number_of_nodes, -1, dtype=np.int64)
+    parents = np.full(number_of_nodes, -1, dtype=np.int64)
+    parent_edges = np.full(number_of_nodes, -1, dtype=np.int64)
+    goal_mask = None
+    if goal_ids is not None:
+        goal_mask = np.zeros(number_of_nodes, dtype=bool)
+        goal_mask[list(goal_ids)] = True
+    visited[start_id] = True
+    distances[start_id] = 0
+    frontier = np.array([start_id], dtype=np.int64)
+    level = 0
+    expanded, discovered = 0, 1
+    while frontier.size:
+        # the nodes of this level count as expanded before it is expanded, like the node of a bfs step
+        previous, expanded = expanded, expanded + int(frontier.size)
+        if stats is not None:
+            stats._record(expanded, discovered, int(frontier.size), discovered)
+        if every and expanded // every > previous // every:
+            yield SearchStep(compiled.label(int(frontier[-1])), int(frontier.size), level, expanded)
+        if goal_mask is not None:
+            # the first goal node of the level in queue order is the one bfs returns
+            found = np.flatnonzero(goal_mask[frontier])
+            if found.size:
+                return distances, parents, parent_edges, int(frontier[found[0]])
+        # list every edge of the frontier, node by node in queue order and edge by edge in CSR order
+        starts = offsets[frontier]
+        counts = offsets[frontier + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            break
+        edges = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+        sources = np.repeat(frontier, counts)
+        neighbors = targets[edges]
+        # keep the first edge that reaches every unvisited neighbor, in discovery order
+        unvisited = ~visited[neighbors]
+        neighbors, sources, edges = neighbors[unvisited], sources[unvisited], edges[unvisited]
+        _, first = np.unique(neighbors, return_index=True)
+        first.sort()
+        frontier = neighbors[first]
+        level += 1
+        discovered += int(frontier.size)
+        visited[frontier] = True
+        distances[frontier] = level
+        parents[frontier] = sources[first]
+        parent_edges[frontier] = edges[first]
+    return distances, parents, parent_edges, None
+
+
+def hop_distances(graph: nx.Graph | CompiledGraph, start_node: str):
+    """
+    compute the number of edges from the start node to every node with a vectorized level-synchronous BFS.
+
+    needs numpy. the arrays are indexed by the node ids of the compiled graph, use compile_graph(graph).label(i)
+    and compile_graph(graph).node_id(label) to translate between node ids and nodes.
+
+    args:
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
+    start_node (str): the starting node for BFS.
+
+    returns:
+    tuple: numpy arrays with the hop distance of every node (-1 for nodes that cannot be reached)
+    and the node id of its BFS parent (-1 for the start node and nodes that cannot be reached).
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
+    >>> distances, parents = hop_distances(G, 'A')
+    >>> distances.tolist(), parents.tolist()
+    ([0, 1, 1, 2], [-1, 0, 0, 1])
+    """
+    compiled, start_id, _ = _prepare_search(graph, start_node, [])
+    distances, parents, _, _ = run_steps(_level_bfs_steps(compiled, start_id))
+    return distances, parents
+
+
+def vectorized_bfs(graph: nx.Graph | CompiledGraph, start_node: str, goal_nodes: list, progress=None,
+                   budget=None, stats=None):
+    """
+    perform Breadth-First Search (BFS) a whole level at a time with numpy array operations.
+
+    the result is the same as the result of bfs, but every level of the search costs a few array operations
+    instead of Python work per edge, which is much faster on graphs with millions of edges. needs numpy.
+    the progress function and the budget are checked between levels, a level is expanded as a whole.
+
+    args:
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
+    start_node (str): the starting node for BFS.
+    goal_nodes (list): a list of nodes to reach using BFS.
+    progress (function, optional): called with the number of expanded nodes about every PROGRESS_INTERVAL
+    expansions, it can stop the search by raising SearchCancelled.
+    budget (SearchBudget, optional): limits on the expanded nodes, fringe size, memory and time of the search,
+    with a budget the search returns a SearchResult.
+    stats (SearchStats, optional): filled with the statistics of the search.
+
+    returns:
+    tuple or None: a tuple containing the cost and path if a path is found; otherwise, returns None.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
+    >>> vectorized_bfs(G, 'A', ['D'])
+    (4, ['A', 'B', 'D'])
+    """
+    compiled, start_id, goal_ids = _prepare_search(graph, start_node, goal_nodes, stats)
+    steps = _vectorized_bfs_steps(compiled, start_id, goal_ids, _progress_every(progress, budget), stats)
+    return _run_search(steps, progress, budget, stats)
+
+
+def _vectorized_bfs_steps(compiled: CompiledGraph, start_id: int, goal_ids: set, every: int, stats=None):
+    # the level-synchronous Breadth-First Search generator behind vectorized_bfs
+    if not compiled.may_reach(start_id, goal_ids):
+        # no goal node is in the start node's component
+        return None, None
+    _, parents, parent_edges, goal_id = yield from _level_bfs_steps(compiled, start_id, goal_ids, every, stats)
+    if goal_id is None:
+        # if no path is found, return None
+        return None, None
+    start_time = None if stats is None else time.perf_counter()
+    # follow the parent array back to the start node
+    path, cost = [goal_id], 0
+    node = goal_id
+    while node != start_id:
+        cost += compiled.weights[parent_edges[node]]
+        node = int(parents[node])
+        path.append(node)
+    path.reverse()
+    path = [compiled.label(node_id) for node_id in path]
+    if stats is not None:
+        stats.reconstruction_seconds = time.perf_counter() - start_time
+    return cost, path
+
+
+def _join_paths(compiled: CompiledGraph, came_from: dict, came_to: dict, meeting: int, stats=None):
+    # join the forward path from the start node to meeting with the backward path from meeting to a goal node,
+    # recording the time it takes in stats
+    start_time = None if stats is None else time.perf_counter()
+    path = _reconstruct_path(compiled, came_from, meeting)
+    node = came_to.get(meeting)
+    while node is not None:
+        path.append(compiled.label(node))
+        node = came_to.get(node)
+    if stats is not None:
+        stats.reconstruction_seconds = time.perf_counter() - start_time
+    return path
+
+
+def bidirectional_bfs(graph: nx.Graph | CompiledGraph, start_node: str, goal_nodes: list, progress=None,
+                      budget=None, stats=None):
+    """
+    perform a bidirectional Breadth-First Search to find a path with the fewest edges from the start node
+    to one of the goal nodes.
+
+    one search grows from the start node and one grows backwards from the goal nodes, each step expands a whole
+    level of the smaller frontier, and the search stops once the level in which both searches meet is finished.
+    on large sparse graphs both searches together explore far fewer nodes than a single BFS.
+
+    args:
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
+    start_node (str): the starting node for the search.
+    goal_nodes (list): a list of nodes to reach during the search.
+    progress (function, optional): called with the number of nodes both searches expanded every
+    PROGRESS_INTERVAL expansions, it can stop the search by raising SearchCancelled.
+    budget (SearchBudget, optional): limits on the expanded nodes, fringe size, memory and time of the search,
+    with a budget the search returns a SearchResult.
+    stats (SearchStats, optional): filled with the statistics of the search.
+
+    returns:
+    tuple or None: a tuple containing the cost and path if a path is found; otherwise, returns None.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
+    >>> bidirectional_bfs(G, 'A', ['D'])
+    (4, ['A', 'B', 'D'])
+    """
+    compiled, start_id, goal_ids = _prepare_search(graph, start_node, goal_nodes, stats)
+    steps = _bidirectional_bfs_steps(compiled, start_id, goal_ids, _progress_every(progress, budget), stats)
+    return _run_search(steps, progress, budget, stats)
+
+
+def _bidirectional_bfs_steps(compiled: CompiledGraph, start_id: int, goal_ids: set, every: int, stats=None):
+    # the bidirectional Breadth-First Search generator behind bidirectional_bfs
+    if start_id in goal_ids:
+        return 0, [compiled.label(start_id)]
+    if not compiled.may_reach(start_id, goal_ids):
+        # no goal node is in the start node's component
+        return None, None
+    reverse = compiled.reverse()
+    # for every discovered node: the hops and cost to it and the next node towards the start or a goal
+    forward = {start_id: (0, 0)}
+    backward = {goal_id: (0, 0) for goal_id in goal_ids}
+    came_from = {start_id: None}
+    came_to = dict.fromkeys(goal_ids)
+    forward_level, backward_level = [start_id], list(goal_ids)
+    expanded = 0
+    while forward_level and backward_level:
+        # expand the smaller frontier by one full level
+        if len(forward_level) <= len(backward_level):
+            side, level, other, parents, adjacency = forward, forward_level, backward, came_from, compiled
+        else:
+            side, level, other, parents, adjacency = backward, backward_level, forward, came_to, reverse
+        offsets, targets, weights = adjacency.offsets, adjacency.targets, adjacency.weights
+        best = None
+        next_level = []
+        for index, node in enumerate(level):
+            hops, cost = side[node]
+            expanded += 1
+            if stats is not None:
+                discovered = len(forward) + len(backward)
+                stats._record(expanded, discovered, len(forward_level) + len(backward_level) - index + len(next_level),
+                              discovered)
+            if every and not expanded % every:
+                # the nodes left in both levels and the nodes found for the next level
+                frontier = len(forward_level) + len(backward_level) - index - 1 + len(next_level)
+                yield SearchStep(compiled.label(node), frontier, cost, expanded)
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[edge]
+                if neighbor in side:
+                    continue
+                side[neighbor] = (hops + 1, cost + weights[edge])
+                parents[neighbor] = node
+                next_level.append(neighbor)
+                if neighbor in other:
+                    # both searches reached this node, keep the meeting with the fewest edges in this level
+                    total_hops = hops + 1 + other[neighbor][0]
+                    if best is None or total_hops < best[0]:
+                        best = (total_hops, neighbor)
+        if best is not None:
+            meeting = best[1]
+            return (forward[meeting][1] + backward[meeting][1],
+                    _join_paths(compiled, came_from, came_to, meeting, stats))
+        if side is forward:
+            forward_level = next_level
+        else:
+            backward_level = next_level
+    # if no path is found, return None
+    return None, None
+
+
+def dfs(graph: nx.Graph | CompiledGraph, start_node: str, goal_nodes: list, progress=None,
+        budget=None, stats=None):
     """
     perform Depth-First Search (DFS) on a graph to find a path from the start node to one of the goal nodes.
 
     args:
-    graph (nx.DiGraph): a NetworkX Graph object.
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
     start_node (str): the starting node for BFS.
     goal_nodes (list): a list of nodes to reach using BFS.
+    progress (function, optional): called with the number of expanded nodes every PROGRESS_INTERVAL expansions,
+    it can stop the search by raising SearchCancelled.
+    budget (SearchBudget, optional): limits on the expanded nodes, fringe size, memory and time of the search,
+    with a budget the search returns a SearchResult.
+    stats (SearchStats, optional): filled with the statistics of the search.
 
     returns:
     tuple or None: a tuple containing the cost and path if a path is found; otherwise, returns None.
@@ -201,46 +1829,158 @@ def dfs(graph: nx.Graph, start_node: str, goal_nodes: list):
     >>> dfs(G, s_node, g_nodes)
     (1, ['A', 'B', 'D'])
     """
-    # check if graph is empty
-    if graph is None:
-        raise ValueError("Empty graph")
-    # check if start node is not in graph
-    if not graph.has_node(start_node):
-        raise ValueError(f"Start node {start_node} is not in graph")
-    # check if a goal node is not in graph
-    for node in goal_nodes:
-        if not graph.has_node(node):
-            raise ValueError(f"Goal node {node} is not in graph")
-    # initialize a queue to store the current node, cost, and path
-    fringe = [(start_node, 0, [start_node])]
-    # create a set to keep track of visited nodes
-    visited = set()
+    compiled, start_id, goal_ids = _prepare_search(graph, start_node, goal_nodes, stats)
+    steps = _dfs_steps(compiled, start_id, goal_ids, _progress_every(progress, budget), stats)
+    return _run_search(steps, progress, budget, stats)
+
+
+def _dfs_steps(compiled: CompiledGraph, start_id: int, goal_ids: set, every: int, stats=None):
+    # the Depth-First Search generator behind dfs and search_steps
+    if not compiled.may_reach(start_id, goal_ids):
+        # no goal node is in the start node's component
+        return None, None
+    offsets, targets, weights = compiled.offsets, compiled.targets, compiled.weights
+    # initialize a stack to store the current node, its cost and the node it was pushed from
+    fringe = [(start_id, 0, None)]
+    # map every visited node to its predecessor
+    came_from = {}
     while fringe:
-        node, cost, path = fringe.pop()
+        node, cost, parent = fringe.pop()
+        # skip stale entries of nodes that were already visited through a later push
+        if node in came_from:
+            if stats is not None:
+                stats.duplicates += 1
+            continue
+        came_from[node] = parent
+        if stats is not None:
+            visited = len(came_from)
+            stats._record(visited, visited + stats.duplicates + len(fringe), len(fringe) + 1, visited)
+        if every and not len(came_from) % every:
+            yield SearchStep(compiled.label(node), len(fringe), cost, len(came_from))
         # if the current node is one of the goal nodes, return the cost and path to this goal node
-        if node in goal_nodes:
+        if node in goal_ids:
             # return cost and path to this goal node
-            return cost, path
-        visited.add(node)
+            return cost, _timed_path(compiled, came_from, node, stats)
         # explore neighboring nodes
-        for neighbor in graph.neighbors(node):
-            if neighbor not in visited:
-                new_cost = cost + int(graph[node][neighbor]['weight'])
-                new_path = path + [neighbor]
-                fringe.append((neighbor, new_cost, new_path))
+        for edge in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[edge]
+            if neighbor not in came_from:
+                fringe.append((neighbor, cost + weights[edge], node))
     # if no path is found, return None
     return None, None
 
 
-def ucs(graph: nx.Graph, start_node: str, goal_nodes: list):
+class _ShortestPathTree:
+    # the state of a Uniform Cost Search from one start node that can be resumed for other goal nodes.
+    # nodes are settled in exactly the order a fresh search pops them, so the first settled goal of
+    # any goal set is the goal a fresh ucs call returns.
+
+    def __init__(self, compiled: CompiledGraph, start_id: int):
+        self.compiled = compiled
+        self.start_id = start_id
+        # the best known cost from the start node to every node reached so far
+        self.g_score = {start_id: 0}
+        # map every reached node to its predecessor on the best known path
+        self.came_from = {start_id: None}
+        # map every node whose lowest cost is final to the order in which it was settled
+        self.visited = {}
+        # initialize a priority queue (fringe) to store the current cost and node
+        self.fringe = [(0, start_id)]
+
+    def _settle_next(self, stats=None):
+        # pop and expand the next node, returns None once the fringe is empty
+        offsets, targets, weights = self.compiled.offsets, self.compiled.targets, self.compiled.weights
+        g_score, came_from, visited, fringe = self.g_score, self.came_from, self.visited, self.fringe
+        while fringe:
+            # get the node with the minimum cost in the fringe
+            cost, node = heapq.heappop(fringe)
+            # skip stale entries, the node was already expanded with a lower cost
+            if node in visited:
+                if stats is not None:
+                    stats.duplicates += 1
+                continue
+            visited[node] = len(visited)
+            # explore neighboring nodes
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[edge]
+                new_cost = cost + weights[edge]
+                # check if this node has already been reached with a lower cost
+                if neighbor not in visited and new_cost < g_score.get(neighbor, new_cost + 1):
+                    # If not, record the better path and add it to the fringe
+                    g_score[neighbor] = new_cost
+                    came_from[neighbor] = node
+                    heapq.heappush(fringe, (new_cost, neighbor))
+            return node
+        return None
+
+    def steps(self, goal_ids: set, every: int = 1, stats=None):
+        # settle nodes until the first goal node, yielding a SearchStep every `every` settled nodes,
+        # and return the cost and path to that goal node
+        visited = self.visited
+        settled_goals = [goal_id for goal_id in goal_ids if goal_id in visited]
+        if settled_goals:
+            node = min(settled_goals, key=visited.__getitem__)
+        elif not self.compiled.may_reach(self.start_id, goal_ids):
+            # no goal node is in the start node's component
+            return None, None
+        else:
+            node = self._settle_next(stats)
+            while node is not None:
+                if stats is not None:
+                    settled, fringe = len(visited), len(self.fringe)
+                    stats._record(settled, settled + stats.duplicates + fringe, fringe, settled)
+                if every and not len(visited) % every:
+                    yield SearchStep(self.compiled.label(node), len(self.fringe), self.g_score[node], len(visited))
+                if node in goal_ids:
+                    break
+                node = self._settle_next(stats)
+            if node is None:
+                # if no path is found, return None
+                return None, None
+        return self.g_score[node], _timed_path(self.compiled, self.came_from, node, stats)
+
+    def search(self, goal_ids: set, progress=None, budget=None, stats=None):
+        # return the cost and path to the first goal node the search settles
+        return _run_search(self.steps(goal_ids, _progress_every(progress, budget), stats), progress, budget, stats)
+
+    def settle_steps(self, goal_ids: set, every: int = 1, stats=None):
+        # settle nodes until every goal node is settled or the fringe is empty, which proves the rest unreachable,
+        # yielding a SearchStep every `every` settled nodes. the paths are read from the tree afterwards
+        visited = self.visited
+        # goal nodes in another component are never settled, do not search for them
+        may_reach = self.compiled.may_reach
+        remaining = {goal_id for goal_id in goal_ids if goal_id not in visited and may_reach(self.start_id, (goal_id,))}
+        while remaining:
+            node = self._settle_next(stats)
+            if node is None:
+                break
+            if stats is not None:
+                settled, fringe = len(visited), len(self.fringe)
+                stats._record(settled, settled + stats.duplicates + fringe, fringe, settled)
+            if every and not len(visited) % every:
+                yield SearchStep(self.compiled.label(node), len(self.fringe), self.g_score[node], len(visited))
+            remaining.discard(node)
+        return None, None
+
+
+def ucs(graph: nx.Graph | CompiledGraph, start_node: str, goal_nodes: list, progress=None,
+        budget=None, stats=None):
     """
     perform Uniform Cost Search (UCS) on a graph to find the lowest cost path
     from the start node to the goal node.
 
+    the fringe is a binary heap, entries that were superseded by a cheaper path are skipped
+    when they are popped, and every node is expanded at most once (Dijkstra's algorithm).
+
     args:
-    graph (nx.Graph): a NetworkX Graph object with non-negative edge weights.
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph with non-negative edge weights.
     start_node (str): the starting node for UCS.
     goal_node (str): the goal node to reach.
+    progress (function, optional): called with the number of expanded nodes every PROGRESS_INTERVAL expansions,
+    it can stop the search by raising SearchCancelled.
+    budget (SearchBudget, optional): limits on the expanded nodes, fringe size, memory and time of the search,
+    with a budget the search returns a SearchResult.
+    stats (SearchStats, optional): filled with the statistics of the search.
 
     returns:
     tuple or None: a tuple containing the cost and path if a path is found; otherwise, returns None.
@@ -251,52 +1991,171 @@ def ucs(graph: nx.Graph, start_node: str, goal_nodes: list):
     >>> s_node = 'A'
     >>> g_nodes = ['D']
     >>> ucs(G , s_node, g_nodes)
-    (4, ['A', 'C', 'D'])
+    (3, ['A', 'C', 'D'])
     """
-    # check if graph is empty
-    if graph is None:
-        raise ValueError("Empty graph")
-    # check if start node is not in graph
-    if not graph.has_node(start_node):
-        raise ValueError(f"Start node {start_node} is not in graph")
-    # check if a goal node is not in graph
-    for node in goal_nodes:
-        if not graph.has_node(node):
-            raise ValueError(f"Goal node {node} is not in graph")
-    # initialize a list (fringe) to store the current node, cost, and path
-    fringe = [(0, start_node, [start_node])]
+    compiled, start_id, goal_ids = _prepare_search(graph, start_node, goal_nodes, stats)
+    return _ShortestPathTree(compiled, start_id).search(goal_ids, progress, budget, stats)
 
-    while fringe:
-        # find the path with the minimum cost in the fringe
-        min_index = min(range(len(fringe)), key=lambda i: fringe[i][0])
-        cost, node, path = fringe.pop(min_index)
 
-        if node in goal_nodes:
-            # if we've reached the goal node, return the cost and path
-            return cost, path
+def ucs_all_goals(graph: nx.Graph | CompiledGraph, start_node: str, goal_nodes: list, progress=None,
+                  budget=None, stats=None):
+    """
+    perform one Uniform Cost Search from the start node to find the lowest cost path to every goal node.
 
-        # explore neighboring nodes
-        for neighbor in graph.neighbors(node):
-            new_cost = cost + int(graph[node][neighbor]['weight'])
+    instead of stopping at the first goal node, the search keeps expanding until every goal node is settled or the
+    fringe is empty, and all paths are read from the same shortest path tree. this is much cheaper than one ucs call
+    per goal node.
 
-            # check if this node has already been visited with a lower cost
-            if all(new_cost >= c for c, _, _ in fringe):
-                # If not, add it to the fringe
-                new_path = path + [neighbor]
-                fringe.append((new_cost, neighbor, new_path))
+    args:
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph with non-negative edge weights.
+    start_node (str): the starting node for UCS.
+    goal_nodes (list): a list of nodes to reach.
+    progress (function, optional): called with the number of expanded nodes every PROGRESS_INTERVAL expansions,
+    it can stop the search by raising SearchCancelled.
+    budget (SearchBudget, optional): limits on the expanded nodes, fringe size, memory and time of the search,
+    with a budget the result of every goal node is a SearchResult, and the goal nodes that were not reached
+    before a limit was hit are marked as truncated.
+    stats (SearchStats, optional): filled with the statistics of the search.
 
-    # if no path is found, return None
-    return None, None
+    returns:
+    dict: the (cost, path) tuple of every goal node, (None, None) for goal nodes that cannot be reached.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_weighted_edges_from([('A', 'B', 1), ('A', 'C', 2), ('B', 'D', 3), ('C', 'D', 1), ('E', 'F', 1)])
+    >>> ucs_all_goals(G, 'A', ['D', 'B', 'E'])
+    {'D': (3, ['A', 'C', 'D']), 'B': (1, ['A', 'B']), 'E': (None, None)}
+    """
+    compiled, start_id, goal_ids = _prepare_search(graph, start_node, goal_nodes, stats)
+    tree = _ShortestPathTree(compiled, start_id)
+    outcome = _run_search(tree.settle_steps(goal_ids, _progress_every(progress, budget), stats), progress, budget,
+                          stats)
+    start_time = None if stats is None else time.perf_counter()
+    results = {}
+    for goal_node in goal_nodes:
+        goal_id = compiled.node_id(goal_node)
+        if goal_id in tree.visited:
+            result = (tree.g_score[goal_id], _reconstruct_path(compiled, tree.came_from, goal_id))
+            if budget is not None:
+                result = SearchResult(*result, stats=outcome.stats)
+        elif budget is not None:
+            result = SearchResult(None, None, outcome.truncated, outcome.reason, outcome.stats)
+        else:
+            result = (None, None)
+        results[goal_node] = result
+    if stats is not None:
+        stats.reconstruction_seconds = time.perf_counter() - start_time
+    return results
 
 
-def greedy_search(graph: nx.Graph, start_node: str, goal_nodes: list):
+def bidirectional_ucs(graph: nx.Graph | CompiledGraph, start_node: str, goal_nodes: list, progress=None,
+                      budget=None, stats=None):
+    """
+    perform a bidirectional Uniform Cost Search (bidirectional Dijkstra) to find the lowest cost path
+    from the start node to one of the goal nodes.
+
+    a forward search from the start node and a backward search from the goal nodes take turns expanding the cheaper
+    of their fringes. every edge that links the two searches gives a candidate path, and the search stops as soon as
+    the two smallest fringe costs add up to at least the cheapest candidate, which is then optimal.
+
+    args:
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph with non-negative edge weights.
+    start_node (str): the starting node for the search.
+    goal_nodes (list): a list of nodes to reach during the search.
+    progress (function, optional): called with the number of nodes both searches expanded every
+    PROGRESS_INTERVAL expansions, it can stop the search by raising SearchCancelled.
+    budget (SearchBudget, optional): limits on the expanded nodes, fringe size, memory and time of the search,
+    with a budget the search returns a SearchResult.
+    stats (SearchStats, optional): filled with the statistics of the search.
+
+    returns:
+    tuple or None: a tuple containing the cost and path if a path is found; otherwise, returns None.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_weighted_edges_from([('A', 'B', 1), ('A', 'C', 2), ('B', 'D', 3), ('C', 'D', 1)])
+    >>> bidirectional_ucs(G, 'A', ['D'])
+    (3, ['A', 'C', 'D'])
+    """
+    compiled, start_id, goal_ids = _prepare_search(graph, start_node, goal_nodes, stats)
+    steps = _bidirectional_ucs_steps(compiled, start_id, goal_ids, _progress_every(progress, budget), stats)
+    return _run_search(steps, progress, budget, stats)
+
+
+def _bidirectional_ucs_steps(compiled: CompiledGraph, start_id: int, goal_ids: set, every: int, stats=None):
+    # the bidirectional Uniform Cost Search generator behind bidirectional_ucs
+    if start_id in goal_ids:
+        return 0, [compiled.label(start_id)]
+    if not compiled.may_reach(start_id, goal_ids):
+        # no goal node is in the start node's component
+        return None, None
+    reverse = compiled.reverse()
+    # the best known cost from the start node, and to the nearest goal node, of every reached node
+    forward = {start_id: 0}
+    backward = dict.fromkeys(goal_ids, 0)
+    came_from = {start_id: None}
+    came_to = dict.fromkeys(goal_ids)
+    forward_fringe = [(0, start_id)]
+    backward_fringe = [(0, goal_id) for goal_id in goal_ids]
+    heapq.heapify(backward_fringe)
+    forward_visited, backward_visited = set(), set()
+    # the cheapest path found so far and the node where its two halves meet
+    best_cost, meeting = float('inf'), None
+    while forward_fringe and backward_fringe:
+        # stop once no path through the unexpanded nodes can be cheaper than the best one found
+        if forward_fringe[0][0] + backward_fringe[0][0] >= best_cost:
+            break
+        # expand the side with the cheaper fringe
+        if forward_fringe[0][0] <= backward_fringe[0][0]:
+            fringe, visited, side, other, parents, adjacency = (forward_fringe, forward_visited, forward, backward,
+                                                                 came_from, compiled)
+        else:
+            fringe, visited, side, other, parents, adjacency = (backward_fringe, backward_visited, backward, forward,
+                                                                 came_to, reverse)
+        cost, node = heapq.heappop(fringe)
+        if node in visited:
+            if stats is not None:
+                stats.duplicates += 1
+            continue
+        visited.add(node)
+        expanded = len(forward_visited) + len(backward_visited)
+        if stats is not None:
+            fringes = len(forward_fringe) + len(backward_fringe)
+            stats._record(expanded, expanded + stats.duplicates + fringes, fringes + 1, len(forward) + len(backward))
+        if every and not expanded % every:
+            yield SearchStep(compiled.label(node), len(forward_fringe) + len(backward_fringe), cost, expanded)
+        offsets, targets, weights = adjacency.offsets, adjacency.targets, adjacency.weights
+        for edge in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[edge]
+            new_cost = cost + weights[edge]
+            if neighbor not in visited and new_cost < side.get(neighbor, new_cost + 1):
+                side[neighbor] = new_cost
+                parents[neighbor] = node
+                heapq.heappush(fringe, (new_cost, neighbor))
+            # a neighbor reached by the other search links the two halves into a full path
+            if neighbor in other and side[neighbor] + other[neighbor] < best_cost:
+                best_cost = side[neighbor] + other[neighbor]
+                meeting = neighbor
+    if meeting is None:
+        # if no path is found, return None
+        return None, None
+    return best_cost, _join_paths(compiled, came_from, came_to, meeting, stats)
+
+
+def greedy_search(graph: nx.Graph | CompiledGraph, start_node: str, goal_nodes: list, progress=None,
+                  budget=None, stats=None):
     """
     perform Greedy Search on a graph to find the path and cost to one of the goal nodes.
 
     args:
-    graph (nx.Graph): a NetworkX Graph object.
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
     start_node (str): the starting node for the search.
     goal_nodes (list): a list of nodes to reach during the search.
+    progress (function, optional): called with the number of expanded nodes every PROGRESS_INTERVAL expansions,
+    it can stop the search by raising SearchCancelled.
+    budget (SearchBudget, optional): limits on the expanded nodes, fringe size, memory and time of the search,
+    with a budget the search returns a SearchResult.
+    stats (SearchStats, optional): filled with the statistics of the search.
 
     returns:
     tuple or None: a tuple containing the cost and path if a path to a goal node is found; otherwise, returns None.
@@ -311,57 +2170,271 @@ def greedy_search(graph: nx.Graph, start_node: str, goal_nodes: list):
     >>> greedy_search(G, s_node, g_nodes)
     (1, ['A', 'C'])
     """
-    # check if graph is empty
-    if graph is None:
-        raise ValueError("Empty graph")
-    # check if start node is not in graph
-    if not graph.has_node(start_node):
-        raise ValueError(f"Start node {start_node} is not in graph")
-    # check if a goal node is not in graph
-    for node in goal_nodes:
-        if not graph.has_node(node):
-            raise ValueError(f"Goal node {node} is not in graph")
+    compiled, start_id, goal_ids = _prepare_search(graph, start_node, goal_nodes, stats)
+    steps = _greedy_steps(compiled, start_id, goal_ids, _progress_every(progress, budget), stats)
+    return _run_search(steps, progress, budget, stats)
 
-    # initialize a priority queue to store the current node, cost, and path
-    fringe = [(start_node, 0, [start_node])]
-    # create a set to keep track of visited nodes
-    visited = set()
+
+def _greedy_steps(compiled: CompiledGraph, start_id: int, goal_ids: set, every: int, stats=None):
+    # the Greedy Best-First Search generator behind greedy_search and search_steps
+    if not compiled.may_reach(start_id, goal_ids):
+        # no goal node is in the start node's component
+        return None, None
+    offsets, targets, weights = compiled.offsets, compiled.targets, compiled.weights
+
+    # initialize the fringe to store the current node and cost
+    fringe = [(start_id, 0)]
+    # map every visited node to its predecessor
+    came_from = {start_id: None}
 
     while fringe:
-        node, cost, path = fringe.pop()
+        node, cost = fringe.pop()
+        if stats is not None:
+            stats._record(len(came_from), len(came_from), 1, len(came_from))
+        if every and not len(came_from) % every:
+            yield SearchStep(compiled.label(node), len(fringe), cost, len(came_from))
 
         # if the current node is one of the goal nodes, return the cost and path to this goal node
-        if node in goal_nodes:
+        if node in goal_ids:
             # return cost and path to this goal node
-            return cost, path
-        visited.add(node)
+            return cost, _timed_path(compiled, came_from, node, stats)
 
-        # explore neighboring nodes
-        neighbors = list(graph.neighbors(node))
-        # create a list of unvisited neighbors with their edge costs
-        unvisited_neighbors = [(neighbor, graph[node][neighbor]['weight'])
-                               for neighbor in neighbors if neighbor not in visited]
-
-        if unvisited_neighbors:
-            # sort the unvisited neighbors based on their edge cost
-            unvisited_neighbors.sort(key=lambda x: x[1])
-            next_node, edge_cost = unvisited_neighbors[0]
-            new_cost = cost + int(edge_cost)
-            new_path = path + [next_node]
-            fringe.append((next_node, new_cost, new_path))
+        # find the unvisited neighbor with the cheapest edge, the first one wins ties
+        next_node, edge_cost = None, None
+        for edge in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[edge]
+            if neighbor not in came_from and (edge_cost is None or weights[edge] < edge_cost):
+                next_node, edge_cost = neighbor, weights[edge]
+
+        if next_node is not None:
+            came_from[next_node] = node
+            fringe.append((next_node, cost + edge_cost))
 
     # if no path to any goal node is found, return None
     return None, None
 
 
-def a_star(graph, start_node, goal_nodes):
+class GoalDistanceHeuristic:
+    """
+    an admissible heuristic for a_star: the exact distance from a node to the nearest of the goal nodes.
+
+    the distances come from one Dijkstra search that starts at every goal at once and follows the edges backwards.
+    that search grows lazily: prepare() only runs it until the start node of a query is settled, and every node that
+    is not settled yet is estimated with the distance of the last settled node, which is still a lower bound.
+    the table is kept between queries, so later queries on the same graph and goals reuse it. the table grows
+    under a lock, so searches on several threads can share one heuristic.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_edges_from([('A', 'B', {'weight': 2}), ('B', 'C', {'weight': 3})])
+    >>> heuristic = GoalDistanceHeuristic(G, ['C'])
+    >>> heuristic('A')
+    5
+    """
+
+    def __init__(self, graph, goal_nodes: list):
+        self.graph = compile_graph(graph)
+        self._reverse = self.graph.reverse()
+        goal_ids = {self.graph.node_id(node) for node in goal_nodes}
+        if None in goal_ids:
+            raise ValueError("Goal node is not in graph")
+        # settled nodes and their exact distance to the nearest goal
+        self.distance = {}
+        # the best distance found so far for nodes that are still in the fringe
+        self._best = {goal_id: 0 for goal_id in goal_ids}
+        self._fringe = [(0, goal_id) for goal_id in goal_ids]
+        heapq.heapify(self._fringe)
+        # every node that is not settled yet is at least this far from the goals
+        self.radius = 0
+        # two threads growing the table at once could settle a node before its cheapest path is pushed
+        self._lock = threading.Lock()
+
+    def _settle_until(self, node_id: int, limit: int = None):
+        # continue the backward search until node_id is settled or every node that can reach a goal is settled,
+        # or until `limit` more nodes are settled. returns the number of settled nodes, or None once finished
+        offsets, targets, weights = self._reverse.offsets, self._reverse.targets, self._reverse.weights
+        distance, best, fringe = self.distance, self._best, self._fringe
+        settled = 0
+        with self._lock:
+            while node_id not in distance:
+                if not fringe:
+                    # nothing left can reach a goal
+                    self.radius = float('inf')
+                    return None
+                if settled == limit:
+                    return settled
+                cost, node = heapq.heappop(fringe)
+                if node in distance:
+                    continue
+                settled += 1
+                distance[node] = cost
+                self.radius = cost
+                for edge in range(offsets[node], offsets[node + 1]):
+                    neighbor = targets[edge]
+                    new_cost = cost + weights[edge]
+                    if neighbor not in distance and new_cost < best.get(neighbor, new_cost + 1):
+                        best[neighbor] = new_cost
+                        heapq.heappush(fringe, (new_cost, neighbor))
+        return None
+
+    def __getstate__(self):
+        # a lock cannot be pickled, a copy of the table gets its own
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def prepare(self, node_id: int):
+        # settle node_id and return its distance to the nearest goal, or None if it cannot reach one
+        self._settle_until(node_id)
+        return self.distance.get(node_id)
+
+    def prepare_steps(self, node_id: int, every: int):
+        # prepare() as a generator that yields a SearchStep every `every` settled nodes, so a budget, a progress
+        # function or a cancel can stop the backward search, and returns what prepare() returns
+        settled = 0
+        while True:
+            batch = self._settle_until(node_id, every)
+            if batch is None:
+                return self.distance.get(node_id)
+            settled += batch
+            yield SearchStep(self.graph.label(node_id), len(self._fringe), self.radius, settled)
+
+    def estimate(self, node_id: int):
+        # return the lower bound for node_id without growing the table
+        return self.distance.get(node_id, self.radius)
+
+    def __call__(self, node):
+        distance = self.prepare(self.graph.node_id(node))
+        return float('inf') if distance is None else distance
+
+
+class LandmarkHeuristic:
+    """
+    an admissible ALT heuristic for a_star built from landmark distances and the triangle inequality.
+
+    the distances from (and, for directed graphs, to) a few landmark nodes are computed once per graph,
+    then d(node, goal) >= d(L, goal) - d(L, node) and d(node, goal) >= d(node, L) - d(goal, L) for every landmark L.
+    the estimate is the smallest of these lower bounds over the goal nodes, so it stays admissible for all goals.
+    use for_goals() to reuse the landmark tables for another set of goals.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_edges_from([('A', 'B', {'weight': 2}), ('B', 'C', {'weight': 3})])
+    >>> heuristic = LandmarkHeuristic(G, ['C'], landmarks=['A'])
+    >>> heuristic('B')
+    3
+    """
+
+    def __init__(self, graph, goal_nodes: list, landmarks=4):
+        self.graph = compile_graph(graph)
+        self.goal_ids = [self.graph.node_id(node) for node in goal_nodes]
+        if None in self.goal_ids:
+            raise ValueError("Goal node is not in graph")
+        if isinstance(landmarks, int):
+            landmark_ids = self._select_landmarks(landmarks)
+        else:
+            landmark_ids = [self.graph.node_id(node) for node in landmarks]
+            if None in landmark_ids:
+                raise ValueError("Landmark node is not in graph")
+        # distances from every landmark, and to every landmark (the same table on undirected graphs)
+        self._from_landmark = [_dijkstra_distances(self.graph, [landmark]) for landmark in landmark_ids]
+        if self.graph.directed:
+            reverse = self.graph.reverse()
+            self._to_landmark = [_dijkstra_distances(reverse, [landmark]) for landmark in landmark_ids]
+        else:
+            self._to_landmark = self._from_landmark
+        self.landmarks = [self.graph.label(landmark) for landmark in landmark_ids]
+
+    def _select_landmarks(self, count: int):
+        # farthest-point selection: every new landmark is the node farthest from the landmarks chosen so far
+        if not len(self.graph):
+            return []
+        landmarks = []
+        nearest = _dijkstra_distances(self.graph, [self.goal_ids[0] if self.goal_ids else 0])
+        for _ in range(min(count, len(self.graph))):
+            candidates = [node_id for node_id, cost in enumerate(nearest) if cost != float('inf')]
+            landmark = max(candidates, key=nearest.__getitem__)
+            if landmark in landmarks:
+                break
+            landmarks.append(landmark)
+            distance = _dijkstra_distances(self.graph, [landmark])
+            nearest = [min(a, b) for a, b in zip(nearest, distance)] if len(landmarks) > 1 else distance
+        return landmarks
+
+    def for_goals(self, goal_nodes: list):
+        # return a heuristic for other goal nodes that shares the landmark tables
+        heuristic = object.__new__(LandmarkHeuristic)
+        heuristic.graph = self.graph
+        heuristic.goal_ids = [self.graph.node_id(node) for node in goal_nodes]
+        if None in heuristic.goal_ids:
+            raise ValueError("Goal node is not in graph")
+        heuristic._from_landmark = self._from_landmark
+        heuristic._to_landmark = self._to_landmark
+        heuristic.landmarks = self.landmarks
+        return heuristic
+
+    def estimate(self, node_id: int):
+        infinity = float('inf')
+        best = infinity
+        for goal_id in self.goal_ids:
+            bound = 0
+            for from_landmark, to_landmark in zip(self._from_landmark, self._to_landmark):
+                # skip the landmarks that cannot bound this pair because one side is unreachable
+                if from_landmark[goal_id] != infinity and from_landmark[node_id] != infinity:
+                    bound = max(bound, from_landmark[goal_id] - from_landmark[node_id])
+                if to_landmark[node_id] != infinity and to_landmark[goal_id] != infinity:
+                    bound = max(bound, to_landmark[node_id] - to_landmark[goal_id])
+            best = min(best, bound)
+        return best
+
+    def __call__(self, node):
+        return self.estimate(self.graph.node_id(node))
+
+
+# guards the default heuristics kept in the caches of compiled graphs shared by several threads
+_heuristic_lock = threading.Lock()
+
+
+def _goal_distance_heuristic(compiled: CompiledGraph, goal_ids: set):
+    # the default a_star heuristic, kept on the compiled graph for the next query with the same goals
+    key = ("goal_distance", frozenset(goal_ids))
+    with _heuristic_lock:
+        heuristic = compiled._cache.get(key)
+        if heuristic is None:
+            # keep only a few goal sets around, the oldest one is dropped first
+            tables = [cached for cached in compiled._cache if cached[0] == "goal_distance"]
+            if len(tables) >= 16:
+                del compiled._cache[tables[0]]
+            heuristic = GoalDistanceHeuristic(compiled, [compiled.label(goal_id) for goal_id in goal_ids])
+            compiled._cache[key] = heuristic
+    return heuristic
+
+
+def a_star(graph: nx.Graph | CompiledGraph, start_node: str, goal_nodes: list, heuristic=None, progress=None,
+           budget=None, stats=None):
     """
       perform A Star Search on a graph to find the path and cost to one of the goal nodes.
 
       args:
-      graph (nx.Graph): a NetworkX Graph object.
+      graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
       start_node (str): the starting node for the search.
       goal_nodes (list): a list of nodes to reach during the search.
+      heuristic (optional): an estimate of the cost from a node to the nearest goal node, either a
+      GoalDistanceHeuristic, a LandmarkHeuristic or any function that takes a node and returns a number
+      (for example the straight-line distance between node coordinates). it must never overestimate the cost,
+      and should be consistent. by default a GoalDistanceHeuristic for goal_nodes is used and kept with the
+      compiled graph.
+      progress (function, optional): called with the number of expanded nodes every PROGRESS_INTERVAL expansions,
+      it can stop the search by raising SearchCancelled.
+      budget (SearchBudget, optional): limits on the expanded nodes, fringe size, memory and time of the search,
+      with a budget the search returns a SearchResult.
+      the nodes the default heuristic settles before the first expansion are counted like expanded nodes by the
+      progress function and by the budget, so neither has to wait for that backward search to finish.
+      stats (SearchStats, optional): filled with the statistics of the search.
 
       returns:
       tuple or None: a tuple containing the cost and path if a path to a goal node is found; otherwise, returns None.
@@ -376,101 +2449,890 @@ def a_star(graph, start_node, goal_nodes):
       >>> a_star(G, s_node, g_nodes)
       (1, ['A', 'C'])
       """
-    # check if graph is empty
-    if graph is None:
-        raise ValueError("Empty graph")
-    # check if start node is not in graph
-    if not graph.has_node(start_node):
-        raise ValueError(f"Start node {start_node} is not in graph")
-    # check if a goal node is not in graph
-    for node in goal_nodes:
-        if not graph.has_node(node):
-            raise ValueError(f"Goal node {node} is not in graph")
+    compiled, start_id, goal_ids = _prepare_search(graph, start_node, goal_nodes, stats)
+    steps = _a_star_steps(compiled, start_id, goal_ids, heuristic, _progress_every(progress, budget), stats,
+                          prepare_steps=True)
+    return _run_search(steps, progress, budget, stats)
+
+
+def _a_star_steps(compiled: CompiledGraph, start_id: int, goal_ids: set, heuristic, every: int, stats=None,
+                  prepare_steps: bool = False):
+    # the A* Search generator behind a_star and search_steps, with prepare_steps it also yields a step every
+    # `every` nodes the heuristic settles before the search starts
+    if not compiled.may_reach(start_id, goal_ids):
+        # no goal node is in the start node's component
+        return None, None
+    offsets, targets, weights = compiled.offsets, compiled.targets, compiled.weights
 
     # define a heuristic function for estimating the cost to reach a goal from a given node
-    def heuristic(node: str, goal: str):
-        # using the Euclidean distance between two nodes.
-        try:
-            shortest_path_length = nx.shortest_path_length(graph, source=node, target=goal, weight='weight')
-        except nx.NetworkXNoPath:
-            raise ValueError("No path found")
-        return shortest_path_length
-
-    # define a function to reconstruct the path from the starting node to the current node
-    def reconstruct_path(came_from: dir, current: str):
-        path = [current]
-        while current in came_from:
-            current = came_from[current]
-            path.insert(0, current)
-        return path
+    if heuristic is None:
+        heuristic = _goal_distance_heuristic(compiled, goal_ids)
+    if hasattr(heuristic, "estimate"):
+        # the precomputed heuristics answer directly from node ids
+        if prepare_steps and every and hasattr(heuristic, "prepare_steps"):
+            distance = yield from heuristic.prepare_steps(start_id, every)
+        else:
+            distance = heuristic.prepare(start_id) if hasattr(heuristic, "prepare") else 0
+        if distance is None:
+            # the start node cannot reach any goal node
+            return None, None
+        estimate = heuristic.estimate
+    else:
+        def estimate(node: int):
+            return heuristic(compiled.label(node))
 
     # initialize a priority queue to explore nodes
     fringe = []
     # set to keep track of the visited nodes
     visited = set()
     # the cost from the start node to a given node
-    g_score = {node: float('inf') for node in graph.nodes}
-    # the estimated total cost from start to goal
-    f_score = {node: float('inf') for node in graph.nodes}
+    g_score = {start_id: 0}
     # dictionary to reconstruct the path
     came_from = {}
 
-    # initialize the start node's f and g scores
-    g_score[start_node] = 0
-    # initial estimate to the first goal
-    f_score[start_node] = heuristic(start_node, goal_nodes[0])
-    # add the start node to the priority queue
-    heapq.heappush(fringe, (f_score[start_node], start_node))
+    # add the start node to the priority queue with its estimated total cost,
+    # ties are broken in favor of the node that looks closer to a goal
+    h_score = estimate(start_id)
+    heapq.heappush(fringe, (h_score, h_score, start_id))
 
     while fringe:
         # get the node with the lowest estimated cost
-        _, current = heapq.heappop(fringe)
+        _, _, current = heapq.heappop(fringe)
+        # skip stale entries of nodes that were already expanded
+        if current in visited:
+            if stats is not None:
+                stats.duplicates += 1
+            continue
+        if stats is not None:
+            # every entry pushed onto the fringe took one heuristic estimate
+            expanded = len(visited) + 1
+            stats._record(expanded, expanded + stats.duplicates + len(fringe), len(fringe) + 1, expanded)
+            stats.heuristic_evaluations = stats.generated
+        if every and not (len(visited) + 1) % every:
+            yield SearchStep(compiled.label(current), len(fringe), g_score[current], len(visited) + 1)
         # if the current node is one of the goal nodes, return the cost and path
-        if current in goal_nodes:
-            path = reconstruct_path(came_from, current)
+        if current in goal_ids:
+            path = _timed_path(compiled, came_from, current, stats)
             cost = g_score[current]
             return cost, path
         # add current node to visited as it is not a goal node
         visited.add(current)
 
-        for neighbor in graph.neighbors(current):
+        for edge in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[edge]
             # skip already visited neighbors
             if neighbor in visited:
                 continue
 
             # calculate the tentative_g_score, which represents the total cost from the start node to the neighbor node
-            tentative_g_score = g_score[current] + graph[current][neighbor].get('weight', 1)
+            tentative_g_score = g_score[current] + weights[edge]
             # check if this tentative_g_score is lower than the previously recorded g_score for the neighbor
             # as if the tentative_g_score is an improvement, update the path and scores for the neighbor
-            if tentative_g_score < g_score[neighbor]:
+            if tentative_g_score < g_score.get(neighbor, tentative_g_score + 1):
                 # store the current node as the previous node for the neighbor
                 came_from[neighbor] = current
                 # update the g_score for the neighbor with the improved tentative_g_score
                 g_score[neighbor] = tentative_g_score
-                # calculate the f_score for the neighbor,
+                # push the neighbor onto the priority queue with its f_score,
                 # which is the sum of the updated g_score and a heuristic estimate
-                f_score[neighbor] = g_score[neighbor] + heuristic(neighbor, goal_nodes[0])
-                # push the neighbor onto the priority queue with its new f_score
-                heapq.heappush(fringe, (f_score[neighbor], neighbor))
+                h_score = estimate(neighbor)
+                heapq.heappush(fringe, (tentative_g_score + h_score, h_score, neighbor))
     # if no path to any goal node is found, return None
     return None, None
 
 
-def draw_graph(graph: nx.Graph, start_node: str, goal_nodes: list, path: list, cost: int, search_algo):
+# the virtual node every goal node of a DynamicSearch is linked to with a zero weight edge
+_ANY_GOAL = object()
+# the (weight, hops) cost of a node a DynamicSearch cannot reach
+_UNREACHED = (math.inf, math.inf)
+
+
+class DynamicSearch:
+    """
+    an A* search that keeps its state between queries and repairs it when edges change (Lifelong Planning A*).
+
+    the search keeps the best known cost of every node it expanded. after edges are inserted, removed or given a new
+    weight, only the nodes whose cost is affected by the change are expanded again, so a small change costs far less
+    than a new search, and every result has the same cost as a new a_star or ucs search on the changed graph.
+    the goal nodes are joined by a virtual node, so the search finds the path to the nearest of them.
+    costs are kept as (weight, hops) pairs and compared weight first, so every edge, also one of weight 0, costs
+    more than nothing and a cycle of zero weight edges cannot keep an outdated cost alive.
+
+    args:
+    graph (nx.Graph or CompiledGraph): the starting graph, it is copied and not changed.
+    start_node (str): the starting node for the search.
+    goal_nodes (list): a list of nodes to reach during the search.
+    heuristic (function, optional): an estimate of the cost from a node to the nearest goal node, like the
+    heuristic of a_star. it must stay consistent for every weight the edges can take, by default 0 is used.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_weighted_edges_from([('A', 'B', 1), ('A', 'C', 2), ('B', 'D', 3), ('C', 'D', 1)])
+    >>> search = DynamicSearch(G, 'A', ['D'])
+    >>> search.search()
+    (3, ['A', 'C', 'D'])
+    >>> search.update_edge('C', 'D', 5)
+    >>> search.search()
+    (4, ['A', 'B', 'D'])
+    """
+
+    def __init__(self, graph, start_node: str, goal_nodes: list, heuristic=None):
+        _prepare_search(graph, start_node, goal_nodes)
+        # the whole graph, edges can later join the components of the start and goal nodes
+        compiled = compile_graph(graph)
+        self.directed = compiled.directed
+        # the weight of every edge by its source and target node, and by its target and source node
+        self.successors = {label: {} for label in compiled.labels}
+        for node_id, label in enumerate(compiled.labels):
+            for edge in range(compiled.offsets[node_id], compiled.offsets[node_id + 1]):
+                self.successors[label][compiled.label(compiled.targets[edge])] = compiled.weights[edge]
+        self.predecessors = self.successors
+        if self.directed:
+            self.predecessors = {label: {} for label in compiled.labels}
+            for u, neighbors in self.successors.items():
+                for v, weight in neighbors.items():
+                    self.predecessors[v][u] = weight
+        self.start_node = start_node
+        self.goal_nodes = set(goal_nodes)
+        self.heuristic = heuristic
+        # the (weight, hops) cost of every expanded node, and the cost its predecessors offer (rhs),
+        # missing means unreached
+        self.g_score = {}
+        self.rhs = {start_node: (0, 0)}
+        # the priority queue of the inconsistent nodes with lazy deletion, every node maps to its current key
+        self._fringe = []
+        self._queued = {}
+        self._order = itertools.count()
+        # the number of nodes expanded by the last call of search
+        self.expanded = 0
+        self._push(start_node)
+
+    def _estimate(self, node):
+        if node is _ANY_GOAL or self.heuristic is None:
+            return 0
+        return self.heuristic(node)
+
+    def _key(self, node):
+        weight, hops = min(self.g_score.get(node, _UNREACHED), self.rhs.get(node, _UNREACHED))
+        # the heuristic estimates the weight, ties are broken by the hops and then by the weight so far
+        return weight + self._estimate(node), hops, weight
+
+    def _push(self, node):
+        key = self._key(node)
+        self._queued[node] = key
+        heapq.heappush(self._fringe, (key, next(self._order), node))
+
+    def _incoming(self, node):
+        # the (predecessor, weight, hops) of the edges into node, the virtual goal node is reached from every
+        # goal node without a hop, real edges count one hop
+        if node is _ANY_GOAL:
+            return [(goal_node, 0, 0) for goal_node in self.goal_nodes]
+        return ((u, weight, 1) for u, weight in self.predecessors[node].items())
+
+    def _cost_through(self, u, weight, hops):
+        # the (weight, hops) cost of reaching a node from u over an edge
+        u_weight, u_hops = self.g_score.get(u, _UNREACHED)
+        return u_weight + weight, u_hops + hops
+
+    def _outgoing(self, node):
+        # the successors of node, a goal node also leads to the virtual goal node
+        if node is _ANY_GOAL:
+            return []
+        if node in self.goal_nodes:
+            return [*self.successors[node], _ANY_GOAL]
+        return self.successors[node]
+
+    def _update_node(self, node):
+        # recompute the cost the predecessors of node offer, and queue node while it differs from its cost
+        if node != self.start_node:
+            g_score = self.g_score
+            best_weight, best_hops = _UNREACHED
+            for u, weight, hops in self._incoming(node):
+                u_weight, u_hops = g_score.get(u, _UNREACHED)
+                u_weight += weight
+                # the cheaper weight wins, an equal weight with fewer hops
+                if u_weight < best_weight or (u_weight == best_weight and u_hops + hops < best_hops):
+                    best_weight, best_hops = u_weight, u_hops + hops
+            self.rhs[node] = best_weight, best_hops
+        if self.g_score.get(node, _UNREACHED) != self.rhs.get(node, _UNREACHED):
+            self._push(node)
+        else:
+            self._queued.pop(node, None)
+
+    def _top_key(self):
+        # the key of the first queued node, stale entries are dropped on the way
+        fringe, queued = self._fringe, self._queued
+        while fringe:
+            key, _, node = fringe[0]
+            if queued.get(node) == key:
+                return key
+            heapq.heappop(fringe)
+        return math.inf, math.inf, math.inf
+
+    def _compute_shortest_path(self):
+        g_score, rhs = self.g_score, self.rhs
+        # the goal nodes reach the virtual goal node at no cost, so their keys can tie with its key
+        # and nodes with an equal key are expanded too
+        while (self._top_key() <= self._key(_ANY_GOAL)
+               or rhs.get(_ANY_GOAL, _UNREACHED) != g_score.get(_ANY_GOAL, _UNREACHED)):
+            if not self._fringe:
+                break
+            node = heapq.heappop(self._fringe)[2]
+            del self._queued[node]
+            self.expanded += 1
+            if g_score.get(node, _UNREACHED) > rhs.get(node, _UNREACHED):
+                # the node got cheaper, settle its new cost and pass it on to its successors
+                g_score[node] = rhs[node]
+                for successor in self._outgoing(node):
+                    self._update_node(successor)
+            else:
+                # the node got more expensive, forget its cost and let it and its successors find a new one
+                g_score[node] = _UNREACHED
+                self._update_node(node)
+                for successor in self._outgoing(node):
+                    self._update_node(successor)
+
+    def search(self):
+        """
+        repair the search after the edge changes since the last call and return the path to the nearest goal node.
+
+        returns:
+        tuple: the cost and path to the nearest goal node, (None, None) if no goal node can be reached.
+        """
+        self.expanded = 0
+        self._compute_shortest_path()
+        cost, _ = self.g_score.get(_ANY_GOAL, _UNREACHED)
+        if cost == math.inf:
+            return None, None
+        # walk back from the virtual goal node along the cheapest predecessors, their hops go down on every step
+        path = []
+        node = _ANY_GOAL
+        while node != self.start_node:
+            node = min(self._incoming(node), key=lambda edge: self._cost_through(*edge))[0]
+            path.append(node)
+        path.reverse()
+        return cost, path
+
+    def _add_node(self, node):
+        if node not in self.successors:
+            self.successors[node] = {}
+            if self.directed:
+                self.predecessors[node] = {}
+
+    def update_edge(self, u, v, weight: int):
+        """
+        insert an edge or change its weight.
+
+        args:
+        u (str): the source node of the edge, it is added if it is not in the graph.
+        v (str): the target node of the edge, it is added if it is not in the graph.
+        weight (int or float): the new non-negative weight of the edge.
+        """
+        weight = _edge_weight(weight)
+        if weight < 0:
+            raise ValueError("Edge weights must not be negative")
+        self._add_node(u)
+        self._add_node(v)
+        self.successors[u][v] = weight
+        self.predecessors[v][u] = weight
+        self._changed(u, v)
+
+    def remove_edge(self, u, v):
+        """
+        remove an edge.
+
+        args:
+        u (str): the source node of the edge.
+        v (str): the target node of the edge.
+        """
+        if v not in self.successors.get(u, {}):
+            raise ValueError(f"Edge {u}, {v} is not in graph")
+        del self.successors[u][v]
+        self.predecessors[v].pop(u, None)
+        self._changed(u, v)
+
+    def _changed(self, u, v):
+        # queue the nodes of a changed edge for repair on the next search
+        self._update_node(v)
+        if not self.directed:
+            self._update_node(u)
+
+    def apply(self, changes):
+        """
+        apply a stream of edge changes.
+
+        args:
+        changes (iterable): (node, node, weight) tuples, a weight of None removes the edge.
+        """
+        for u, v, weight in changes:
+            if weight is None:
+                self.remove_edge(u, v)
+            else:
+                self.update_edge(u, v, weight)
+
+
+# the search algorithms by the names used in the menus and the batch queries
+SEARCH_ALGORITHMS = {
+    "BFS": bfs,
+    "DFS": dfs,
+    "UCS": ucs,
+    "Greedy": greedy_search,
+    "A*": a_star,
+}
+
+
+def search_steps(algorithm: str, graph: nx.Graph | CompiledGraph, start_node: str, goal_nodes: list,
+                 every: int = 1, heuristic=None):
+    """
+    start a search as a generator that pauses after node expansions.
+
+    the generator yields a SearchStep after every `every` expanded nodes and its return value (the value of the
+    StopIteration, or of run_steps) is the same cost and path the search function returns. a caller can
+    interleave several searches, stop one at any step by closing it or throttle it by choosing `every`.
+
+    args:
+    algorithm (str): the name of the search algorithm, one of the keys of SEARCH_ALGORITHMS.
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
+    start_node (str): the starting node for the search.
+    goal_nodes (list): a list of nodes to reach during the search.
+    every (int): the number of expanded nodes between two yielded steps.
+    heuristic (optional): the heuristic of an A* search, see a_star.
+
+    returns:
+    generator: a generator of SearchStep tuples.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_weighted_edges_from([('A', 'B', 1), ('A', 'C', 2), ('B', 'D', 3), ('C', 'D', 1)])
+    >>> [step.node for step in search_steps("UCS", G, 'A', ['D'])]
+    ['A', 'B', 'C', 'D']
+    """
+    if algorithm not in SEARCH_ALGORITHMS:
+        raise ValueError(f"Unknown search algorithm {algorithm}")
+    if every < 1:
+        raise ValueError("every must be at least 1")
+    # validate the arguments now rather than on the first step
+    compiled, start_id, goal_ids = _prepare_search(graph, start_node, goal_nodes)
+    if algorithm == "BFS":
+        return _bfs_steps(compiled, start_id, goal_ids, every)
+    if algorithm == "DFS":
+        return _dfs_steps(compiled, start_id, goal_ids, every)
+    if algorithm == "UCS":
+        return _ShortestPathTree(compiled, start_id).steps(goal_ids, every)
+    if algorithm == "Greedy":
+        return _greedy_steps(compiled, start_id, goal_ids, every)
+    return _a_star_steps(compiled, start_id, goal_ids, heuristic, every)
+
+
+class SearchCache:
+    """
+    a bounded least recently used cache of search results.
+
+    results are keyed by the fingerprint of the graph's nodes, edges and weights, the algorithm, the start node
+    and the set of goal nodes, so the order of the goal nodes does not matter. a changed graph gets a new
+    fingerprint, and the entries of its previous version are dropped the next time it is searched.
+    a lookup does not hash the graph: the fingerprint of a CompiledGraph is computed once, and the fingerprint of
+    a graph from get_graph() once per change (a ComponentGraph counts its changes, weights edited in place
+    included, in `version`). any other nx.Graph has no such counter, its caller passes a `version` that changes
+    whenever the graph changes.
+
+    example:
+    >>> G = get_graph([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
+    >>> cache = SearchCache(maxsize=100)
+    >>> cache.search("UCS", G, 'A', ['D', 'C'])
+    (2, ['A', 'C'])
+    >>> cache.search("UCS", G, 'A', ['C', 'D'])
+    (2, ['A', 'C'])
+    >>> cache.info()
+    {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1, 'maxsize': 100}
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        # the keys stored for every fingerprint, and the last (version, fingerprint) seen for every graph object
+        self._keys = {}
+        self._fingerprints = weakref.WeakKeyDictionary()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "size": len(self._entries), "maxsize": self.maxsize}
+
+    def clear(self):
+        self._entries.clear()
+        self._keys.clear()
+        self._fingerprints.clear()
+
+    def _drop(self, fingerprint: str):
+        # remove every entry of one version of a graph
+        for key in self._keys.pop(fingerprint, ()):
+            del self._entries[key]
+
+    def invalidate(self, graph):
+        # remove the entries of a graph, for example after changing it
+        if isinstance(graph, CompiledGraph):
+            self._drop(graph.fingerprint())
+            return
+        previous = self._fingerprints.pop(graph, None)
+        if previous is not None:
+            self._drop(previous[1])
+
+    def _fingerprint(self, graph, version):
+        # the fingerprint of a graph and, when it had to be compiled for it, its compiled form
+        if isinstance(graph, CompiledGraph):
+            # a compiled graph does not change
+            return graph.fingerprint(), graph
+        # a frozen graph may be a view of a graph that changes, it has no version of its own
+        if isinstance(graph, ComponentGraph) and not nx.is_frozen(graph):
+            version = (graph.version, version)
+        elif version is None:
+            raise ValueError("Pass the version of a graph that does not count its changes, "
+                             "or build it with get_graph()")
+        previous = self._fingerprints.get(graph)
+        if previous is not None and previous[0] == version:
+            return previous[1], None
+        compiled = compile_graph(graph)
+        fingerprint = compiled.fingerprint()
+        if previous is not None and previous[1] != fingerprint:
+            # the graph was changed since its last search
+            self._drop(previous[1])
+        self._fingerprints[graph] = (version, fingerprint)
+        return fingerprint, compiled
+
+    def search(self, algorithm: str, graph, start_node: str, goal_nodes: list, version=None):
+        """
+        return the cached result of a search, running the search on a miss.
+
+        args:
+        algorithm (str): one of SEARCH_ALGORITHMS.
+        graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
+        start_node (str): the starting node for the search.
+        goal_nodes (list): a list of nodes to reach during the search.
+        version (optional): any value that changes whenever the graph changes, like a counter. it is needed for an
+        nx.Graph that is not from get_graph(), a ComponentGraph and a CompiledGraph tell their changes themselves.
+
+        returns:
+        tuple: the (cost, path) tuple returned by the search.
+        """
+        if algorithm not in SEARCH_ALGORITHMS:
+            raise ValueError("Invalid Search Algorithm")
+        if graph is None:
+            raise ValueError("Empty graph")
+        fingerprint, compiled = self._fingerprint(graph, version)
+        key = (fingerprint, algorithm, start_node, frozenset(goal_nodes))
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            cost, path = self._entries[key]
+        else:
+            self.misses += 1
+            cost, path = SEARCH_ALGORITHMS[algorithm](compiled or compile_graph(graph), start_node, goal_nodes)
+            if path is not None:
+                path = tuple(path)
+            self._entries[key] = (cost, path)
+            self._keys.setdefault(fingerprint, set()).add(key)
+            if len(self._entries) > self.maxsize:
+                # evict the least recently used entry
+                old_key, _ = self._entries.popitem(last=False)
+                self._keys[old_key[0]].discard(old_key)
+                if not self._keys[old_key[0]]:
+                    del self._keys[old_key[0]]
+                self.evictions += 1
+        # return a new list so callers cannot change the cached path
+        return cost, None if path is None else list(path)
+
+
+def search_many(graph: nx.Graph | CompiledGraph, queries, max_trees: int = 16):
+    """
+    answer many search queries against one graph.
+
+    the graph is compiled once and everything precomputed for one query is kept for the next ones: the component
+    labels reject queries whose goals are in another component without searching, a_star reuses its heuristic table
+    for queries with the same goal nodes, and UCS queries from the same start node continue one shortest path tree
+    instead of starting over. every result is the same as running the search on its own.
+
+    args:
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
+    queries (iterable): (algorithm, start_node, goal_nodes) tuples, where algorithm is one of SEARCH_ALGORITHMS.
+    max_trees (int): the number of UCS shortest path trees kept, the least recently used tree is dropped first.
+
+    returns:
+    iterator: a (cost, path) tuple for every query, in the order of the queries.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
+    >>> list(search_many(G, [("UCS", 'A', ['D']), ("UCS", 'A', ['C']), ("BFS", 'D', ['C'])]))
+    [(4, ['A', 'B', 'D']), (2, ['A', 'C']), (6, ['D', 'B', 'A', 'C'])]
+    """
+    compiled = compile_graph(graph)
+    # compute the component labels once, every search then rejects goal nodes in another component
+    compiled.components()
+    # UCS shortest path trees by start node, in least recently used order
+    trees = {}
+    for algorithm, start_node, goal_nodes in queries:
+        if algorithm not in SEARCH_ALGORITHMS:
+            raise ValueError("Invalid Search Algorithm")
+        _, start_id, goal_ids = _prepare_search(compiled, start_node, goal_nodes)
+        if algorithm == "UCS":
+            tree = trees.pop(start_id, None)
+            if tree is None:
+                tree = _ShortestPathTree(compiled, start_id)
+                if len(trees) >= max_trees:
+                    del trees[next(iter(trees))]
+            trees[start_id] = tree
+            yield tree.search(goal_ids)
+        else:
+            yield SEARCH_ALGORITHMS[algorithm](compiled, start_node, goal_nodes)
+
+
+def iter_queries(source):
+    """
+    read search queries from a JSON lines file, one query at a time.
+
+    every line holds one object with the keys "algorithm" (one of SEARCH_ALGORITHMS), "start" and "goals" (a list),
+    for example {"algorithm": "UCS", "start": "A", "goals": ["D", "E"]}. blank lines and lines starting with '#'
+    are skipped.
+
+    args:
+    source (str, os.PathLike or file object): the path of the file, or an open text file such as sys.stdin.
+
+    returns:
+    generator: (algorithm, start_node, goal_nodes) tuples, the queries of search_many().
+
+    raises:
+    ValueError: if a line is not a valid query, with its line number.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8") as file:
+            yield from iter_queries(file)
+        return
+    for line_number, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            yield parse_query(json.loads(line))
+        except (json.JSONDecodeError, ValueError):
+            raise ValueError(f"Invalid query on line {line_number}: {line!r}") from None
+
+
+def parse_query(query):
+    """
+    check a search query read from JSON, an object like {"algorithm": "UCS", "start": "A", "goals": ["D", "E"]}.
+
+    args:
+    query (dict): the decoded query.
+
+    returns:
+    tuple: the (algorithm, start_node, goal_nodes) query of search_many() and batch_search().
+
+    raises:
+    ValueError: if the query is not an object with "algorithm", "start" and a list of "goals".
+    """
+    if not (isinstance(query, dict) and "algorithm" in query and "start" in query
+            and isinstance(query.get("goals"), list)):
+        raise ValueError(f"Invalid query: {query!r}")
+    return query["algorithm"], query["start"], query["goals"]
+
+
+def read_graph(path, directed: bool = False):
+    """
+    read a graph file, either an edge list (see load_graph) or a binary file written by save_graph (see open_graph).
+
+    args:
+    path (str or os.PathLike): the path of the file.
+    directed (bool): whether the edges of an edge list are directed, a binary file records it itself.
+
+    returns:
+    CompiledGraph or MappedGraph: the graph.
+    """
+    with open(path, "rb") as file:
+        magic = file.read(len(GRAPH_FILE_MAGIC))
+    if magic == GRAPH_FILE_MAGIC:
+        return open_graph(path)
+    return load_graph(path, directed=directed)
+
+
+def batch_search(graph: nx.Graph | CompiledGraph, queries, budget=None):
+    """
+    answer many search queries against one graph, with the result and the search time of every query.
+
+    the graph is compiled and its component labels are computed once for all queries. a query that cannot be
+    answered (an unknown algorithm or a node that is not in the graph) gets an "error" instead of a cost and path,
+    and the next queries still run.
+
+    args:
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
+    queries (iterable): (algorithm, start_node, goal_nodes) tuples, for example from iter_queries().
+    budget (SearchBudget, optional): limits on every search, a search stopped by a limit gets "truncated" set to
+    true and the "reason" of its SearchResult, with neither cost nor path.
+
+    returns:
+    iterator: a dict for every query with its "algorithm", "start", "goals", "cost" and "path" (or "error"),
+    and the "seconds" the search took.
+
+    example:
+    >>> G = nx.Graph()
+    >>> G.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
+    >>> for result in batch_search(G, [("UCS", 'A', ['D']), ("DFS", 'A', ['E'])]):
+    ...     print(result["algorithm"], result.get("cost"), result.get("path"), result.get("error"))
+    UCS 4 ['A', 'B', 'D'] None
+    DFS None None Goal node E is not in graph
+    """
+    compiled = compile_graph(graph)
+    # compute the component labels once, every search then rejects goal nodes in another component
+    compiled.components()
+    for algorithm, start_node, goal_nodes in queries:
+        result = {"algorithm": algorithm, "start": start_node, "goals": goal_nodes}
+        start_time = time.perf_counter()
+        try:
+            if algorithm not in SEARCH_ALGORITHMS:
+                raise ValueError("Invalid Search Algorithm")
+            answer = SEARCH_ALGORITHMS[algorithm](compiled, start_node, goal_nodes, budget=budget)
+            result["cost"], result["path"] = answer
+            if budget is not None and answer.truncated:
+                result["truncated"], result["reason"] = True, answer.reason
+        except (TypeError, ValueError) as err:
+            result["error"] = str(err)
+        result["seconds"] = time.perf_counter() - start_time
+        yield result
+
+
+# the graph opened by a parallel_search worker process
+_worker_graph = None
+
+
+def _open_worker_graph(path, labels=None):
+    # map the shared graph file once when a worker process starts
+    global _worker_graph
+    _worker_graph = open_graph(path, labels=labels)
+
+
+def _search_chunk(queries: list):
+    return list(search_many(_worker_graph, queries))
+
+
+def parallel_search(graph, queries, processes: int = None, chunksize: int = None):
+    """
+    answer a list of search queries on a pool of worker processes.
+
+    the workers do not receive a pickled copy of the graph: each one memory-maps the same graph file, so they share
+    its pages through the OS cache. a MappedGraph is used as it is, any other graph is saved to a temporary file first
+    (see share_graph), also one whose node labels are not strings.
+    the queries are sent in chunks and every worker answers its chunk with search_many(), so the results are the same
+    as answering the queries one by one in a single process.
+
+    args:
+    graph (nx.Graph, CompiledGraph or MappedGraph): the graph to search.
+    queries (iterable): (algorithm, start_node, goal_nodes) tuples, where algorithm is one of SEARCH_ALGORITHMS.
+    processes (int): the number of worker processes, by default the number of CPUs.
+    chunksize (int): the number of queries sent to a worker at a time, by default about four chunks per worker.
+
+    returns:
+    list: a (cost, path) tuple for every query, in the order of the queries.
+    """
+    queries = list(queries)
+    processes = processes or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(queries) // (processes * 4))
+    chunks = [queries[index:index + chunksize] for index in range(0, len(queries), chunksize)]
+    with tempfile.TemporaryDirectory() as directory:
+        path, labels = share_graph(graph, directory)
+        with ProcessPoolExecutor(max_workers=processes, initializer=_open_worker_graph,
+                                 initargs=(path, labels)) as pool:
+            return [result for results in pool.map(_search_chunk, chunks) for result in results]
+
+
+# graphs with more nodes than this are drawn the cheap way: laid out in columns by their hops from the start node
+# instead of with nx.spring_layout, whose cost grows with the square of the number of nodes and which needs scipy
+# for larger graphs, and with labels only on the path
+LARGE_GRAPH_NODES = 500
+# the largest graph draw_graph draws as a whole, only the neighborhood of the path of a larger one is drawn
+MAX_DRAWN_NODES = 20000
+# the number of graph layouts kept by graph_layout
+LAYOUT_CACHE_SIZE = 8
+# the largest number of nodes neighborhood_graph adds around the nodes it starts from
+NEIGHBORHOOD_MAX_NODES = 300
+# the node positions of the last drawn graphs by graph fingerprint
+_layout_cache = OrderedDict()
+# graphs are drawn from the worker threads of the GUI, so the layout cache is shared between them
+_layout_lock = threading.Lock()
+# the (version, fingerprint) of the graphs built with get_graph() that were laid out
+_layout_fingerprints = weakref.WeakKeyDictionary()
+
+
+def _layout_fingerprint(graph):
+    # the fingerprint of a graph, which a compiled graph keeps and a graph from get_graph() only computes
+    # again after it changed
+    if isinstance(graph, CompiledGraph):
+        return graph.fingerprint()
+    if not isinstance(graph, ComponentGraph) or nx.is_frozen(graph):
+        # the graph does not count its changes, draw_graph only lays out graphs of up to MAX_DRAWN_NODES nodes
+        return compile_graph(graph).fingerprint()
+    with _layout_lock:
+        previous = _layout_fingerprints.get(graph)
+    if previous is not None and previous[0] == graph.version:
+        return previous[1]
+    fingerprint = compile_graph(graph).fingerprint()
+    with _layout_lock:
+        _layout_fingerprints[graph] = (graph.version, fingerprint)
+    return fingerprint
+
+
+def _layered_layout(graph, start_node):
+    # one column per number of hops from start_node with the nodes it cannot reach in the last one,
+    # the nodes of a column are spread evenly over its height
+    compiled = compile_graph(graph)
+    distances, _ = hop_distances(compiled, start_node)
+    distances[distances < 0] = distances.max() + 1
+    counts = np.bincount(distances)
+    # the rank of every node in its column, in node id order
+    order = np.argsort(distances, kind="stable")
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order)) - (np.cumsum(counts) - counts)[distances[order]]
+    x = 2 * distances / max(1, distances.max()) - 1
+    y = 2 * (ranks + 0.5) / counts[distances] - 1
+    return dict(zip(compiled.labels, zip(x.tolist(), y.tolist())))
+
+
+def graph_layout(graph: nx.Graph | CompiledGraph, start_node: str = None):
+    """
+    return the positions of the nodes of a graph for drawing, cached by the graph fingerprint.
+
+    the same graph is drawn with the same positions for every query, and only a changed graph is laid out again.
+    a compiled graph or a graph built with get_graph() is fingerprinted once per change, so a cached layout is
+    found without reading the graph again.
+    graphs of up to LARGE_GRAPH_NODES nodes use nx.spring_layout. larger graphs are laid out in linear time in
+    columns by the number of edges from start_node, so a search path runs from left to right, and the nodes
+    start_node cannot reach are put in the last column.
+
+    args:
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
+    start_node (str, optional): the node in the first column of a large graph, by default its first node.
+
+    returns:
+    dict: the (x, y) position of every node.
+    """
+    large = graph.number_of_nodes() > LARGE_GRAPH_NODES
+    if large and (start_node is None or not graph.has_node(start_node)):
+        start_node = next(iter(graph.labels if isinstance(graph, CompiledGraph) else graph))
+    key = (_layout_fingerprint(graph), start_node if large else None)
+    with _layout_lock:
+        pos = _layout_cache.get(key)
+        if pos is not None:
+            _layout_cache.move_to_end(key)
+            return pos
+    if large:
+        pos = _layered_layout(graph, start_node)
+    else:
+        # Seed layout for graph reproducibility
+        pos = nx.spring_layout(graph.to_networkx() if isinstance(graph, CompiledGraph) else graph, seed=57)
+    with _layout_lock:
+        _layout_cache[key] = pos
+        if len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return pos
+
+
+def _weighted_neighbors(graph, node):
+    # the (neighbor, weight) pairs of node in a NetworkX or compiled graph
+    if isinstance(graph, CompiledGraph):
+        node_id = graph.node_id(node)
+        offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+        return [(graph.label(targets[edge]), weights[edge]) for edge in range(offsets[node_id], offsets[node_id + 1])]
+    return [(neighbor, data.get("weight", 1)) for neighbor, data in graph.adj[node].items()]
+
+
+def neighborhood_graph(graph: nx.Graph | CompiledGraph, nodes: list, hops: int = 1,
+                       max_nodes: int = NEIGHBORHOOD_MAX_NODES):
+    """
+    cut the nodes within a number of hops of the given nodes out of a graph.
+
+    only the given nodes and their neighborhood are visited, so the work depends on the size of the
+    neighborhood and not on the size of the graph.
+
+    args:
+    graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
+    nodes (list): the nodes to keep, such as a path with its start and goal nodes.
+    hops (int): the number of edges the neighborhood reaches out from the nodes, 0 keeps only the nodes.
+    max_nodes (int): the largest number of neighborhood nodes added to the nodes, the nodes themselves are always kept.
+
+    returns:
+    tuple: the neighborhood as a NetworkX graph, and a dictionary that maps every kept node with edges to nodes
+    that were left out to the number of those edges.
+
+    example:
+    >>> G = nx.path_graph(['A', 'B', 'C', 'D', 'E'])
+    >>> subgraph, hidden = neighborhood_graph(G, ['C'], hops=1)
+    >>> sorted(subgraph.nodes), hidden
+    (['B', 'C', 'D'], {'B': 1, 'D': 1})
+    """
+    if hops < 0:
+        raise ValueError("hops must not be negative")
+    directed = graph.directed if isinstance(graph, CompiledGraph) else graph.is_directed()
+    # the kept nodes in the order they were reached
+    kept = dict.fromkeys(node for node in nodes if graph.has_node(node))
+    limit = len(kept) + max_nodes
+    level = list(kept)
+    for _ in range(hops):
+        next_level = []
+        for node in level:
+            for neighbor, _ in _weighted_neighbors(graph, node):
+                if neighbor not in kept and len(kept) < limit:
+                    kept[neighbor] = None
+                    next_level.append(neighbor)
+        level = next_level
+    subgraph = nx.DiGraph() if directed else nx.Graph()
+    subgraph.add_nodes_from(kept)
+    hidden = {}
+    for node in kept:
+        for neighbor, weight in _weighted_neighbors(graph, node):
+            if neighbor in kept:
+                subgraph.add_edge(node, neighbor, weight=weight)
+            else:
+                hidden[node] = hidden.get(node, 0) + 1
+    return subgraph, hidden
+
+
+def draw_graph(graph: nx.Graph, start_node: str, goal_nodes: list, path: list, cost: int, search_algo,
+               block: bool = True, show: bool = True, output="assets/graph.png", neighborhood: int = None):
     """
      draw and show a directed graph with specific node and edge attributes, and save it as a PNG file.
 
+     graphs with more than LARGE_GRAPH_NODES nodes are drawn with small nodes, and only the nodes of the path,
+     the start node and the goal nodes are labeled, the edge weights are labeled on the path edges.
+     graphs with more than MAX_DRAWN_NODES nodes can only be drawn by their neighborhood.
+
      args:
-     graph (nx.Graph): a NetworkX Graph object.
+     graph (nx.Graph or CompiledGraph): a NetworkX Graph object or a compiled graph.
      start_node (str): the starting node.
      goal_nodes (list): a list of goal nodes.
      path (list): a list of nodes representing the path.
      cost (int): the cost of the path.
      search_algo (str): the search algorithm used (e.g., "BFS").
+     block (bool): whether to wait until the figure window is closed, the GUI keeps its event loop running with False.
+     show (bool): whether to show the figure in a window, with False the figure is only drawn by the non-interactive
+     Agg backend and saved, which also works without a display and from worker threads.
+     output (str or os.PathLike): the path of the PNG file.
+     neighborhood (int, optional): draw only the path, the start and goal nodes and the nodes within this many hops
+     of them (see neighborhood_graph) instead of the whole graph. nodes with edges to the left out nodes are labeled
+     with the number of those edges, and the number of drawn nodes is written under the graph.
 
      returns:
      None
 
+     raises:
+     ValueError: if the graph has more than MAX_DRAWN_NODES nodes and no neighborhood is given.
+
      example:
      >>> G = nx.Graph()
      >>> G.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
@@ -482,27 +3344,69 @@ def draw_graph(graph: nx.Graph, start_node: str, goal_nodes: list, path: list, c
      >>> draw_graph(G, s_node, g_nodes, e_path, e_cost, e_search_algo)
 
      """
-    # close previous fig if any
-    plt.close()
-    # set a layout for the graph
-    pos = nx.spring_layout(graph, seed=57)  # Seed layout for graph reproducibility
+    summary = None
+    labels = None
+    if neighborhood is not None:
+        # draw the part of the graph around the answer, the rest is only counted
+        number_of_nodes = graph.number_of_nodes()
+        graph, hidden = neighborhood_graph(graph, list(path or []) + [start_node] + list(goal_nodes), neighborhood)
+        labels = {node: f"{node}\n+{hidden[node]}" if node in hidden else node for node in graph.nodes}
+        summary = (f"{graph.number_of_nodes()} of {number_of_nodes} nodes shown, "
+                   f"{sum(hidden.values())} edges to hidden nodes")
+    elif graph.number_of_nodes() > MAX_DRAWN_NODES:
+        raise ValueError(f"The graph has {graph.number_of_nodes()} nodes, more than the {MAX_DRAWN_NODES} "
+                         f"drawn as a whole, draw the nodes around the path with neighborhood=K "
+                         f"(--neighborhood K on the command line)")
+    # set a layout for the graph, the positions are reused while the graph does not change
+    pos = graph_layout(graph, start_node)
+    if isinstance(graph, CompiledGraph):
+        # a compiled graph is drawn through its NetworkX form
+        graph = graph.to_networkx()
     # set the node colors (red for start node, green for goal nodes and light blue for the rest of nodes)
+    goal_nodes = set(goal_nodes)
     node_colors = ['red' if node == start_node
                    else 'green' if node in goal_nodes
                    else 'lightblue' for node in graph.nodes]
-    # set the edge color of the path in green and rest of edges in black
-    edge_colors = ['orange' if (u, v) in zip(path, path[1:]) else 'black' for u, v in graph.edges]
-    # draw the graph with labels as nodes
-    nx.draw(graph, pos=pos, node_color=node_colors, node_size=500, edge_color=edge_colors, with_labels=True)
+    # set the edge color of the path in orange and rest of edges in black,
+    # an edge of an undirected graph can be listed in either direction
+    path = path or []
+    path_edges = set(zip(path, path[1:]))
+    if not graph.is_directed():
+        path_edges.update([(v, u) for u, v in path_edges])
+    edge_colors = ['orange' if edge in path_edges else 'black' for edge in graph.edges]
+    if show:
+        # close previous fig if any
+        plt.close()
+        figure = plt.figure()
+    else:
+        # a figure outside pyplot is drawn by the Agg backend and never opens a window
+        figure = Figure()
+    axes = figure.add_axes((0, 0, 1, 1))
     # set edge labels with weights of edges
     edge_labels = nx.get_edge_attributes(graph, 'weight')
+    if graph.number_of_nodes() <= LARGE_GRAPH_NODES:
+        # draw the graph with labels as nodes
+        nx.draw(graph, pos=pos, ax=axes, node_color=node_colors, node_size=500, edge_color=edge_colors,
+                with_labels=True, labels=labels)
+    else:
+        # thousands of labels take far longer to render than the graph itself, keep the ones of the answer
+        nx.draw(graph, pos=pos, ax=axes, node_color=node_colors, node_size=20, edge_color=edge_colors, width=0.5)
+        # draw the path again over the nodes that hide it
+        nx.draw_networkx_edges(graph, pos, edgelist=list(zip(path, path[1:])), edge_color='orange', width=2, ax=axes)
+        labeled = set(path) | goal_nodes | {start_node}
+        nx.draw_networkx_labels(graph, pos, labels={node: (labels or {}).get(node, node) for node in labeled
+                                                    if node in pos}, ax=axes)
+        edge_labels = {edge: weight for edge, weight in edge_labels.items() if edge in path_edges}
     # draw edge labels
-    nx.draw_networkx_edge_labels(graph, pos, edge_labels=edge_labels)
+    nx.draw_networkx_edge_labels(graph, pos, edge_labels=edge_labels, ax=axes)
+    if summary is not None:
+        figure.text(0.01, 0.01, summary)
     # save graph figure
-    plt.savefig("assets/graph.png")
-    # show the figure
-    plt.show()
+    figure.savefig(output)
+    if show:
+        # show the figure
+        plt.show(block=block)
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
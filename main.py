@@ -10,11 +10,26 @@
 #   - Uniform-Cost Search
 #   - Greedy Best-First Search
 #   - A* Best-First Search
+# Run with:
+#   python main.py
+#   python main.py --profile DIR    (profile the parse, build, search and draw stages into DIR)
 # ------------------------------------------
+import argparse
+import itertools
+import os
+import queue
+import tempfile
+import threading
+import time
 import tkinter as tk
 import graph as g
 from tkinter import messagebox
 
+# Profile the stages of every search with --profile DIR or the AI_SEARCH_PROFILE environment variable
+parser = argparse.ArgumentParser(description="AI Search Application")
+parser.add_argument("--profile", metavar="DIR", help="write cProfile and tracemalloc profiles of every stage to DIR")
+profiler = g.enable_profiling(parser.parse_args().profile)
+
 # Create a main application window
 root = tk.Tk()
 root.title("AI Search Application")
@@ -80,35 +95,151 @@ option_var.set(selected_option.get())
 tk.Label(frame_input, text="").pack()
 
 
-def output(cost_to_goal, path_to_goal):
-    # To display the path to goal
-    # Create a label widget
-    path_to_goal_label = tk.Label(frame_output, text="Path to goal: ", padx=10, pady=10)
-    # Add the label widget to the window
-    path_to_goal_label.grid(row=0, column=0)
-    # Create a label widget
+# Create the output label widgets once, every result only updates their text
+# Create label widgets to display the path to goal
+tk.Label(frame_output, text="Path to goal: ", padx=10, pady=10).grid(row=0, column=0)
+path_to_goal_text = tk.Label(frame_output, text="", padx=10, pady=10)
+path_to_goal_text.grid(row=0, column=1)
+# Create label widgets to display the cost of the path to goal
+tk.Label(frame_output, text="Cost to goal: ", padx=10, pady=10).grid(row=1, column=0)
+cost_to_goal_text = tk.Label(frame_output, text="", padx=10, pady=10)
+cost_to_goal_text.grid(row=1, column=1)
+# Create label widgets to display the statistics of the search
+tk.Label(frame_output, text="Statistics: ", padx=10, pady=10).grid(row=2, column=0)
+stats_text = tk.Label(frame_output, text="", justify="left", padx=10, pady=10)
+stats_text.grid(row=2, column=1)
+
+
+def output(cost_to_goal, path_to_goal, stats):
+    # Display the path to goal, its cost and the statistics of the search
     separator = " -> "
-    path_to_goal = tk.Label(frame_output, text=separator.join(path_to_goal), padx=10, pady=10)
-    # Add the label widget to the window
-    path_to_goal.grid(row=0, column=1)
+    path_to_goal_text.config(text=separator.join(path_to_goal))
+    cost_to_goal_text.config(text=cost_to_goal)
+    stats_text.config(text=str(stats).replace(", ", "\n"))
 
-    # To display the cost of the path to goal
-    # Create a label widget
-    cost_to_goal_label = tk.Label(frame_output, text="Cost to goal: ", padx=10, pady=10)
-    # Add the label widget to the window
-    cost_to_goal_label.grid(row=1, column=0)
-    # Create a label widget
-    cost_to_goal = tk.Label(frame_output, text=cost_to_goal, padx=10, pady=10)
-    # Add the label widget to the window
-    cost_to_goal.grid(row=1, column=1)
 
+def show_drawing(title, image_file):
+    # Display a graph drawn by a search thread in its own window
+    window = tk.Toplevel(root)
+    window.title(title)
+    image = tk.PhotoImage(file=image_file)
+    # The image is loaded, the file is no longer needed
+    os.remove(image_file)
+    image_label = tk.Label(window, image=image)
+    # Keep a reference to the image, Tk does not
+    image_label.image = image
+    image_label.pack()
+
+
+# The last graph built from the edges entry with its compiled form, which also keeps
+# the structures precomputed for it (heuristic tables, component labels, ...)
+graph_cache = {"edges": None, "graph": None, "compiled": None}
+# Searches run on worker threads, so the graph cache is shared between them
+graph_cache_lock = threading.Lock()
+
+# Messages posted by the search threads to the UI thread
+search_messages = queue.Queue()
+# The running searches by id, each with its algorithm, start time, expanded nodes and cancel event
+running_searches = {}
+search_ids = itertools.count(1)
+
+
+def get_cached_graph(input_edges):
+    # Rebuild the graph only when the edges text has changed since the last search
+    input_edges = input_edges.strip()
+    with graph_cache_lock:
+        if input_edges != graph_cache["edges"]:
+            # Call functions in graph.py to build the graph with provided graph edges
+            with g.profile_stage("parse"):
+                graph_edges = g.get_input_edges(input_edges)
+            with g.profile_stage("build"):
+                graph = g.get_graph(graph_edges)
+                compiled_graph = g.compile_graph(graph)
+            graph_cache["edges"] = input_edges
+            graph_cache["graph"] = graph
+            graph_cache["compiled"] = compiled_graph
+        return graph_cache["graph"], graph_cache["compiled"]
+
+
+def run_search(search_id, input_edges, start_node, goal_nodes, selected_algorithm, cancel_event):
+    # Runs on a worker thread, the results are posted back to the UI thread
+    def progress(expanded):
+        search_messages.put(("progress", search_id, expanded))
+        # Stop the search when the user clicked Cancel
+        if cancel_event.is_set():
+            raise g.SearchCancelled()
 
-def on_button_selected():
     try:
-        # Call functions in graph.py to build the graph with provided graph edges
-        graph_edges = g.get_input_edges(input_edges_entry.get())
-        graph = g.get_graph(graph_edges)
+        # Get the graph built from the provided graph edges
+        graph, compiled_graph = get_cached_graph(input_edges)
+        # Applying the selected search algorithm on the graph to get the path and the cost
+        search = g.SEARCH_ALGORITHMS[selected_algorithm]
+        stats = g.SearchStats()
+        with g.profile_stage("search"):
+            cost_to_goal, path_to_goal = search(compiled_graph, start_node, goal_nodes, progress=progress,
+                                                stats=stats)
+        image_file = None
+        if path_to_goal:
+            # Draw the graph with the path colored orange, start node colored red, goal nodes colored green.
+            # The layout and the figure are computed here by the Agg backend, the UI thread only shows the image
+            handle, image_file = tempfile.mkstemp(suffix=".png")
+            os.close(handle)
+            # Only the nodes next to the path of a graph too large to draw as a whole are drawn
+            neighborhood = 1 if graph.number_of_nodes() > g.MAX_DRAWN_NODES else None
+            with g.profile_stage("draw"):
+                g.draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_algorithm,
+                             show=False, output=image_file, neighborhood=neighborhood)
+        search_messages.put(("done", search_id, cost_to_goal, path_to_goal, stats, image_file))
+    except g.SearchCancelled:
+        search_messages.put(("cancelled", search_id))
+    except (ValueError, TypeError) as err:
+        search_messages.put(("error", search_id, err))
 
+
+def show_status():
+    # Display the progress of the running searches
+    now = time.perf_counter()
+    status = [f"{search['algorithm']} #{search_id}: {search['expanded']} nodes expanded, "
+              f"{now - search['started']:.1f} s" for search_id, search in running_searches.items()]
+    status_label.config(text="\n".join(status))
+    cancel_button.config(state="normal" if running_searches else "disabled")
+
+
+def poll_search_messages():
+    # Handle the messages of the search threads on the UI thread
+    while True:
+        try:
+            message = search_messages.get_nowait()
+        except queue.Empty:
+            break
+        kind, search_id = message[0], message[1]
+        search = running_searches.get(search_id)
+        if search is None:
+            continue
+        if kind == "progress":
+            search["expanded"] = message[2]
+            continue
+        del running_searches[search_id]
+        if kind == "done":
+            cost_to_goal, path_to_goal, stats, image_file = message[2:]
+            if path_to_goal:
+                # Display the path, cost and search statistics to the user
+                output(cost_to_goal, path_to_goal, stats)
+                # Display the graph drawn by the search thread
+                show_drawing(f"{search['algorithm']} #{search_id}", image_file)
+            else:
+                # If no path found to goal display this message to the user
+                messagebox.showerror("Error", f"{search['algorithm']} #{search_id}: Cannot reach path")
+        elif kind == "error":
+            # Display the error message
+            print(message[2])
+            messagebox.showerror("Error", message[2])
+    show_status()
+    root.after(100, poll_search_messages)
+
+
+def on_button_selected():
+    try:
         # Getting the start node from the user
         if start_node_entry.get():
             start_node = start_node_entry.get()
@@ -125,87 +256,49 @@ def on_button_selected():
         else:
             # Display this message to user if did not input goal nodes
             raise ValueError("Empty goal nodes")
-
-        selected_option.set(option_var.get())
-        selected_algorithm = selected_option.get()
-        # Check the search algorithm the user has selected
-        # If the user selected bfs search algorithm
-        if selected_algorithm == "BFS":
-            # Applying bfs search algorithm on the graph to get the path and the cost
-            cost_to_goal, path_to_goal = g.bfs(graph, start_node, goal_nodes)
-            if path_to_goal:
-                # Display the path and cost to the user
-                output(cost_to_goal, path_to_goal)
-                # Draw the graph with the path colored orange, start node colored red,
-                # Goal nodes colored green
-                g.draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_algorithm)
-            else:
-                # If no path found to goal display this message to the user
-                raise ValueError("Cannot reach path")
-        # If the user selected dfs search algorithm
-        elif selected_algorithm == "DFS":
-            # Applying dfs search algorithm on the graph to get the path and the cost
-            cost_to_goal, path_to_goal = g.dfs(graph, start_node, goal_nodes)
-            if path_to_goal:
-                # Display the path and cost to the user
-                output(cost_to_goal, path_to_goal)
-                # Draw the graph
-                g.draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_algorithm)
-            else:
-                # If no path found to goal display this message to the user
-                raise ValueError("Cannot reach path")
-        # If the user selected ucs search algorithm
-        elif selected_algorithm == "UCS":
-            # Applying ucs search algorithm on the graph to get the path and the cost
-            cost_to_goal, path_to_goal = g.ucs(graph, start_node, goal_nodes)
-            if path_to_goal:
-                # Display the path and cost to the user
-                output(cost_to_goal, path_to_goal)
-                # Draw the graph
-                g.draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_algorithm)
-            else:
-                # If no path found to goal display this message to the user
-                raise ValueError("Cannot reach path")
-        # If the user selected greedy search algorithm
-        elif selected_algorithm == "Greedy":
-            # Applying greedy search algorithm on the graph to get the path and the cost
-            cost_to_goal, path_to_goal = g.greedy_search(graph, start_node, goal_nodes)
-            if path_to_goal:
-                # Display the path and cost to the user
-                output(cost_to_goal, path_to_goal)
-                # Draw the graph
-                g.draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_algorithm)
-            else:
-                # If no path found to goal display this message to the user
-                raise ValueError("Cannot reach path")
-        # If the user selected a* search algorithm
-        else:
-            # Applying a* search algorithm on the graph to get the path and the cost
-            cost_to_goal, path_to_goal = g.a_star(graph, start_node, goal_nodes)
-            if path_to_goal:
-                # Display the path and cost to the user
-                output(cost_to_goal, path_to_goal)
-                # Draw the graph
-                g.draw_graph(graph, start_node, goal_nodes, path_to_goal, cost_to_goal, selected_algorithm)
-            else:
-                # If no path found to goal display this message to the user
-                raise ValueError("Cannot reach path")
     # Handle Exceptions
     except ValueError as value_err:
         # Display the error message
         print(value_err)
         messagebox.showerror("Error", value_err)
-        pass
-    except TypeError as type_err:
-        # Display the error message
-        print(type_err)
-        messagebox.showerror("Error", type_err)
-        pass
+        return
+
+    selected_option.set(option_var.get())
+    selected_algorithm = selected_option.get()
+    # Run the search on a worker thread so the window stays responsive
+    search_id = next(search_ids)
+    cancel_event = threading.Event()
+    running_searches[search_id] = {"algorithm": selected_algorithm, "started": time.perf_counter(),
+                                   "expanded": 0, "cancel": cancel_event}
+    threading.Thread(target=run_search, daemon=True,
+                     args=(search_id, input_edges_entry.get(), start_node, goal_nodes, selected_algorithm,
+                           cancel_event)).start()
+    show_status()
+
+
+def on_cancel_selected():
+    # Ask every running search to stop, they finish at their next progress check
+    for search in running_searches.values():
+        search["cancel"].set()
 
 
 # Create a Button widget within the Frame to start search
 button = tk.Button(frame_input, text="Search", padx=30, command=on_button_selected)
 button.pack()
+# Create a Button widget within the Frame to cancel the running searches
+cancel_button = tk.Button(frame_input, text="Cancel", padx=30, command=on_cancel_selected, state="disabled")
+cancel_button.pack(pady=(5, 0))
+# Create a label widget to display the progress of the running searches
+status_label = tk.Label(frame_input, text="", padx=10, pady=5)
+status_label.pack()
+
+# Check for search results every 100 ms
+root.after(100, poll_search_messages)
 
 # Start the main event loop
 root.mainloop()
+
+if profiler is not None:
+    # Print the time of every profiled stage once the window is closed
+    print(profiler.summary())
+    print(f"Profiles written to {profiler.directory}")
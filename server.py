@@ -0,0 +1,311 @@
+# ------------------------------------------
+# Name: Reda Mohsen Reda
+# Location: Egypt, Cairo
+# Project Title: AI Search Algorithms
+# Description:
+# A local HTTP server that keeps a graph loaded and answers search queries as JSON.
+# Run with:
+#   python server.py --graph edges.txt                   (an edge list, or a file written by graph.save_graph)
+#   python server.py --graph edges.graph --port 8765 --workers 4
+#   python server.py --graph edges.txt --max-seconds 2 --timeout 30   (limit every search and every request)
+# Endpoints:
+#   POST /search  {"algorithm": "UCS", "start": "A", "goals": ["D", "E"]}
+#   POST /batch   {"queries": [{"algorithm": "UCS", "start": "A", "goals": ["D"]}, ...]}
+#   GET  /stats   request counts and latency percentiles
+# ------------------------------------------
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+import graph as g
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# the number of latest requests of every endpoint the latency percentiles are computed from
+LATENCY_WINDOW = 10000
+# the largest request body accepted, in bytes
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+# the seconds a search may run before it is stopped, and the seconds a request waits for the workers
+DEFAULT_MAX_SECONDS = 10.0
+DEFAULT_TIMEOUT = 60.0
+ENDPOINTS = ("/search", "/batch", "/stats")
+
+# the graph opened by a worker process
+_worker_graph = None
+
+
+def _open_worker_graph(path, labels=None):
+    # map the shared graph file and label its components once, when a worker process starts
+    global _worker_graph
+    _worker_graph = g.open_graph(path, labels=labels)
+    _worker_graph.components()
+
+
+def _answer(queries: list, budget=None):
+    return list(g.batch_search(_worker_graph, queries, budget))
+
+
+def _percentile(values: list, fraction: float):
+    # the nearest-rank percentile of sorted values
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class SearchService:
+    """
+    the graph, the worker processes and the request statistics behind a SearchServer.
+
+    the workers memory-map the same graph file like graph.parallel_search does, so the graph is loaded once and
+    searches run in parallel instead of one at a time behind the interpreter lock. a MappedGraph is used as it is,
+    any other graph is saved to a temporary file first, see graph.share_graph.
+
+    args:
+    graph (nx.Graph, CompiledGraph or MappedGraph): the graph to search.
+    workers (int, optional): the number of worker processes, by default the number of CPUs.
+    budget (graph.SearchBudget, optional): limits on every search, see graph.batch_search.
+    timeout (float, optional): the seconds a request waits for the workers before it fails with TimeoutError.
+    a search that is still running then goes on in its worker, so the budget should stop it first.
+
+    example:
+    >>> import networkx as nx
+    >>> G = nx.Graph()
+    >>> G.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
+    >>> with SearchService(G, workers=1) as service:
+    ...     service.search({"algorithm": "UCS", "start": 'A', "goals": ['D']})["path"]
+    ['A', 'B', 'D']
+    """
+
+    def __init__(self, graph, workers: int = None, budget=None, timeout: float = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.budget = budget
+        self.timeout = timeout
+        self.nodes = graph.number_of_nodes()
+        self.edges = graph.number_of_edges()
+        self._directory = tempfile.TemporaryDirectory()
+        path, labels = g.share_graph(graph, self._directory.name)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_open_worker_graph,
+                                         initargs=(path, labels))
+        # start the workers now, before the server threads, and fail early if the graph cannot be opened
+        self._pool.submit(int).result()
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._latencies = {endpoint: deque(maxlen=LATENCY_WINDOW) for endpoint in ENDPOINTS}
+        self._requests = dict.fromkeys(ENDPOINTS, 0)
+        self._errors = 0
+        self._queries = 0
+
+    def search(self, query: dict):
+        """
+        answer one query.
+
+        args:
+        query (dict): an object with "algorithm", "start" and "goals", see graph.parse_query.
+
+        returns:
+        dict: the result of graph.batch_search for the query.
+        """
+        return self._pool.submit(_answer, [g.parse_query(query)], self.budget).result(timeout=self.timeout)[0]
+
+    def search_batch(self, queries: list):
+        """
+        answer a list of queries, split into chunks over the workers.
+
+        args:
+        queries (list): objects with "algorithm", "start" and "goals".
+
+        returns:
+        list: the result of graph.batch_search for every query, in the order of the queries.
+        """
+        if not isinstance(queries, list):
+            raise ValueError("Expected a list of queries")
+        queries = [g.parse_query(query) for query in queries]
+        chunksize = max(1, len(queries) // (self.workers * 4))
+        futures = [self._pool.submit(_answer, queries[index:index + chunksize], self.budget)
+                   for index in range(0, len(queries), chunksize)]
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        results = []
+        try:
+            for future in futures:
+                results.extend(future.result(timeout=None if deadline is None
+                                             else max(0.0, deadline - time.perf_counter())))
+        except concurrent.futures.TimeoutError:
+            # drop the chunks no worker has started yet
+            for future in futures:
+                future.cancel()
+            raise
+        return results
+
+    def record(self, endpoint: str, seconds: float, queries: int = 0, error: bool = False):
+        # count a finished request, endpoint is None for an unknown endpoint
+        with self._lock:
+            if endpoint is not None:
+                self._requests[endpoint] += 1
+                self._latencies[endpoint].append(seconds)
+            self._queries += queries
+            self._errors += error
+
+    def stats(self):
+        """
+        return the request counts and the latency percentiles, in seconds, of the latest requests of every endpoint.
+
+        returns:
+        dict: the statistics as a JSON object.
+        """
+        with self._lock:
+            latencies = {endpoint: sorted(values) for endpoint, values in self._latencies.items()}
+            stats = {"uptime_seconds": time.time() - self.started, "workers": self.workers,
+                     "graph": {"nodes": self.nodes, "edges": self.edges},
+                     "requests": dict(self._requests), "queries": self._queries, "errors": self._errors}
+        stats["latency"] = {endpoint: {"count": len(values), "p50": _percentile(values, 0.5),
+                                       "p90": _percentile(values, 0.9), "p99": _percentile(values, 0.99),
+                                       "max": values[-1]}
+                            for endpoint, values in latencies.items() if values}
+        return stats
+
+    def close(self):
+        self._pool.shutdown()
+        self._directory.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    # answer the requests of one connection, kept open between requests
+    protocol_version = "HTTP/1.1"
+    server_version = "AISearch/1.0"
+
+    def do_GET(self):
+        self._dispatch({"/stats": lambda: (200, self.server.service.stats(), 0)})
+
+    def do_POST(self):
+        self._dispatch({"/search": self._search, "/batch": self._batch})
+
+    def _content_length(self):
+        # the length of the request body, no Content-Length header means no body
+        length = self.headers.get("Content-Length") or "0"
+        # int() would also take signs, spaces and underscores, and read(-1) waits for the client to close
+        if not (length.isascii() and length.isdigit()):
+            raise ValueError(f"Invalid Content-Length {length!r}")
+        if int(length) > MAX_REQUEST_BYTES:
+            raise ValueError(f"Request body larger than {MAX_REQUEST_BYTES} bytes")
+        return int(length)
+
+    def _read_json(self):
+        return json.loads(self.rfile.read(self._content_length()) or b"null")
+
+    def _search(self):
+        result = self.server.service.search(self._read_json())
+        # a node that is not in the graph or an unknown algorithm is the client's error
+        return (400 if "error" in result else 200), result, 1
+
+    def _batch(self):
+        body = self._read_json()
+        if not isinstance(body, dict):
+            raise ValueError('Expected an object like {"queries": [...]}')
+        results = self.server.service.search_batch(body.get("queries"))
+        return 200, {"results": results}, len(results)
+
+    def _unknown(self):
+        # also drop the body of an unknown endpoint so the connection stays usable
+        self.rfile.read(self._content_length())
+        return 404, {"error": f"Unknown endpoint {self.command} {urlsplit(self.path).path}"}, 0
+
+    def _dispatch(self, routes: dict):
+        start_time = time.perf_counter()
+        endpoint = urlsplit(self.path).path
+        route = routes.get(endpoint, self._unknown)
+        queries = 0
+        try:
+            status, body, queries = route()
+        except ValueError as value_err:
+            status, body = 400, {"error": str(value_err)}
+            # the body may not have been read, do not take the rest of it for the next request
+            self.close_connection = True
+        except concurrent.futures.TimeoutError:
+            status, body = 504, {"error": f"No answer within {self.server.service.timeout} seconds"}
+        except Exception as err:  # report it to the client instead of only dropping the connection
+            status, body = 500, {"error": f"{type(err).__name__}: {err}"}
+            self.close_connection = True
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.service.record(endpoint if endpoint in routes else None, time.perf_counter() - start_time,
+                                   queries, status >= 400)
+
+    def log_message(self, format, *args):
+        # logging every request to stderr costs more than a small search, only log with --verbose
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class SearchServer(ThreadingHTTPServer):
+    """
+    an HTTP server that answers search queries with a SearchService, one thread per connection.
+
+    a connection thread only waits for the workers while a search runs, so a slow query does not hold up the
+    requests of other clients. port 0 picks a free port, see server_address.
+    """
+    daemon_threads = True
+
+    def __init__(self, service: SearchService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 verbose: bool = False):
+        super().__init__((host, port), SearchRequestHandler)
+        self.service = service
+        self.verbose = verbose
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve search queries on a graph held in memory over local HTTP.")
+    parser.add_argument("--graph", metavar="FILE", required=True,
+                        help="the graph, an edge list or a file written by graph.save_graph")
+    parser.add_argument("--directed", action="store_true", help="read the edge list as directed edges")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="the address to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, help="the number of worker processes, by default the number of CPUs")
+    parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS,
+                        help=f"stop every search after this many seconds and answer it as truncated, 0 for no limit "
+                             f"(default: {DEFAULT_MAX_SECONDS})")
+    parser.add_argument("--max-expanded", type=int, help="stop every search after expanding this many nodes")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"answer a request with 504 when the workers take longer than this many seconds, "
+                             f"0 for no limit (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--verbose", action="store_true", help="log every request to stderr")
+    args = parser.parse_args(argv)
+
+    try:
+        budget = g.SearchBudget(max_expanded=args.max_expanded, max_seconds=args.max_seconds or None)
+        if args.timeout < 0:
+            raise ValueError("timeout must not be negative")
+        graph = g.read_graph(args.graph, directed=args.directed)
+    except (OSError, ValueError) as err:
+        print(err, file=sys.stderr)
+        return 1
+    with SearchService(graph, args.workers, budget, args.timeout or None) as service:
+        with SearchServer(service, args.host, args.port, args.verbose) as server:
+            host, port = server.server_address[:2]
+            print(f"Serving {service.nodes} nodes and {service.edges} edges on http://{host}:{port} "
+                  f"with {service.workers} workers", file=sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,9 +11,21 @@
 #   - Greedy Best-First Search
 #   - A* Best-First Search
 # ------------------------------------------
+import io
+import json
+import pickle
+import random
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 import networkx as nx
-from graph import get_input_edges, get_graph, bfs, dfs, ucs, greedy_search, a_star
+import graph as graph_module
+from graph import (get_input_edges, get_graph, compile_graph, load_graph, GraphBuilder, save_graph, open_graph,
+                   bfs, dfs, ucs, greedy_search, a_star, bidirectional_bfs, bidirectional_ucs, search_many,
+                   parallel_search, SEARCH_ALGORITHMS, SearchCache, SearchCancelled, GoalDistanceHeuristic,
+                   LandmarkHeuristic, PROGRESS_INTERVAL, search_steps, run_steps, SearchBudget,
+                   SearchStats, StageProfiler, profile_stage,
+                   draw_graph, graph_layout, LARGE_GRAPH_NODES, MAX_DRAWN_NODES, neighborhood_graph,
+                   ucs_all_goals, DynamicSearch, vectorized_bfs, hop_distances, iter_queries, batch_search, main)
 
 
 def test_get_input_edges():
@@ -35,6 +47,325 @@ def test_get_graph():
         get_graph([])
 
 
+def test_compile_graph():
+    graph = get_graph([('A', 'B', {'weight': '3'}), ('A', 'C', {'weight': 2}), ('C', 'D', {'weight': 1})])
+    compiled = compile_graph(graph)
+    assert compiled.number_of_nodes() == 4
+    assert compiled.number_of_edges() == 3
+    assert list(compiled.neighbors('A')) == ['B', 'C']
+    assert list(compiled.neighbors('C')) == ['A', 'D']
+    assert compiled.weight('A', 'B') == 3
+    assert compiled.weight('D', 'C') == 1
+    assert compile_graph(compiled) is compiled
+    for search in (bfs, dfs, ucs, greedy_search, a_star):
+        assert search(compiled, 'B', ['D']) == search(graph, 'B', ['D'])
+    with pytest.raises(ValueError):
+        compile_graph(None)
+    # the graph of get_graph is compiled once, until it changes
+    assert compile_graph(graph) is compiled
+    version = graph.version
+    graph.add_edge('D', 'E', weight=2)
+    assert graph.version > version
+    assert compile_graph(graph) is not compiled and compile_graph(graph).number_of_nodes() == 5
+    assert compile_graph(graph.subgraph(['A', 'B'])).number_of_nodes() == 2
+    # a weight changed in place is seen too
+    graph = get_graph([('A', 'B', {'weight': 1}), ('B', 'C', {'weight': 1}), ('A', 'C', {'weight': 5})])
+    assert ucs(graph, 'A', ['C']) == (2, ['A', 'B', 'C'])
+    graph['A']['B']['weight'] = 10
+    assert ucs(graph, 'A', ['C']) == (5, ['A', 'C'])
+    nx.set_edge_attributes(graph, {('A', 'C'): 12}, 'weight')
+    assert ucs(graph, 'A', ['C']) == (11, ['A', 'B', 'C'])
+    graph.edges['B', 'C'].update(weight=3)
+    graph.subgraph(['A', 'B'])['A']['B']['weight'] = 1
+    assert ucs(graph, 'A', ['C']) == (4, ['A', 'B', 'C'])
+    copy = pickle.loads(pickle.dumps(graph))
+    copy['A']['C']['weight'] = 1
+    assert ucs(copy, 'A', ['C']) == (1, ['A', 'C']) and ucs(graph, 'A', ['C']) == (4, ['A', 'B', 'C'])
+    # fractional weights are kept
+    graph = get_graph([('A', 'B', {'weight': 0.6}), ('B', 'D', {'weight': 0.6}), ('A', 'D', {'weight': 1.0})])
+    for search in (ucs, a_star):
+        assert search(graph, 'A', ['D']) == (1.0, ['A', 'D'])
+    builder = GraphBuilder()
+    builder.add_edges_from([('A', 'B', 1), ('B', 'D', 0.5), ('A', 'D', 2)])
+    assert ucs(builder.build(), 'A', ['D']) == (1.5, ['A', 'B', 'D'])
+
+
+def test_component_index():
+    rng = random.Random(5)
+    edges = [(str(rng.randrange(300)), str(rng.randrange(300)), rng.randint(1, 9)) for _ in range(250)]
+    builder = GraphBuilder()
+    builder.add_edges_from(edges[:100])
+    for u, v, weight in edges[100:]:
+        builder.add_edge(u, v, weight)
+    assert builder.connected(edges[0][0], edges[0][1])
+    built = builder.build()
+    graph = get_graph([(u, v, {'weight': weight}) for u, v, weight in edges])
+    untracked = nx.Graph()
+    untracked.add_weighted_edges_from(edges)
+    compiled = compile_graph(graph)
+    # the labels kept while the edges were added match the ones computed from the compiled graph
+    assert list(built.components()) == list(compile_graph(untracked).components())
+    assert [compiled.label(label) for label in compiled.components()] == [graph.find(node) for node in graph]
+    for _ in range(100):
+        start_node = built.label(rng.randrange(len(built)))
+        goal_nodes = [built.label(rng.randrange(len(built))) for _ in range(rng.randint(1, 3))]
+        for search in (bfs, dfs, ucs, greedy_search, a_star, bidirectional_bfs, bidirectional_ucs):
+            expected = search(untracked, start_node, goal_nodes)
+            assert search(built, start_node, goal_nodes) == search(graph, start_node, goal_nodes) == expected
+    # a goal node in another component is rejected without expanding a node, or compiling the graph
+    graph = get_graph([('A', 'B', {'weight': 1}), ('C', 'D', {'weight': 1})])
+    for search in (bfs, dfs, ucs, greedy_search, a_star, bidirectional_bfs, bidirectional_ucs):
+        assert search(graph, 'A', ['C', 'D']) == (None, None)
+    assert ucs_all_goals(graph, 'A', ['D']) == {'D': (None, None)}
+    assert graph._compiled is None
+    compiled = compile_graph(graph)
+    for search in (bfs, dfs, ucs, greedy_search, a_star):
+        stats = SearchStats()
+        assert search(compiled, 'A', ['D'], stats=stats) == (None, None)
+        assert stats.expanded == 0
+    assert ucs_all_goals(compiled, 'A', ['B', 'D']) == {'B': (1, ['A', 'B']), 'D': (None, None)}
+    # adding an edge joins the components, removing one stops the tracking
+    graph.add_edge('B', 'C', weight=1)
+    assert graph.connected('A', 'D')
+    assert bfs(graph, 'A', ['D']) == (3, ['A', 'B', 'C', 'D'])
+    graph.remove_edge('B', 'C')
+    assert not graph.tracks_components()
+    assert bfs(graph, 'A', ['D']) == (None, None)
+    with pytest.raises(ValueError):
+        graph.find('A')
+
+
+def test_load_graph(tmp_path):
+    text = "A, B=3\n# comment\n\nC, D=2 + B,C=1\nD,A=4\nB,A=7\nE,E=1\n"
+    expected = compile_graph(get_graph(get_input_edges("A, B=3+C, D=2 + B,C=1+D,A=4+B,A=7+E,E=1")))
+    assert load_graph(io.StringIO(text)).fingerprint() == expected.fingerprint()
+    path = tmp_path / "edges.txt"
+    path.write_text(text)
+    compiled = load_graph(path)
+    assert compiled.weight('A', 'B') == 7
+    assert compiled.to_networkx().edges == expected.to_networkx().edges
+    with pytest.raises(ValueError, match="line 3"):
+        load_graph(io.StringIO("A,B=1\nB,C=2\nC-D=3\n"))
+    with pytest.raises(ValueError):
+        load_graph(io.StringIO(""))
+    builder = GraphBuilder(directed=True)
+    builder.add_edges_from([('A', 'B', 1), ('B', 'A', 2), ('A', 'C', 3), ('A', 'B', 4)])
+    digraph = nx.DiGraph()
+    digraph.add_weighted_edges_from([('A', 'B', 1), ('B', 'A', 2), ('A', 'C', 3), ('A', 'B', 4)])
+    assert builder.build().fingerprint() == compile_graph(digraph).fingerprint()
+
+
+def test_save_and_open_graph(tmp_path):
+    graph = get_graph(get_input_edges("A, B=3+C, D=2+B,C=1+D,A=4+Ä,E=5"))
+    compiled = compile_graph(graph)
+    path = tmp_path / "graph.bin"
+    save_graph(graph, path)
+    with open_graph(path, verify=True) as mapped:
+        assert mapped.fingerprint() == compiled.fingerprint()
+        assert mapped.has_node('Ä') and not mapped.has_node('F') and not mapped.has_node(1)
+        assert list(mapped.neighbors('D')) == ['C', 'A']
+        for search in (bfs, dfs, ucs, greedy_search, a_star):
+            assert search(mapped, 'A', ['E']) == search(compiled, 'A', ['E'])
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="checksum"):
+        open_graph(path, verify=True)
+    save_graph(get_graph([('A', 'B', {'weight': 0.5}), ('B', 'C', {'weight': 2})]), tmp_path / "float.bin")
+    with open_graph(tmp_path / "float.bin") as mapped:
+        assert ucs(mapped, 'A', ['C']) == (2.5, ['A', 'B', 'C'])
+    path.write_bytes(bytes(data[:-20]))
+    with pytest.raises(ValueError, match="truncated"):
+        open_graph(path)
+    path.write_bytes(b"not a graph")
+    with pytest.raises(ValueError):
+        open_graph(path)
+    with pytest.raises(ValueError):
+        save_graph(nx.path_graph(3), tmp_path / "numbers.bin")
+
+
+def test_deep_chain():
+    # a long chain used to run out of memory when every push copied its path
+    graph = get_graph([(str(i), str(i + 1), {'weight': 1}) for i in range(20000)])
+    for search in (bfs, dfs, ucs, greedy_search):
+        cost, path = search(graph, '0', ['20000'])
+        assert cost == 20000
+        assert path == [str(i) for i in range(20001)]
+
+
+def test_progress_and_cancel():
+    graph = compile_graph(get_graph([(str(i), str(i + 1), {'weight': 1}) for i in range(5000)]))
+    for search in SEARCH_ALGORITHMS.values():
+        reports = []
+        assert search(graph, '0', ['5000'], progress=reports.append) == search(graph, '0', ['5000'])
+        assert reports[:4] == list(range(PROGRESS_INTERVAL, 5000, PROGRESS_INTERVAL))
+
+        def cancel(expanded):
+            raise SearchCancelled()
+
+        with pytest.raises(SearchCancelled):
+            search(graph, '0', ['5000'], progress=cancel)
+    for search in (bidirectional_bfs, bidirectional_ucs, lambda *args, **kwargs: ucs_all_goals(*args, **kwargs)['5000']):
+        reports = []
+        assert search(graph, '0', ['5000'], progress=reports.append) == ucs(graph, '0', ['5000'])
+        assert reports[:4] == list(range(PROGRESS_INTERVAL, 5000, PROGRESS_INTERVAL))
+        with pytest.raises(SearchCancelled):
+            search(graph, '0', ['5000'], progress=cancel)
+    # a cancel also stops the backward search of the default A* heuristic before it settles every node
+    graph = compile_graph(get_graph([(str(i), str(i + 1), {'weight': 1}) for i in range(5000)]))
+    with pytest.raises(SearchCancelled):
+        a_star(graph, '0', ['5000'], progress=cancel)
+    assert len(graph._cache[("goal_distance", frozenset([5000]))].distance) == PROGRESS_INTERVAL
+
+
+def test_search_steps():
+    graph = compile_graph(get_graph([(str(i), str(i + 1), {'weight': 1}) for i in range(100)]))
+    for algorithm, search in SEARCH_ALGORITHMS.items():
+        steps = list(search_steps(algorithm, graph, '0', ['100']))
+        assert [step.node for step in steps] == [str(i) for i in range(101)]
+        assert [step.expanded for step in steps] == list(range(1, 102))
+        assert steps[-1].cost == 100
+        batched = search_steps(algorithm, graph, '0', ['100'], every=25)
+        assert [step.expanded for step in batched] == [25, 50, 75, 100]
+        assert run_steps(search_steps(algorithm, graph, '0', ['100'])) == search(graph, '0', ['100'])
+    # two searches can be interleaved step by step
+    forward, backward = search_steps("BFS", graph, '0', ['100']), search_steps("UCS", graph, '100', ['0'])
+    assert [(a.node, b.node) for a, b in zip(forward, backward)][:2] == [('0', '100'), ('1', '99')]
+    with pytest.raises(ValueError):
+        search_steps("BFS", graph, 'X', ['100'])
+    with pytest.raises(ValueError):
+        search_steps("Beam", graph, '0', ['100'])
+
+
+def test_search_budget():
+    graph = compile_graph(get_graph([(str(i), str(i + 1), {'weight': 1}) for i in range(5000)]))
+    for search in SEARCH_ALGORITHMS.values():
+        result = search(graph, '0', ['5000'], budget=SearchBudget(max_expanded=100))
+        assert result == (None, None)
+        assert result.truncated and result.reason == "expanded"
+        assert result.stats["expanded"] == 101
+        result = search(graph, '0', ['5000'], budget=SearchBudget(max_memory=1000 * 200))
+        assert result.truncated and result.reason == "memory"
+        result = search(graph, '0', ['5000'], budget=SearchBudget(max_seconds=0))
+        assert result.truncated and result.reason == "deadline"
+        result = search(graph, '0', ['5000'], budget=SearchBudget(max_expanded=5001, max_frontier=10))
+        assert result == search(graph, '0', ['5000'])
+        assert not result.truncated and result.reason is None and result.stats["expanded"] == 5001
+    # the backward search of the default A* heuristic stops at the budget before the first expansion
+    for budget in (SearchBudget(max_expanded=1), SearchBudget(max_seconds=0)):
+        graph = compile_graph(get_graph([(str(i), str(i + 1), {'weight': 1}) for i in range(5000)]))
+        result = a_star(graph, '0', ['5000'], budget=budget)
+        assert result.truncated and result.stats["expanded"] <= 2
+        assert len(graph._cache[("goal_distance", frozenset([5000]))].distance) <= 2
+    # so do the searches outside SEARCH_ALGORITHMS
+    for search in (bidirectional_bfs, bidirectional_ucs):
+        result = search(graph, '0', ['5000'], budget=SearchBudget(max_expanded=100))
+        assert result == (None, None) and result.truncated and result.reason == "expanded"
+        assert result.stats["expanded"] == 101
+        result = search(graph, '0', ['5000'], budget=SearchBudget(max_expanded=5001))
+        assert result == search(graph, '0', ['5000']) and not result.truncated
+    results = ucs_all_goals(graph, '0', ['50', '5000'], budget=SearchBudget(max_expanded=100))
+    assert results['50'] == (50, [str(i) for i in range(51)]) and not results['50'].truncated
+    assert results['5000'] == (None, None) and results['5000'].truncated and results['5000'].reason == "expanded"
+    star = get_graph([('A', str(i), {'weight': 1}) for i in range(50)])
+    result = bfs(star, 'A', ['49'], budget=SearchBudget(max_frontier=10))
+    assert result.truncated and result.reason == "frontier"
+    with pytest.raises(ValueError):
+        SearchBudget(max_expanded=-1)
+
+
+def test_search_stats():
+    graph = nx.Graph()
+    graph.add_weighted_edges_from([('A', 'B', 1), ('A', 'C', 2), ('B', 'D', 3), ('C', 'D', 1)])
+    for search in SEARCH_ALGORITHMS.values():
+        stats = SearchStats()
+        assert search(graph, 'A', ['D'], stats=stats) == search(graph, 'A', ['D'])
+        assert stats.expanded >= 2 and stats.generated >= stats.expanded and stats.peak_fringe >= 1
+        assert stats.peak_visited >= 2 and stats.search_seconds >= 0 and stats.reconstruction_seconds >= 0
+        assert "expanded" in str(stats)
+    stats = SearchStats()
+    ucs(graph, 'A', ['D'], stats=stats)
+    assert (stats.expanded, stats.generated, stats.duplicates, stats.peak_fringe) == (4, 5, 0, 2)
+    # the cheaper path to D pushes D a second time, its first entry is skipped once D is expanded
+    graph.add_edge('D', 'X', weight=9)
+    stats = SearchStats()
+    ucs(graph, 'A', ['X'], stats=stats)
+    assert stats.duplicates == 1 and stats.expanded == 5
+    stats = SearchStats()
+    a_star(graph, 'A', ['D'], heuristic=lambda node: 0, stats=stats)
+    assert stats.heuristic_evaluations == stats.generated == 5
+    stats = SearchStats()
+    dfs(graph, 'A', ['X'], stats=stats)
+    assert stats.as_dict()["expanded"] == stats.expanded
+    for search in (bidirectional_bfs, bidirectional_ucs):
+        stats = SearchStats()
+        assert search(graph, 'A', ['X'], stats=stats) == search(graph, 'A', ['X'])
+        assert stats.expanded >= 2 and stats.peak_fringe >= 1 and stats.peak_visited >= 3
+    stats = SearchStats()
+    assert ucs_all_goals(graph, 'A', ['B', 'X'], stats=stats) == {'B': (1, ['A', 'B']), 'X': (12, ['A', 'C', 'D', 'X'])}
+    assert stats.expanded == 5 and stats.duplicates == 1
+
+
+def test_stage_profiler(tmp_path):
+    # profiling is off unless it is enabled
+    assert profile_stage("search") is profile_stage("draw")
+    profiler = StageProfiler(tmp_path / "profiles")
+    with profiler.stage("build"):
+        graph = get_graph(get_input_edges("A,B=1+B,C=2"))
+    with profiler.stage("search"):
+        assert ucs(graph, 'A', ['C']) == (3, ['A', 'B', 'C'])
+    assert [stage[0] for stage in profiler.stages] == ["build", "search"]
+    assert sorted(path.name for path in (tmp_path / "profiles").iterdir()) == [
+        "01-build.allocations.txt", "01-build.prof", "02-search.allocations.txt", "02-search.prof"]
+    assert "search" in profiler.summary()
+
+
+def test_draw_graph(tmp_path):
+    graph = get_graph(get_input_edges("A,B=1+A,C=2+B,D=3+C,D=1"))
+    draw_graph(graph, 'A', ['D'], ['A', 'C', 'D'], 3, "UCS", show=False, output=tmp_path / "graph.png")
+    assert (tmp_path / "graph.png").stat().st_size > 0
+    # the layout is computed once per graph and reused until the graph changes
+    assert graph_layout(graph) is graph_layout(get_graph(get_input_edges("A,B=1+A,C=2+B,D=3+C,D=1")))
+    graph.add_edge('D', 'E', weight=1)
+    assert set(graph_layout(graph)) == {'A', 'B', 'C', 'D', 'E'}
+    # a cached layout of a graph from get_graph() is found without compiling or fingerprinting it again
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(graph_module, "compile_graph", None)
+        assert set(graph_layout(graph)) == {'A', 'B', 'C', 'D', 'E'}
+    # large graphs use a layout that does not need scipy, in columns by hops from the start node,
+    # and label only the path
+    chain = get_graph([(str(i), str(i + 1), {'weight': 1}) for i in range(LARGE_GRAPH_NODES + 1)])
+    pos = graph_layout(chain, '3')
+    assert pos['3'][0] < pos['2'][0] == pos['4'][0] < pos['1'][0] == pos['5'][0] and pos['0'][0] < pos['500'][0]
+    draw_graph(compile_graph(chain), '0', ['3'], ['0', '1', '2', '3'], 3, "BFS", show=False,
+               output=tmp_path / "chain.png")
+    assert (tmp_path / "chain.png").stat().st_size > 0
+    # a graph too large to draw as a whole is only drawn by the neighborhood of its path
+    chain = compile_graph(get_graph([(str(i), str(i + 1), {'weight': 1}) for i in range(MAX_DRAWN_NODES)]))
+    with pytest.raises(ValueError, match="neighborhood"):
+        draw_graph(chain, '0', ['3'], ['0', '1', '2', '3'], 3, "BFS", show=False, output=tmp_path / "chain.png")
+    draw_graph(chain, '0', ['3'], ['0', '1', '2', '3'], 3, "BFS", show=False, output=tmp_path / "chain.png",
+               neighborhood=1)
+
+
+def test_neighborhood_graph(tmp_path):
+    chain = compile_graph(get_graph([(str(i), str(i + 1), {'weight': i}) for i in range(10000)]))
+    subgraph, hidden = neighborhood_graph(chain, ['10', '11'], hops=2)
+    assert sorted(subgraph.nodes, key=int) == ['8', '9', '10', '11', '12', '13']
+    assert subgraph['10']['11']['weight'] == 10
+    assert hidden == {'8': 1, '13': 1}
+    subgraph, hidden = neighborhood_graph(chain, ['10'], hops=0)
+    assert list(subgraph.nodes) == ['10'] and hidden == {'10': 2}
+    star = get_graph([('A', str(i), {'weight': 1}) for i in range(50)])
+    subgraph, hidden = neighborhood_graph(star, ['A'], hops=1, max_nodes=10)
+    assert subgraph.number_of_nodes() == 11 and hidden == {'A': 40}
+    with pytest.raises(ValueError):
+        neighborhood_graph(star, ['A'], hops=-1)
+    draw_graph(chain, '0', ['5'], [str(i) for i in range(6)], 15, "BFS", show=False, output=tmp_path / "chain.png",
+               neighborhood=1)
+    assert (tmp_path / "chain.png").stat().st_size > 0
+
+
 def test_bfs():
     graph = nx.Graph()
     graph.add_edges_from([('A', 'B', {'weight': '1'}), ('A', 'C', {'weight': '2'}), ('B', 'D', {'weight': '3'})])
@@ -52,6 +383,33 @@ def test_bfs():
         bfs(graph, start_node, goal_nodes)
 
 
+def test_vectorized_bfs(tmp_path):
+    pytest.importorskip("numpy")
+    rng = random.Random(3)
+    builder = GraphBuilder()
+    builder.add_edges_from((str(rng.randrange(500)), str(rng.randrange(500)), rng.randint(1, 9)) for _ in range(1200))
+    graph = builder.build()
+    save_graph(graph, tmp_path / "graph.bin")
+    with open_graph(tmp_path / "graph.bin") as mapped:
+        for _ in range(50):
+            start_node = graph.label(rng.randrange(len(graph)))
+            goal_nodes = [graph.label(rng.randrange(len(graph))) for _ in range(rng.randint(1, 3))]
+            assert vectorized_bfs(graph, start_node, goal_nodes) == bfs(graph, start_node, goal_nodes)
+            assert vectorized_bfs(mapped, start_node, goal_nodes) == bfs(graph, start_node, goal_nodes)
+    chain = get_graph([(str(i), str(i + 1), {'weight': 1}) for i in range(5000)])
+    result = vectorized_bfs(chain, '0', ['5000'], budget=SearchBudget(max_expanded=100))
+    assert result.truncated and result.reason == "expanded" and result.stats["expanded"] == 101
+    reports = []
+    stats = SearchStats()
+    assert vectorized_bfs(chain, '0', ['5000'], progress=reports.append, stats=stats) == bfs(chain, '0', ['5000'])
+    assert reports[:4] == list(range(PROGRESS_INTERVAL, 5000, PROGRESS_INTERVAL))
+    assert stats.expanded == stats.peak_visited == 5001
+    distances, parents = hop_distances(get_graph([('A', 'B', {'weight': 1}), ('B', 'C', {'weight': 1}),
+                                                  ('X', 'Y', {'weight': 1})]), 'A')
+    assert distances.tolist() == [0, 1, 2, -1, -1]
+    assert parents.tolist() == [-1, 0, 1, -1, -1]
+
+
 def test_dfs():
     graph = nx.Graph()
     graph.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
@@ -86,6 +444,123 @@ def test_ucs():
         goal_nodes = ['']
         ucs(graph, start_node, goal_nodes)
 
+
+def test_ucs_optimal():
+    graph = nx.gnm_random_graph(300, 1200, seed=7)
+    for u, v, data in graph.edges(data=True):
+        data['weight'] = (u * 31 + v * 17) % 9 + 1
+    distances = nx.single_source_dijkstra_path_length(graph, 0)
+    for goal in list(distances)[1::13]:
+        cost, path = ucs(graph, 0, [goal])
+        assert cost == distances[goal]
+        assert path[0] == 0 and path[-1] == goal
+        assert sum(graph[u][v]['weight'] for u, v in zip(path, path[1:])) == cost
+
+
+def test_ucs_all_goals():
+    graph = compile_graph(get_graph([(str(i), str(j), {'weight': (i * 7 + j) % 5 + 1})
+                                     for i in range(300) for j in (i + 1, (i * 13 + 7) % 300) if i != j]))
+    graph_with_island = get_graph([('0', '1', {'weight': 1}), ('X', 'Y', {'weight': 1})])
+    goals = [str(i) for i in range(0, 300, 7)]
+    results = ucs_all_goals(graph, '5', goals)
+    assert list(results) == goals
+    for goal in goals:
+        assert results[goal] == ucs(graph, '5', [goal])
+    assert ucs_all_goals(graph_with_island, '0', ['1', 'Y']) == {'1': (1, ['0', '1']), 'Y': (None, None)}
+    with pytest.raises(ValueError):
+        ucs_all_goals(graph, '5', ['missing'])
+
+
+def test_dynamic_search():
+    rng = random.Random(5)
+    for directed in (False, True):
+        graph = nx.DiGraph() if directed else nx.Graph()
+        graph.add_nodes_from(str(i) for i in range(40))
+        for i in range(40):
+            for j in rng.sample(range(40), 3):
+                if i != j:
+                    graph.add_edge(str(i), str(j), weight=rng.randint(1, 9))
+        search = DynamicSearch(graph, '0', ['39', '20'])
+        for _ in range(60):
+            cost, path = search.search()
+            assert cost == ucs(graph, '0', ['39', '20'])[0]
+            if path is not None:
+                assert path[0] == '0' and path[-1] in ('39', '20')
+                assert sum(graph[u][v]['weight'] for u, v in zip(path, path[1:])) == cost
+            u, v = rng.sample(sorted(graph.nodes), 2)
+            if graph.has_edge(u, v) and rng.random() < 0.5:
+                graph.remove_edge(u, v)
+                search.apply([(u, v, None)])
+            else:
+                graph.add_edge(u, v, weight=rng.randint(1, 9))
+                search.apply([(u, v, graph[u][v]['weight'])])
+    # a change far from the path only repairs the nodes it affects
+    chain = get_graph([(str(i), str(i + 1), {'weight': 1}) for i in range(1000)])
+    search = DynamicSearch(chain, '0', ['1000'])
+    assert search.search() == ucs(chain, '0', ['1000'])
+    search.update_edge('998', '999', 3)
+    assert search.search()[0] == 1002 and search.expanded < 10
+    # edges of weight 0 are repaired like any other edge, also along zero cost cycles
+    zero_chain = get_graph([(str(i), str(i + 1), {'weight': 0}) for i in range(1000)])
+    search = DynamicSearch(zero_chain, '0', ['1000'])
+    assert search.search()[0] == 0
+    search.update_edge('998', '999', 3)
+    assert search.search()[0] == 3 and search.expanded < 10
+    search.update_edge('500', '1000', 0)
+    assert search.search() == (0, [str(i) for i in range(501)] + ['1000']) and search.expanded < 10
+    search.remove_edge('500', '1000')
+    assert search.search()[0] == 3 and search.expanded < 10
+    graph = get_graph([('0', '1', {'weight': 1}), ('1', '2', {'weight': 0}), ('2', '3', {'weight': 0})])
+    search = DynamicSearch(graph, '0', ['3'])
+    assert search.search() == (1, ['0', '1', '2', '3'])
+    search.update_edge('0', '3', 1)
+    search.remove_edge('0', '1')
+    assert search.search() == (1, ['0', '3'])
+    search.update_edge('0', '3', 0)
+    search.update_edge('0', '1', 0)
+    assert search.search()[0] == 0
+    search.remove_edge('0', '3')
+    search.update_edge('1', '2', 2)
+    search.update_edge('2', '3', 2)
+    search.update_edge('0', '1', 3)
+    assert search.search() == (7, ['0', '1', '2', '3'])
+    search.update_edge('0', '2', 1)
+    assert search.search() == (3, ['0', '2', '3'])
+    search.update_edge('0', '2', 0.5)
+    assert search.search() == (2.5, ['0', '2', '3'])
+    for directed in (False, True):
+        graph = nx.DiGraph() if directed else nx.Graph()
+        graph.add_nodes_from(str(i) for i in range(15))
+        search = DynamicSearch(graph, '0', ['14', '7'])
+        for _ in range(80):
+            u, v = rng.sample(sorted(graph.nodes), 2)
+            graph.add_edge(u, v, weight=rng.randint(0, 3))
+            search.update_edge(u, v, graph[u][v]['weight'])
+            assert search.search()[0] == ucs(graph, '0', ['14', '7'])[0]
+    with pytest.raises(ValueError):
+        search.remove_edge('0', '5')
+    with pytest.raises(ValueError):
+        search.update_edge('0', '1', -1)
+
+
+def test_bidirectional():
+    for graph in (nx.gnm_random_graph(300, 700, seed=5), nx.gnm_random_graph(300, 900, seed=5, directed=True)):
+        for u, v, data in graph.edges(data=True):
+            data['weight'] = (u * 3 + v * 11) % 7 + 1
+        for goal in range(1, 300, 23):
+            goal_nodes = [goal, (goal * 7) % 300]
+            assert bidirectional_ucs(graph, 0, goal_nodes)[0] == ucs(graph, 0, goal_nodes)[0]
+            cost, path = bidirectional_bfs(graph, 0, goal_nodes)
+            expected_cost, expected_path = bfs(graph, 0, goal_nodes)
+            if expected_path is None:
+                assert path is None
+                continue
+            assert len(path) == len(expected_path)
+            assert path[0] == 0 and path[-1] in goal_nodes
+            assert cost == sum(graph[u][v]['weight'] for u, v in zip(path, path[1:]))
+    assert bidirectional_bfs(graph, 0, [0]) == (0, [0])
+
+
 def test_greedy():
     graph = nx.Graph()
     graph.add_edges_from([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}),
@@ -112,8 +587,8 @@ def test_a_star():
     start_node = 'A'
     goal_nodes = ['D', 'E']
     cost, path = a_star(graph, start_node, goal_nodes)
-    assert cost == 4
-    assert path == ['A', 'B', 'D']
+    assert cost == 2
+    assert path == ['A', 'B', 'E']
     graph = nx.Graph()
     with pytest.raises(ValueError):
         start_node = ""
@@ -123,5 +598,213 @@ def test_a_star():
         a_star(graph, start_node, goal_nodes)
 
 
+def test_a_star_heuristics():
+    graph = nx.gnm_random_graph(200, 600, seed=3)
+    for u, v, data in graph.edges(data=True):
+        data['weight'] = (u * 7 + v * 13) % 5 + 1
+    goal_nodes = [17, 101, 150]
+    expected_cost, _ = ucs(graph, 0, goal_nodes)
+    compiled = compile_graph(graph)
+    landmarks = LandmarkHeuristic(compiled, goal_nodes)
+    for heuristic in (None, GoalDistanceHeuristic(compiled, goal_nodes), landmarks, lambda node: 0):
+        cost, path = a_star(compiled, 0, goal_nodes, heuristic=heuristic)
+        assert cost == expected_cost
+        assert path[-1] in goal_nodes
+    # the landmark tables are reused for other goals and stay admissible
+    other_goals = landmarks.for_goals([42])
+    assert all(other_goals(node) <= ucs(compiled, node, [42])[0] for node in range(0, 200, 11))
+    # threads sharing the default heuristic of one compiled graph still find the cheapest paths
+    compiled = compile_graph(graph)
+    with ThreadPoolExecutor(8) as pool:
+        costs = list(pool.map(lambda start: a_star(compiled, start, goal_nodes)[0], range(0, 200, 7)))
+    assert costs == [ucs(compiled, start, goal_nodes)[0] for start in range(0, 200, 7)]
+    # a compiled graph keeps its tables when it is pickled
+    copy = pickle.loads(pickle.dumps(compiled))
+    assert a_star(copy, 0, goal_nodes)[0] == expected_cost
+    # a start node that cannot reach any goal returns immediately
+    graph.add_node('island')
+    assert a_star(graph, 'island', goal_nodes) == (None, None)
+
+
+def test_search_many():
+    graph = nx.gnm_random_graph(150, 300, seed=11)
+    for u, v, data in graph.edges(data=True):
+        data['weight'] = (u + v) % 6 + 1
+    graph.add_edge('X', 'Y', weight=1)
+    queries = [(algorithm, start, [goal, (goal * 3) % 150])
+               for algorithm in SEARCH_ALGORITHMS for start in (0, 5, 0) for goal in range(1, 150, 17)]
+    queries.append(("UCS", 0, ['X']))
+    queries.append(("A*", 'X', ['Y']))
+    results = list(search_many(graph, queries, max_trees=1))
+    assert results == [SEARCH_ALGORITHMS[algorithm](graph, start, goals) for algorithm, start, goals in queries]
+    assert results[-2] == (None, None)
+    with pytest.raises(ValueError):
+        list(search_many(graph, [("Random", 0, [1])]))
+
+
+def test_batch_search(tmp_path):
+    (tmp_path / "edges.txt").write_text("A,B=1\nA,C=2+B,D=3\nE,F=1\n")
+    save_graph(load_graph(tmp_path / "edges.txt"), tmp_path / "edges.graph")
+    (tmp_path / "queries.jsonl").write_text(
+        '{"algorithm": "UCS", "start": "A", "goals": ["D", "C"]}\n'
+        '# a comment\n'
+        '{"algorithm": "BFS", "start": "A", "goals": ["F"]}\n'
+        '{"algorithm": "DFS", "start": "A", "goals": ["X"]}\n')
+    assert list(iter_queries(tmp_path / "queries.jsonl")) == [("UCS", 'A', ['D', 'C']), ("BFS", 'A', ['F']),
+                                                             ("DFS", 'A', ['X'])]
+    for graph_file in ("edges.txt", "edges.graph"):
+        assert main(["--graph", str(tmp_path / graph_file), "--queries", str(tmp_path / "queries.jsonl"),
+                     "--output", str(tmp_path / "results.jsonl")]) == 0
+        results = [json.loads(line) for line in (tmp_path / "results.jsonl").read_text().splitlines()]
+        assert [(result.get("cost"), result.get("path")) for result in results] == [(2, ['A', 'C']), (None, None),
+                                                                                   (None, None)]
+        assert results[2]["error"] == "Goal node X is not in graph"
+        assert all(result["seconds"] >= 0 for result in results)
+    assert [result["cost"] for result in batch_search(load_graph(tmp_path / "edges.txt"),
+                                                      [("A*", 'B', ['C']), ("Greedy", 'D', ['A'])])] == [3, 4]
+    results = list(batch_search(load_graph(tmp_path / "edges.txt"), [("UCS", 'A', ['C']), ("UCS", 'A', ['A'])],
+                                budget=SearchBudget(max_expanded=1)))
+    assert [(result["cost"], result.get("truncated"), result.get("reason")) for result in results] == [
+        (None, True, 'expanded'), (0, None, None)]
+    (tmp_path / "queries.jsonl").write_text('{"algorithm": "UCS", "start": "A"}\n')
+    with pytest.raises(ValueError):
+        list(iter_queries(tmp_path / "queries.jsonl"))
+    assert main(["--graph", str(tmp_path / "edges.txt"), "--queries", str(tmp_path / "queries.jsonl")]) == 1
+
+
+def test_search_server():
+    import http.client
+    import threading
+    import urllib.error
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+    from server import SearchService, SearchServer
+
+    def request(path, body=None):
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", data=data, timeout=30) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as err:
+            return err.code, json.loads(err.read())
+
+    graph = get_graph([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3}),
+                       ('E', 'F', {'weight': 1})])
+    with SearchService(graph, workers=2) as service, SearchServer(service, port=0) as server:
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            status, result = request("/search", {"algorithm": "UCS", "start": "A", "goals": ["D", "C"]})
+            assert status == 200 and (result["cost"], result["path"]) == (2, ['A', 'C'])
+            status, result = request("/search", {"algorithm": "BFS", "start": "A", "goals": ["X"]})
+            assert status == 400 and result["error"] == "Goal node X is not in graph"
+            assert request("/search", {"start": "A"})[0] == 400
+            assert request("/unknown", {})[0] == 404
+            queries = [{"algorithm": algorithm, "start": "A", "goals": [goal]}
+                       for algorithm in SEARCH_ALGORITHMS for goal in ("D", "F")]
+            status, body = request("/batch", {"queries": queries})
+            assert status == 200
+            assert [(result["cost"], result["path"]) for result in body["results"]] == [
+                SEARCH_ALGORITHMS[query["algorithm"]](graph, query["start"], query["goals"]) for query in queries]
+            # concurrent clients
+            with ThreadPoolExecutor(8) as pool:
+                responses = list(pool.map(lambda _: request("/search", queries[0]), range(16)))
+            assert all(response == (200, responses[0][1] | {"seconds": response[1]["seconds"]})
+                       for response in responses)
+            # a Content-Length that is not a number or is negative is rejected, also for an unknown endpoint
+            for path in ("/search", "/unknown"):
+                for length in ("-1", "abc"):
+                    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                    connection.putrequest("POST", path)
+                    connection.putheader("Content-Length", length)
+                    connection.endheaders()
+                    response = connection.getresponse()
+                    assert response.status == 400 and "Content-Length" in json.loads(response.read())["error"]
+                    connection.close()
+            status, stats = request("/stats")
+            assert status == 200
+            assert stats["requests"] == {"/search": 21, "/batch": 1, "/stats": 0}
+            # the query without goals was rejected before it was answered
+            assert stats["queries"] == 18 + len(queries) and stats["errors"] == 7
+            assert stats["latency"]["/search"]["count"] == 21
+            assert 0 < stats["latency"]["/search"]["p50"] <= stats["latency"]["/search"]["p99"]
+        finally:
+            server.shutdown()
+    # the budget limits every search, and a graph whose labels are not strings is searched under its labels
+    with SearchService(nx.Graph([(1, 2), (2, 3)]), workers=1, budget=SearchBudget(max_expanded=2),
+                       timeout=30) as service:
+        assert service.search({"algorithm": "UCS", "start": 1, "goals": [2]})["path"] == [1, 2]
+        result = service.search({"algorithm": "UCS", "start": 1, "goals": [3]})
+        assert (result["path"], result["truncated"], result["reason"]) == (None, True, 'expanded')
+
+
+def test_parallel_search():
+    graph = nx.gnm_random_graph(200, 500, seed=13)
+    graph = nx.relabel_nodes(graph, str)
+    for u, v, data in graph.edges(data=True):
+        data['weight'] = (int(u) + int(v)) % 5 + 1
+    queries = [(algorithm, str(start), [str(goal)])
+               for algorithm in SEARCH_ALGORITHMS for start in (0, 9) for goal in range(1, 200, 19)]
+    expected = [SEARCH_ALGORITHMS[algorithm](graph, start, goals) for algorithm, start, goals in queries]
+    assert parallel_search(graph, queries, processes=2) == expected
+    assert parallel_search(graph, [], processes=2) == []
+    # the workers search a graph whose labels are not strings under its own labels
+    graph = nx.relabel_nodes(graph, int)
+    queries = [(algorithm, int(start), [int(goal) for goal in goals]) for algorithm, start, goals in queries]
+    assert parallel_search(graph, queries, processes=2) == [
+        (cost, None if path is None else [int(node) for node in path]) for cost, path in expected]
+    with pytest.raises(ValueError, match="Goal node"):
+        parallel_search(graph, [("UCS", 0, ['0'])], processes=2)
+    assert parallel_search(nx.Graph([(1, '1'), ('1', (1,))]), [("UCS", 1, [(1,)])], processes=2) == [
+        (2, [1, '1', (1,)])]
+
+
+def test_search_cache():
+    graph = get_graph([('A', 'B', {'weight': 1}), ('A', 'C', {'weight': 2}), ('B', 'D', {'weight': 3})])
+    cache = SearchCache(maxsize=2)
+    assert cache.search("UCS", graph, 'A', ['D', 'C']) == (2, ['A', 'C'])
+    cost, path = cache.search("UCS", graph, 'A', ['C', 'D'])
+    path.append('Z')
+    assert cache.search("UCS", graph, 'A', ['C', 'D']) == (2, ['A', 'C'])
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.search("BFS", graph, 'A', ['D'])
+    cache.search("DFS", graph, 'A', ['D'])
+    assert cache.evictions == 1 and len(cache) == 2
+    # changing the graph drops its entries
+    graph.add_edge('C', 'D', weight=1)
+    assert cache.search("UCS", graph, 'A', ['D']) == (3, ['A', 'C', 'D'])
+    assert len(cache) == 1
+    # so does a weight changed in place
+    graph['C']['D']['weight'] = 5
+    assert cache.search("UCS", graph, 'A', ['D']) == (4, ['A', 'B', 'D'])
+    assert len(cache) == 1
+    # a compiled copy of the same graph shares its entries
+    compiled = compile_graph(graph)
+    cache.search("UCS", compiled, 'A', ['D'])
+    assert cache.hits == 3
+    cache.invalidate(compiled)
+    assert len(cache) == 0
+    with pytest.raises(ValueError):
+        cache.search("Random", graph, 'A', ['D'])
+    # a get_graph graph is only compiled and hashed again after it changes
+    graph = get_graph([('A', 'B', {'weight': 1}), ('B', 'C', {'weight': 1})])
+    assert cache.search("UCS", graph, 'A', ['C']) == (2, ['A', 'B', 'C'])
+    graph._compiled = None
+    assert cache.search("UCS", graph, 'A', ['C']) == (2, ['A', 'B', 'C'])
+    assert graph._compiled is None
+    graph.add_edge('A', 'C', weight=1)
+    assert cache.search("UCS", graph, 'A', ['C']) == (1, ['A', 'C'])
+    # any other graph is hashed once per version its caller passes
+    graph = nx.Graph()
+    graph.add_weighted_edges_from([('A', 'B', 1), ('B', 'C', 1)])
+    with pytest.raises(ValueError):
+        cache.search("UCS", graph, 'A', ['C'])
+    cache = SearchCache()
+    assert cache.search("UCS", graph, 'A', ['C'], version=1) == (2, ['A', 'B', 'C'])
+    graph['A']['B']['weight'] = 5
+    assert cache.search("UCS", graph, 'A', ['C'], version=1) == (2, ['A', 'B', 'C'])
+    assert cache.search("UCS", graph, 'A', ['C'], version=2) == (6, ['A', 'B', 'C'])
+    assert (cache.hits, cache.misses, len(cache)) == (1, 2, 1)
+
 if __name__ == '__main__':
     pytest.main()